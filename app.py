@@ -1,7 +1,105 @@
-from modules.visualizer import Maze2DVisualizer
+import argparse
+import importlib
+import itertools
+import sys
+
+from modules.frontier import FRONTIERS
+from modules.grid import MAP_STYLES, CostModel, create_grid, generate_grid
+from modules.mapio import default_endpoints, load_grid, read_scen, save_grid, scen_map_path
+
+# Headless subcommands, each a module with a main(argv) function.
+COMMANDS = {
+    'batch': 'modules.batch',
+    'bench': 'modules.benchmark',
+    'export': 'modules.export',
+    'serve': 'modules.service',
+}
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Side-by-side A* and Dijkstra visualization",
+                                     epilog="Headless commands: " + ", ".join(COMMANDS))
+    parser.add_argument('--width', type=int, help="generate a map this many cells wide")
+    parser.add_argument('--height', type=int, help="generated map height (defaults to width)")
+    parser.add_argument('--seed', type=int, help="random seed for the generated map")
+    parser.add_argument('--style', choices=MAP_STYLES, default='noise')
+    parser.add_argument('--map', help="load a map file (Moving AI .map or binary .grid)")
+    parser.add_argument('--scen', help="take the start and goal from a Moving AI .scen file "
+                                       "(and the map too, unless --map is given)")
+    parser.add_argument('--scen-index', type=int, default=0, metavar='N',
+                        help="which entry of --scen to show (default: the first)")
+    parser.add_argument('--save-map', metavar='PATH',
+                        help="save the map as .map or .grid before showing it")
+    parser.add_argument('--obstacles', type=float, default=0.25, help="wall density")
+    parser.add_argument('--slow', type=float, default=0.1, help="slow terrain density")
+    parser.add_argument('--diagonal', action='store_true',
+                        help="allow diagonal moves (no corner cutting; octile heuristic)")
+    parser.add_argument('--height-penalty', type=float, default=0.0, metavar='P',
+                        help="add P steps of cost per unit of height difference of a move")
+    parser.add_argument('--steps-per-frame', type=int, default=1,
+                        help="expansions each solver may run per frame")
+    parser.add_argument('--ms-per-frame', type=float,
+                        help="milliseconds each solver may run per frame (overrides steps)")
+    parser.add_argument('--frontier', choices=FRONTIERS, default='heap',
+                        help="open-set implementation: lazy heap, Dial buckets or indexed heap")
+    parser.add_argument('--bidirectional', action='store_true',
+                        help="search from both start and goal (toggle with B)")
+    parser.add_argument('--landmarks', type=int, default=0, metavar='K',
+                        help="give A* a landmark (ALT) heuristic with K landmarks")
+    parser.add_argument('--epsilon', type=float, metavar='E',
+                        help="run weighted A* with heuristic inflation E (>= 1)")
+    parser.add_argument('--anytime', action='store_true',
+                        help="run anytime A* (ARA*), starting from --epsilon (default 3)")
+    parser.add_argument('--deadline-ms', type=float,
+                        help="search time after which anytime A* keeps its current path")
+    parser.add_argument('--record', metavar='PREFIX',
+                        help="record both searches to PREFIX.astar.trace/PREFIX.dijkstra.trace")
+    parser.add_argument('--replay', metavar='PREFIX',
+                        help="replay recorded traces instead of searching (same map options)")
+    parser.add_argument('--agents', type=int,
+                        help="show this many agents steered by shared flow fields instead")
+    return parser.parse_args()
 
 def main():
-    visualizer = Maze2DVisualizer()
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        importlib.import_module(COMMANDS[sys.argv[1]]).main(sys.argv[2:])
+        return
+    from modules.visualizer import CrowdVisualizer, Maze2DVisualizer
+    args = parse_args()
+    options = {'steps_per_frame': args.steps_per_frame, 'ms_per_frame': args.ms_per_frame,
+              'frontier': args.frontier, 'bidirectional': args.bidirectional,
+              'landmarks': args.landmarks, 'epsilon': args.epsilon, 'anytime': args.anytime,
+              'deadline': args.deadline_ms / 1000.0 if args.deadline_ms else None,
+              'record': args.record, 'replay': args.replay}
+    grid = None
+    endpoints = None
+    if args.scen:
+        entry = next(itertools.islice(read_scen(args.scen), args.scen_index, None), None)
+        if entry is None:
+            sys.exit(f"{args.scen} has no entry {args.scen_index}")
+        grid = load_grid(args.map or scen_map_path(args.scen, entry))
+        endpoints = {'start': entry.start, 'goal': entry.goal}
+    elif args.map:
+        grid = load_grid(args.map)
+        start, goal = default_endpoints(grid)
+        endpoints = {'start': start, 'goal': goal}
+    elif args.width:
+        grid = generate_grid(args.width, args.height or args.width, seed=args.seed,
+                             obstacle_density=args.obstacles, slow_density=args.slow,
+                             style=args.style)
+        endpoints = {'goal': (grid.rows - 1, grid.cols - 1)}
+    if args.diagonal or args.height_penalty:
+        if grid is None:
+            grid, endpoints = create_grid()[0], {}
+        grid.set_cost_model(CostModel(diagonal=args.diagonal,
+                                      height_penalty=args.height_penalty))
+    if args.save_map:
+        save_grid(grid if grid is not None else create_grid()[0], args.save_map)
+    if args.agents:
+        visualizer = CrowdVisualizer(grid, agents=args.agents, seed=args.seed)
+    elif grid is not None:
+        visualizer = Maze2DVisualizer(grid, **endpoints, **options)
+    else:
+        visualizer = Maze2DVisualizer(**options)
     visualizer.run()
 
 if __name__ == '__main__':
@@ -1,7 +1,46 @@
-from .algorithms import astar_step, dijkstra_step, heuristic
-from .agent import PathAgent
-from .grid import create_grid, START, GOAL
-from .visualizer import Maze2DVisualizer
+"""
+Pathfinding package. Names are imported lazily on first access so that headless users
+(batch workers, benchmarks) never pay for, or require, pygame.
+"""
+import importlib
+from typing import Any
 
-__all__ = ['Maze2DVisualizer', 'astar_step', 'dijkstra_step', 
-           'heuristic', 'PathAgent', 'create_grid', 'START', 'GOAL']
+_EXPORTS = {
+    'astar_step': 'algorithms', 'dijkstra_step': 'algorithms',
+    'astar_search': 'algorithms', 'dijkstra_search': 'algorithms',
+    'SearchResult': 'algorithms', 'PathView': 'algorithms', 'heuristic': 'algorithms',
+    'bidirectional_astar_step': 'algorithms', 'bidirectional_dijkstra_step': 'algorithms',
+    'bidirectional_astar_search': 'algorithms', 'bidirectional_dijkstra_search': 'algorithms',
+    'BidirectionalState': 'algorithms', 'hpa_search': 'algorithms', 'alt_search': 'algorithms',
+    'weighted_astar_search': 'algorithms', 'anytime_search': 'algorithms',
+    'AnytimeState': 'algorithms',
+    'SOLVERS': 'algorithms',
+    'Landmarks': 'landmarks', 'grid_landmarks': 'landmarks',
+    'DStarLite': 'replan',
+    'FlowField': 'flowfield', 'Crowd': 'flowfield', 'flow_field': 'flowfield',
+    'distance_field': 'flowfield',
+    'PathCache': 'cache', 'DijkstraTree': 'cache',
+    'ClusterGraph': 'hierarchy', 'HierarchicalPath': 'hierarchy', 'cluster_graph': 'hierarchy',
+    'PathService': 'service', 'ServiceClient': 'service',
+    'TraceWriter': 'trace', 'TraceReader': 'trace', 'record_search': 'trace',
+    'SearchStats': 'instrumentation', 'SearchState': 'searchstate',
+    'BucketQueue': 'frontier', 'IndexedHeap': 'frontier', 'make_frontier': 'frontier',
+    'FRONTIERS': 'frontier',
+    'PathAgent': 'agent',
+    'load_grid': 'mapio', 'save_grid': 'mapio', 'read_scen': 'mapio',
+    'Grid': 'grid', 'create_grid': 'grid', 'generate_grid': 'grid', 'reachable': 'grid',
+    'CostModel': 'grid', 'START': 'grid', 'GOAL': 'grid',
+    'Maze2DVisualizer': 'visualizer', 'CrowdVisualizer': 'visualizer',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,12 +1,15 @@
-from typing import List, Tuple, Dict
-from .algorithms import reconstruct_path
+from typing import Tuple, Optional, Sequence
+from .algorithms import PathView
 
 Point = Tuple[int, int]
 
 class PathAgent:
+    __slots__ = ('pos', 'path', 'path_index', 'moving', 'exploring', 'mouth_open',
+                 'animation_time', 'direction')
+
     def __init__(self, start_pos: Point) -> None:
         self.pos: Point = start_pos
-        self.path: List[Point] = []
+        self.path: Sequence[Point] = []
         self.path_index: int = 0
         self.moving: bool = False
         self.exploring: bool = True
@@ -14,19 +17,25 @@ class PathAgent:
         self.animation_time = 0
         self.direction = 0  # 0: right, 90: down, 180: left, 270: up
         
-    def set_exploration_path(self, current: Point, came_from: Dict[Point, Point]) -> None:
-        if not current:
+    def set_exploration_path(self, path: Optional[PathView]) -> None:
+        # The path stays lazy; only the frontier node is needed while exploring.
+        if path is None:
             return
-        self.path = reconstruct_path(came_from, current)
-        self.path_index = len(self.path) - 1
-        self.pos = current
+        self.path = path
+        self.pos = path.end_point
         
-    def set_final_path(self, path: List[Point]) -> None:
+    def set_final_path(self, path: Sequence[Point]) -> None:
         self.path = path
         self.path_index = 0
         self.moving = True
         self.exploring = False
         self.direction = 0  # Reset direction when new path is set
+
+    def reroute(self, path: Sequence[Point]) -> None:
+        # Keep moving, now along a repaired path that starts at the current cell.
+        self.path = path
+        self.path_index = 0
+        self.moving = len(path) > 1
         
     def move_step(self) -> bool:
         if self.moving and self.path_index < len(self.path) - 1:
@@ -1,28 +1,73 @@
 """
 This module implements A* and Dijkstra search steps with helper functions.
+Searches run on flat cell indices of a Grid (see grid.Grid.index); points are only
+converted back to (row, col) tuples at the API boundary.
 """
 import heapq
-from typing import Tuple, List, Dict, Generator, Any
+import math
+import time
+import tracemalloc
+from typing import (TYPE_CHECKING, Tuple, List, Dict, Generator, Any, Callable, NamedTuple,
+                    Optional, Iterator, Sequence, Set)
+
+from .frontier import frontier_functions, make_frontier, min_priority
+from .grid import Grid
+from .instrumentation import SearchStats
+from .searchstate import ClosedView, SearchState, borrowed_state
+
+if TYPE_CHECKING:
+    from .landmarks import Landmarks
 
 # Type aliases for clarity.
 Point = Tuple[int, int]
-Grid = List[List[int]]
-CameFrom = Dict[Point, Point]
-GScore = Dict[Point, float]
+CameFrom = Dict[int, int]
+GScore = Dict[int, float]
+Heuristic = Optional[Callable[[int], float]]
+
+class SearchResult(NamedTuple):
+    """Outcome of a run-to-completion search."""
+    path: List[Point]
+    cost: float
+    expanded: int
+    visited: int
+
+    @property
+    def found(self) -> bool:
+        return bool(self.path)
 
 def heuristic(a: Point, b: Point) -> int:
     """Manhattan distance heuristic."""
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def neighbors(pos: Point, grid: Grid) -> Generator[Tuple[Point, int], None, None]:
+def manhattan_to(grid: Grid, goal: int) -> Callable[[int], int]:
+    """Return a Manhattan distance heuristic on cell indices of grid towards goal."""
+    stride = grid.stride
+    goal_row, goal_col = divmod(goal, stride)
+    def h(index: int) -> int:
+        row, col = divmod(index, stride)
+        return abs(row - goal_row) + abs(col - goal_col)
+    return h
+
+def weighted(h: Callable[[int], int], epsilon: float) -> Callable[[int], int]:
+    """
+    Inflate a heuristic by epsilon for weighted A*. Values are rounded down, which keeps
+    priorities integral (so Dial buckets still apply) and the path within epsilon times
+    the optimum.
+    """
+    if epsilon == 1:
+        return h
+    if epsilon < 1:
+        raise ValueError("epsilon must be at least 1")
+    return lambda index: int(epsilon * h(index))
+
+def neighbors(index: int, grid: Grid) -> Generator[Tuple[int, int], None, None]:
     """Yield valid neighbor cells and their cost."""
-    x, y = pos
-    for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-        nx, ny = x + dx, y + dy
-        if 0 <= nx < len(grid) and 0 <= ny < len(grid[0]) and grid[nx][ny] != 1:
-            yield (nx, ny), (2 if grid[nx][ny] == 2 else 1)
+    for offset, costs in grid.moves:
+        cost = costs[index]
+        if cost:
+            yield index + offset, cost
 
-def reconstruct_path(came_from: CameFrom, current: Point) -> List[Point]:
+def reconstruct_path(came_from: CameFrom, current: int) -> List[int]:
     """Reconstruct path from start to current."""
     path = [current]
     while current in came_from:
@@ -30,52 +75,691 @@ def reconstruct_path(came_from: CameFrom, current: Point) -> List[Point]:
         path.append(current)
     return path[::-1]
 
-def astar_step(grid: Grid, start: Point, goal: Point, open_set: List[Any],
-               closed_set: set, came_from: CameFrom, g_score: GScore
-              ) -> Tuple[Any, bool, Any, CameFrom]:
-    """Perform one A* algorithm step and return current best candidate path."""
-    if not open_set:
-        return None, True, None, {}
-    
-    current_f, current = heapq.heappop(open_set)
-    if current == goal:
-        return current, True, reconstruct_path(came_from, current), came_from
-    
-    closed_set.add(current)
-    
-    for neighbor, cost in neighbors(current, grid):
-        if neighbor in closed_set:
+class PathView(Sequence[Point]):
+    """
+    Start-to-end path read lazily from a search's parent map.
+    Nothing is walked until the path is first indexed, iterated or measured, and the
+    result is then cached, so a step that nobody inspects costs nothing.
+    """
+    __slots__ = ('grid', 'came_from', 'end', '_cells', '_members')
+
+    def __init__(self, grid: Grid, came_from: CameFrom, end: int) -> None:
+        self.grid = grid
+        self.came_from = came_from
+        self.end = end
+        self._cells: Optional[List[Point]] = None
+        self._members: Optional[Set[Point]] = None
+
+    @property
+    def end_point(self) -> Point:
+        return self.grid.point(self.end)
+
+    def indices(self) -> List[int]:
+        return reconstruct_path(self.came_from, self.end)
+
+    def cells(self) -> List[Point]:
+        if self._cells is None:
+            point = self.grid.point
+            self._cells = [point(index) for index in self.indices()]
+        return self._cells
+
+    def __len__(self) -> int:
+        return len(self.cells())
+
+    def __getitem__(self, index):
+        return self.cells()[index]
+
+    def __iter__(self) -> Iterator[Point]:
+        return iter(self.cells())
+
+    def members(self) -> Set[Point]:
+        """The path's cells as a set, for O(1) membership tests."""
+        if self._members is None:
+            self._members = set(self.cells())
+        return self._members
+
+    def __contains__(self, pos: object) -> bool:
+        return pos in self.members()
+
+    def __repr__(self) -> str:
+        return f"PathView(end={self.end_point!r})"
+
+class JoinedPathView(PathView):
+    """
+    Path of a bidirectional search: start to the meeting cell through the forward parent
+    map, then on to the goal through the backward search's next_hop map.
+    """
+    __slots__ = ('next_hop',)
+
+    def __init__(self, grid: Grid, came_from: CameFrom, meeting: int,
+                 next_hop: CameFrom) -> None:
+        super().__init__(grid, came_from, meeting)
+        self.next_hop = next_hop
+
+    @property
+    def end_point(self) -> Point:
+        return self.cells()[-1]
+
+    def indices(self) -> List[int]:
+        path = reconstruct_path(self.came_from, self.end)
+        current, next_hop = self.end, self.next_hop
+        while current in next_hop:
+            current = next_hop[current]
+            path.append(current)
+        return path
+
+    def __repr__(self) -> str:
+        return f"JoinedPathView(meeting={self.grid.point(self.end)!r})"
+
+def _search(grid: Grid, goal: int, open_set: Any, closed_set: set,
+            came_from: CameFrom, g_score: GScore, h: Heuristic,
+            max_expansions: Optional[int] = None, pop: Callable = heapq.heappop,
+            push: Callable = heapq.heappush) -> Tuple[Optional[int], bool, int]:
+    """
+    Core search loop shared by the step and full-search functions.
+    Expands up to max_expansions nodes (no limit if None) and returns the last node popped,
+    whether the search is finished and how many nodes were expanded. A finished search
+    returns the goal if it was reached and None if the open set ran out. Entries for nodes
+    that were closed after being queued are skipped without counting as expansions. pop
+    and push drive the open set (see frontier.frontier_functions) and are replaced by
+    counting versions when the search is instrumented. Given the views of a SearchState, the
+    search runs on its arrays.
+    """
+    if isinstance(closed_set, ClosedView):
+        return _search_arrays(grid, goal, open_set, closed_set.state, h, max_expansions, pop,
+                              push)
+    moves = grid.moves
+    current = None
+    expanded = 0
+    while True:
+        if expanded == max_expansions:
+            return current, False, expanded
+        if not open_set:
+            return None, True, expanded
+        _, current = pop(open_set)
+        if current in closed_set:
             continue
-        tentative_g = g_score[current] + cost
-        if neighbor not in g_score or tentative_g < g_score[neighbor]:
-            came_from[neighbor] = current
-            g_score[neighbor] = tentative_g
-            heapq.heappush(open_set, (tentative_g + heuristic(neighbor, goal), neighbor))
-    
-    best_path = reconstruct_path(came_from, current)
-    return current, False, best_path, came_from
-
-def dijkstra_step(grid: Grid, start: Point, goal: Point, open_set: List[Any],
-                  closed_set: set, came_from: CameFrom, g_score: GScore
-                 ) -> Tuple[Any, bool, Any, CameFrom]:
-    """Perform one Dijkstra algorithm step and return current best candidate path."""
-    if not open_set:
+        if current == goal:
+            return current, True, expanded
+        closed_set.add(current)
+        expanded += 1
+        current_g = g_score[current]
+        for offset, costs in moves:
+            cost = costs[current]
+            if not cost:
+                continue
+            neighbor = current + offset
+            if neighbor in closed_set:
+                continue
+            tentative_g = current_g + cost
+            if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g
+                push(open_set, (tentative_g + h(neighbor) if h else tentative_g, neighbor))
+
+def _search_arrays(grid: Grid, goal: int, open_set: Any, state: SearchState, h: Heuristic,
+                   max_expansions: Optional[int] = None, pop: Callable = heapq.heappop,
+                   push: Callable = heapq.heappush) -> Tuple[Optional[int], bool, int]:
+    """_search on the flat arrays of a SearchState instead of dicts and a set."""
+    moves = grid.moves
+    g, parent, seen, closed = state.g, state.parent, state.seen, state.closed
+    mark, closed_mark = state.generation, state.closed_generation
+    current = None
+    expanded = 0
+    try:
+        while True:
+            if expanded == max_expansions:
+                return current, False, expanded
+            if not open_set:
+                return None, True, expanded
+            _, current = pop(open_set)
+            if closed[current] == closed_mark:
+                continue
+            if current == goal:
+                return current, True, expanded
+            closed[current] = closed_mark
+            expanded += 1
+            current_g = g[current]
+            for offset, costs in moves:
+                cost = costs[current]
+                if not cost:
+                    continue
+                neighbor = current + offset
+                if closed[neighbor] == closed_mark:
+                    continue
+                tentative_g = current_g + cost
+                # A cell seen in this generation has a g-score (or NO_SCORE, which any
+                # real cost beats).
+                if seen[neighbor] != mark or tentative_g < g[neighbor]:
+                    seen[neighbor] = mark
+                    parent[neighbor] = current
+                    g[neighbor] = tentative_g
+                    push(open_set, (tentative_g + h(neighbor) if h else tentative_g, neighbor))
+    finally:
+        state.closed_count += expanded
+
+def _step(grid: Grid, goal: int, open_set: Any, closed_set: set,
+          came_from: CameFrom, g_score: GScore, h: Heuristic,
+          stats: Optional[SearchStats] = None) -> Tuple[Any, bool, Any, CameFrom]:
+    pop, push = frontier_functions(open_set)
+    if stats is None:
+        current, done, _ = _search(grid, goal, open_set, closed_set, came_from, g_score, h, 1,
+                                   pop, push)
+    else:
+        started = time.perf_counter()
+        pop, push = stats.instrument(open_set, closed_set, pop, push)
+        current, done, _ = _search(grid, goal, open_set, closed_set, came_from, g_score, h, 1,
+                                   pop, push)
+        stats.elapsed += time.perf_counter() - started
+    if current is None:
         return None, True, None, {}
-    
-    current_g, current = heapq.heappop(open_set)
-    if current == goal:
-        return current, True, reconstruct_path(came_from, current), came_from
-    
-    closed_set.add(current)
-    
-    for neighbor, cost in neighbors(current, grid):
-        if neighbor in closed_set:
+    return current, done, PathView(grid, came_from, current), came_from
+
+def _run(grid: Grid, start: Point, goal: Point, astar: bool,
+         stats: Optional[SearchStats] = None, frontier: str = 'heap',
+         landmarks: Optional['Landmarks'] = None, epsilon: float = 1.0) -> SearchResult:
+    if not (grid.is_passable(start) and grid.is_passable(goal)):
+        raise ValueError(f"start {start} and goal {goal} must be passable cells of the grid")
+    source, target = grid.index(start), grid.index(goal)
+    h = None
+    if astar:
+        h = landmarks.heuristic(target, source) if landmarks else grid.heuristic(target)
+        h = weighted(h, epsilon)
+    open_set = make_frontier(frontier, [(h(source) if h else 0, source)])
+    pop, push = frontier_functions(open_set)
+    # Scores, parents and closed flags live in this thread's reusable SearchState arrays.
+    with borrowed_state(grid.size, source) as state:
+        closed_set, came_from, g_score = state.views()
+        if stats is None:
+            current, _, expanded = _search_arrays(grid, target, open_set, state, h, None, pop,
+                                                  push)
+        else:
+            tracing = stats.trace_memory and not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            started = time.perf_counter()
+            pop, push = stats.instrument(open_set, closed_set, pop, push)
+            current, _, expanded = _search_arrays(grid, target, open_set, state, h, None, pop,
+                                                  push)
+            stats.elapsed += time.perf_counter() - started
+            if stats.trace_memory:
+                stats.peak_memory = max(stats.peak_memory, tracemalloc.get_traced_memory()[1])
+            if tracing:
+                tracemalloc.stop()
+        if current is None:
+            return SearchResult([], math.inf, expanded, len(closed_set))
+        return SearchResult(PathView(grid, came_from, current).cells(), g_score[current],
+                            expanded, len(closed_set))
+
+def astar_step(grid: Grid, start: int, goal: int, open_set: Any,
+               closed_set: set, came_from: CameFrom, g_score: GScore,
+               stats: Optional[SearchStats] = None,
+               landmarks: Optional['Landmarks'] = None,
+               epsilon: float = 1.0) -> Tuple[Any, bool, Any, CameFrom]:
+    """
+    Perform one A* algorithm step and return current best candidate path.
+    The heuristic matches the grid's cost model (see grid.CostModel.heuristic): scaled
+    Manhattan distance, or octile distance with diagonal moves. With landmarks (see
+    landmarks.Landmarks), the landmark heuristic replaces it. An epsilon above 1 runs
+    weighted A*, which inflates the heuristic to expand fewer cells and returns a path at
+    most epsilon times the optimal cost.
+    """
+    h = landmarks.heuristic(goal, start) if landmarks else grid.heuristic(goal)
+    return _step(grid, goal, open_set, closed_set, came_from, g_score, weighted(h, epsilon),
+                 stats)
+
+def dijkstra_step(grid: Grid, start: int, goal: int, open_set: Any,
+                  closed_set: set, came_from: CameFrom, g_score: GScore,
+                  stats: Optional[SearchStats] = None) -> Tuple[Any, bool, Any, CameFrom]:
+    """Perform one Dijkstra algorithm step and return current best candidate path."""
+    return _step(grid, goal, open_set, closed_set, came_from, g_score, None, stats)
+
+def astar_search(grid: Grid, start: Point, goal: Point,
+                 stats: Optional[SearchStats] = None, frontier: str = 'heap',
+                 landmarks: Optional['Landmarks'] = None, epsilon: float = 1.0) -> SearchResult:
+    """Run A* from start to goal without yielding between expansions."""
+    return _run(grid, start, goal, True, stats, frontier, landmarks, epsilon)
+
+def weighted_astar_search(grid: Grid, start: Point, goal: Point,
+                          stats: Optional[SearchStats] = None, frontier: str = 'heap',
+                          epsilon: float = 1.5) -> SearchResult:
+    """Run weighted A*: a path costing at most epsilon times the optimum, found sooner."""
+    return _run(grid, start, goal, True, stats, frontier, None, epsilon)
+
+def dijkstra_search(grid: Grid, start: Point, goal: Point,
+                    stats: Optional[SearchStats] = None, frontier: str = 'heap') -> SearchResult:
+    """Run Dijkstra from start to goal without yielding between expansions."""
+    return _run(grid, start, goal, False, stats, frontier)
+
+class BidirectionalState:
+    """
+    State of a bidirectional search besides the forward search's closed set, parent map and
+    g-scores: both frontiers, the backward search from the goal and the best meeting found
+    so far. It is passed as the open_set of a bidirectional step function.
+
+    With astar, both searches use the average potential (h_goal - h_start) / 2 of the
+    cost model's heuristics towards either end, which is consistent in both directions. Keys
+    are doubled to keep them integral, so Dial buckets still apply.
+    """
+    __slots__ = ('forward', 'backward', 'backward_closed', 'next_hop', 'backward_g',
+                 'potential', 'scale', 'best', 'meeting')
+
+    def __init__(self, grid: Grid, start: int, goal: int, astar: bool,
+                 frontier: str = 'heap') -> None:
+        self.potential: Heuristic = None
+        self.scale = 1
+        if astar:
+            to_goal, to_start = grid.heuristic(goal), grid.heuristic(start)
+            self.potential = lambda index: to_goal(index) - to_start(index)
+            self.scale = 2
+        p = self.potential
+        self.forward = make_frontier(frontier, [(p(start) if p else 0, start)])
+        self.backward = make_frontier(frontier, [(-p(goal) if p else 0, goal)])
+        self.backward_closed: Set[int] = set()
+        self.next_hop: CameFrom = {}   # backward parent map, pointing towards the goal
+        self.backward_g: GScore = {goal: 0}
+        self.best = 0 if start == goal else math.inf
+        self.meeting: Optional[int] = start if start == goal else None
+
+def _bidirectional_search(grid: Grid, state: BidirectionalState, closed_set: set,
+                          came_from: CameFrom, g_score: GScore,
+                          max_expansions: Optional[int] = None,
+                          forward_ops: Optional[Tuple[Callable, Callable]] = None,
+                          backward_ops: Optional[Tuple[Callable, Callable]] = None
+                          ) -> Tuple[Optional[int], bool, bool, int]:
+    """
+    Core loop of the bidirectional searches. Each expansion comes from the side with the
+    smaller frontier; every time a cell gets a better label on one side while the other
+    side has labelled it too, the meeting through that cell is a candidate path. The search
+    stops once the smallest forward and backward keys add up to at least the best candidate
+    (scaled like the keys), which is exact on weighted terrain as long as the keys come from
+    consistent potentials. Returns the last cell expanded, whether the search is finished,
+    whether that cell was expanded forwards and how many cells were expanded.
+    """
+    forward_ops = forward_ops or frontier_functions(state.forward)
+    backward_ops = backward_ops or frontier_functions(state.backward)
+    sides = ((state.forward, closed_set, came_from, g_score, state.backward_g, grid.moves,
+              1) + tuple(forward_ops),
+             (state.backward, state.backward_closed, state.next_hop, state.backward_g, g_score,
+              grid.reverse_moves, -1) + tuple(backward_ops))
+    forward, backward = state.forward, state.backward
+    p, scale = state.potential, state.scale
+    bound = scale * state.best
+    current = None
+    is_forward = True
+    expanded = 0
+    while True:
+        if expanded == max_expansions:
+            return current, False, is_forward, expanded
+        if (not forward or not backward or
+                min_priority(forward) + min_priority(backward) >= bound):
+            return state.meeting, True, is_forward, expanded
+        is_forward = len(forward) <= len(backward)
+        open_set, closed, parents, g, other_g, moves, sign, pop, push = sides[not is_forward]
+        _, current = pop(open_set)
+        if current in closed:
             continue
-        tentative_g = g_score[current] + cost
-        if neighbor not in g_score or tentative_g < g_score[neighbor]:
-            came_from[neighbor] = current
-            g_score[neighbor] = tentative_g
-            heapq.heappush(open_set, (tentative_g, neighbor))
-    
-    best_path = reconstruct_path(came_from, current)
-    return current, False, best_path, came_from
+        closed.add(current)
+        expanded += 1
+        current_g = g[current]
+        for offset, costs in moves:
+            cost = costs[current]
+            if not cost:
+                continue
+            neighbor = current + offset
+            if neighbor in closed:
+                continue
+            tentative_g = current_g + cost
+            if neighbor not in g or tentative_g < g[neighbor]:
+                parents[neighbor] = current
+                g[neighbor] = tentative_g
+                push(open_set, (scale * tentative_g + sign * p(neighbor) if p else tentative_g,
+                                neighbor))
+                other = other_g.get(neighbor)
+                if other is not None and tentative_g + other < state.best:
+                    state.best = tentative_g + other
+                    state.meeting = neighbor
+                    bound = scale * state.best
+
+def _joined_path(grid: Grid, state: BidirectionalState, came_from: CameFrom) -> JoinedPathView:
+    return JoinedPathView(grid, came_from, state.meeting, state.next_hop)
+
+def _bidirectional_step(grid: Grid, state: BidirectionalState, closed_set: set,
+                        came_from: CameFrom, g_score: GScore,
+                        stats: Optional[SearchStats] = None) -> Tuple[Any, bool, Any, CameFrom]:
+    if stats is None:
+        current, done, is_forward, _ = _bidirectional_search(grid, state, closed_set,
+                                                             came_from, g_score, 1)
+    else:
+        started = time.perf_counter()
+        forward_ops = stats.instrument(state.forward, closed_set,
+                                       *frontier_functions(state.forward))
+        backward_ops = stats.instrument(state.backward, state.backward_closed,
+                                        *frontier_functions(state.backward))
+        current, done, is_forward, _ = _bidirectional_search(
+            grid, state, closed_set, came_from, g_score, 1, forward_ops, backward_ops)
+        stats.elapsed += time.perf_counter() - started
+    if done:
+        if current is None:
+            return None, True, None, {}
+        return current, True, _joined_path(grid, state, came_from), came_from
+    # Only the forward frontier has a path from the start to show.
+    return current, False, PathView(grid, came_from, current) if is_forward else None, came_from
+
+def _run_bidirectional(grid: Grid, start: Point, goal: Point, astar: bool,
+                       stats: Optional[SearchStats] = None,
+                       frontier: str = 'heap') -> SearchResult:
+    if not (grid.is_passable(start) and grid.is_passable(goal)):
+        raise ValueError(f"start {start} and goal {goal} must be passable cells of the grid")
+    source, target = grid.index(start), grid.index(goal)
+    state = BidirectionalState(grid, source, target, astar, frontier)
+    closed_set: Set[int] = set()
+    came_from: CameFrom = {}
+    g_score: GScore = {source: 0}
+    if stats is None:
+        meeting, _, _, expanded = _bidirectional_search(grid, state, closed_set, came_from,
+                                                        g_score)
+    else:
+        tracing = stats.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        started = time.perf_counter()
+        forward_ops = stats.instrument(state.forward, closed_set,
+                                       *frontier_functions(state.forward))
+        backward_ops = stats.instrument(state.backward, state.backward_closed,
+                                        *frontier_functions(state.backward))
+        meeting, _, _, expanded = _bidirectional_search(grid, state, closed_set, came_from,
+                                                        g_score, None, forward_ops,
+                                                        backward_ops)
+        stats.elapsed += time.perf_counter() - started
+        if stats.trace_memory:
+            stats.peak_memory = max(stats.peak_memory, tracemalloc.get_traced_memory()[1])
+        if tracing:
+            tracemalloc.stop()
+    visited = len(closed_set) + len(state.backward_closed)
+    if meeting is None:
+        return SearchResult([], math.inf, expanded, visited)
+    return SearchResult(_joined_path(grid, state, came_from).cells(), state.best,
+                        expanded, visited)
+
+def bidirectional_astar_step(grid: Grid, start: int, goal: int, open_set: BidirectionalState,
+                             closed_set: set, came_from: CameFrom, g_score: GScore,
+                             stats: Optional[SearchStats] = None
+                             ) -> Tuple[Any, bool, Any, CameFrom]:
+    """
+    Perform one bidirectional A* expansion, from whichever end has the smaller frontier.
+    open_set is a BidirectionalState(grid, start, goal, astar=True); closed_set, came_from
+    and g_score hold the forward search as in astar_step.
+    """
+    return _bidirectional_step(grid, open_set, closed_set, came_from, g_score, stats)
+
+def bidirectional_dijkstra_step(grid: Grid, start: int, goal: int,
+                                open_set: BidirectionalState, closed_set: set,
+                                came_from: CameFrom, g_score: GScore,
+                                stats: Optional[SearchStats] = None
+                                ) -> Tuple[Any, bool, Any, CameFrom]:
+    """
+    Perform one bidirectional Dijkstra expansion. open_set is a
+    BidirectionalState(grid, start, goal, astar=False).
+    """
+    return _bidirectional_step(grid, open_set, closed_set, came_from, g_score, stats)
+
+def bidirectional_astar_search(grid: Grid, start: Point, goal: Point,
+                               stats: Optional[SearchStats] = None,
+                               frontier: str = 'heap') -> SearchResult:
+    """Run bidirectional A* from start and goal until the two searches provably meet."""
+    return _run_bidirectional(grid, start, goal, True, stats, frontier)
+
+def bidirectional_dijkstra_search(grid: Grid, start: Point, goal: Point,
+                                  stats: Optional[SearchStats] = None,
+                                  frontier: str = 'heap') -> SearchResult:
+    """Run bidirectional Dijkstra from start and goal until the two searches provably meet."""
+    return _run_bidirectional(grid, start, goal, False, stats, frontier)
+
+class AnytimeSolution(NamedTuple):
+    """One solution of an anytime search, in the order they were found."""
+    path: PathView
+    cost: float
+    epsilon: float   # inflation the solution was found with
+    bound: float     # proven suboptimality bound: cost <= bound * optimal cost
+    elapsed: float   # search seconds when it was found
+
+class AnytimeResult(NamedTuple):
+    """Outcome of anytime_search: the best path found plus every improving solution."""
+    path: List[Point]
+    cost: float
+    expanded: int
+    visited: int
+    bound: float
+    solutions: List[AnytimeSolution]
+
+    @property
+    def found(self) -> bool:
+        return bool(self.path)
+
+class AnytimeState:
+    """
+    State of an ARA* (anytime repairing A*) search besides the closed set, parent map and
+    g-scores; it is passed as the open_set of anytime_astar_step.
+
+    Each iteration is a weighted A* with inflation epsilon that reuses the previous
+    iteration's g-scores. Cells whose g-score improves after they were closed wait in
+    incons and rejoin the open set when epsilon is lowered, so an iteration only repairs
+    what the tighter epsilon changes. The search stops after the final_epsilon iteration or
+    at the first iteration boundary past deadline seconds of search time (deadline and
+    elapsed count only time spent inside the search, not pauses between steps). A first
+    solution is always completed, even past the deadline.
+    """
+    __slots__ = ('grid', 'goal', 'h', 'epsilon', 'final_epsilon', 'decrement', 'deadline',
+                 'frontier', 'open', 'in_open', 'incons', 'elapsed', 'solutions')
+
+    def __init__(self, grid: Grid, start: int, goal: int, epsilon: float = 3.0,
+                 final_epsilon: float = 1.0, decrement: float = 0.5,
+                 deadline: Optional[float] = None, frontier: str = 'heap') -> None:
+        if final_epsilon < 1 or epsilon < final_epsilon:
+            raise ValueError("epsilon must be at least final_epsilon, which must be at least 1")
+        self.grid = grid
+        self.goal = goal
+        self.h = grid.heuristic(goal)
+        self.epsilon = epsilon
+        self.final_epsilon = final_epsilon
+        self.decrement = decrement
+        self.deadline = deadline
+        self.frontier = frontier
+        self.open = make_frontier(frontier, [(int(epsilon * self.h(start)), start)])
+        self.in_open: Set[int] = {start}
+        self.incons: Set[int] = set()
+        self.elapsed = 0.0
+        self.solutions: List[AnytimeSolution] = []
+
+    def __len__(self) -> int:
+        return len(self.in_open)
+
+    @property
+    def bound(self) -> float:
+        return self.solutions[-1].bound if self.solutions else math.inf
+
+    def publish(self, came_from: CameFrom, g_score: GScore) -> AnytimeSolution:
+        """Record the current path to the goal with its suboptimality bound."""
+        cost = g_score[self.goal]
+        h = self.h
+        pending = self.in_open | self.incons
+        lower = min((g_score[cell] + h(cell) for cell in pending), default=math.inf)
+        bound = max(1.0, min(self.epsilon, cost / lower if lower else math.inf))
+        # Later iterations rewrite came_from, so keep this path's own parent links.
+        indices = reconstruct_path(came_from, self.goal)
+        path = PathView(self.grid, dict(zip(indices[1:], indices)), self.goal)
+        solution = AnytimeSolution(path, cost, self.epsilon, bound, self.elapsed)
+        self.solutions.append(solution)
+        return solution
+
+    def lower_epsilon(self, g_score: GScore) -> None:
+        """Start the next iteration: tighten epsilon and requeue open and inconsistent cells."""
+        self.epsilon = max(self.final_epsilon, self.epsilon - self.decrement)
+        self.in_open |= self.incons
+        self.incons = set()
+        h, epsilon = self.h, self.epsilon
+        self.open = make_frontier(self.frontier, [(g_score[cell] + int(epsilon * h(cell)), cell)
+                                                  for cell in self.in_open])
+
+def _anytime_search(grid: Grid, state: AnytimeState, closed_set: set, came_from: CameFrom,
+                    g_score: GScore, max_expansions: Optional[int] = None,
+                    pop: Optional[Callable] = None, push: Optional[Callable] = None
+                    ) -> Tuple[Optional[int], bool, bool, int]:
+    """
+    Core ARA* loop. Expands up to max_expansions cells and returns the last cell expanded
+    (the goal once finished, None if it is unreachable), whether the search is finished,
+    whether a new solution was published and how many cells were expanded.
+    """
+    if pop is None or push is None:
+        pop, push = frontier_functions(state.open)
+    moves, goal, in_open = grid.moves, state.goal, state.in_open
+    started = time.perf_counter()
+    deadline = None if state.deadline is None else started + state.deadline - state.elapsed
+    current = None
+    found = False
+    expanded = 0
+    try:
+        while True:
+            if expanded == max_expansions:
+                return current, False, found, expanded
+            goal_g = g_score.get(goal, math.inf)
+            if not in_open or goal_g <= min_priority(state.open):
+                # No open cell can improve the goal under this epsilon: the iteration is done.
+                if goal_g == math.inf:
+                    return None, True, found, expanded
+                state.elapsed += time.perf_counter() - started
+                started = time.perf_counter()
+                state.publish(came_from, g_score)
+                found = True
+                if (state.epsilon <= state.final_epsilon or
+                        (deadline is not None and started >= deadline)):
+                    return goal, True, found, expanded
+                state.lower_epsilon(g_score)
+                in_open = state.in_open
+                closed_set.clear()
+                continue
+            if deadline is not None and state.solutions and time.perf_counter() >= deadline:
+                return goal, True, found, expanded
+            _, current = pop(state.open)
+            if current not in in_open:
+                continue
+            in_open.discard(current)
+            closed_set.add(current)
+            expanded += 1
+            current_g = g_score[current]
+            h, epsilon, incons = state.h, state.epsilon, state.incons
+            for offset, costs in moves:
+                cost = costs[current]
+                if not cost:
+                    continue
+                neighbor = current + offset
+                tentative_g = current_g + cost
+                if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    if neighbor in closed_set:
+                        incons.add(neighbor)
+                    else:
+                        in_open.add(neighbor)
+                        push(state.open, (tentative_g + int(epsilon * h(neighbor)), neighbor))
+    finally:
+        state.elapsed += time.perf_counter() - started
+
+def anytime_astar_step(grid: Grid, start: int, goal: int, open_set: AnytimeState,
+                       closed_set: set, came_from: CameFrom, g_score: GScore,
+                       stats: Optional[SearchStats] = None) -> Tuple[Any, bool, Any, CameFrom]:
+    """
+    Perform one ARA* expansion. open_set is an AnytimeState(grid, start, goal, ...). Until
+    the first solution the path is the one to the cell just expanded; after that a path is
+    returned only when an iteration publishes a new solution (see open_set.solutions).
+    """
+    if stats is None:
+        current, done, found, _ = _anytime_search(grid, open_set, closed_set, came_from,
+                                                  g_score, 1)
+    else:
+        pop, push = stats.instrument(open_set.open, closed_set,
+                                     *frontier_functions(open_set.open))
+        started = time.perf_counter()
+        current, done, found, _ = _anytime_search(grid, open_set, closed_set, came_from,
+                                                  g_score, 1, pop, push)
+        stats.elapsed += time.perf_counter() - started
+    if done:
+        if current is None:
+            return None, True, None, {}
+        return current, True, open_set.solutions[-1].path, came_from
+    if found:
+        return current, False, open_set.solutions[-1].path, came_from
+    if open_set.solutions or current is None:
+        return current, False, None, came_from
+    return current, False, PathView(grid, came_from, current), came_from
+
+def anytime_search(grid: Grid, start: Point, goal: Point, stats: Optional[SearchStats] = None,
+                   frontier: str = 'heap', deadline: Optional[float] = None,
+                   epsilon: float = 3.0, final_epsilon: float = 1.0,
+                   decrement: float = 0.5) -> AnytimeResult:
+    """
+    Run ARA*: find a path quickly with heuristic inflation epsilon, then keep lowering it
+    by decrement and repairing the path until final_epsilon is reached or deadline seconds
+    have passed. The result holds the best path, its proven suboptimality bound and every
+    solution found on the way.
+    """
+    if not (grid.is_passable(start) and grid.is_passable(goal)):
+        raise ValueError(f"start {start} and goal {goal} must be passable cells of the grid")
+    source, target = grid.index(start), grid.index(goal)
+    state = AnytimeState(grid, source, target, epsilon, final_epsilon, decrement, deadline,
+                         frontier)
+    closed_set: Set[int] = set()
+    came_from: CameFrom = {}
+    g_score: GScore = {source: 0}
+    visited: Set[int] = set()
+    if stats is None:
+        pop, push = frontier_functions(state.open)
+    else:
+        pop, push = stats.instrument(state.open, closed_set, *frontier_functions(state.open))
+    # Expand in slices so cells closed by earlier iterations still count as visited.
+    expanded = 0
+    while True:
+        current, done, _, count = _anytime_search(grid, state, closed_set, came_from, g_score,
+                                                  4096, pop, push)
+        expanded += count
+        visited |= closed_set
+        if done:
+            break
+    if stats is not None:
+        stats.elapsed += state.elapsed
+    if current is None:
+        return AnytimeResult([], math.inf, expanded, len(visited), math.inf, [])
+    best = state.solutions[-1]
+    return AnytimeResult(best.path.cells(), best.cost, expanded, len(visited), best.bound,
+                         state.solutions)
+
+def hpa_search(grid: Grid, start: Point, goal: Point, stats: Optional[SearchStats] = None,
+               frontier: str = 'heap') -> SearchResult:
+    """
+    Run a hierarchical (HPA*) query on the grid's cluster graph, building it on first use.
+    Paths are near-optimal and their hops are refined on demand.
+    """
+    from .hierarchy import cluster_graph
+    return cluster_graph(grid).search(start, goal, stats, frontier)
+
+def alt_search(grid: Grid, start: Point, goal: Point, stats: Optional[SearchStats] = None,
+               frontier: str = 'heap') -> SearchResult:
+    """
+    Run A* with landmark (ALT) lower bounds, picking the grid's landmarks on first use.
+    Paths are optimal, like astar_search, with fewer expansions behind walls.
+    """
+    from .landmarks import grid_landmarks
+    return _run(grid, start, goal, True, stats, frontier, grid_landmarks(grid))
+
+# Run-to-completion solvers by name, as used by the batch runner.
+SOLVERS: Dict[str, Callable[[Grid, Point, Point], SearchResult]] = {
+    'astar': astar_search,
+    'dijkstra': dijkstra_search,
+    'bidirectional_astar': bidirectional_astar_search,
+    'bidirectional_dijkstra': bidirectional_dijkstra_search,
+    'hpa': hpa_search,
+    'alt': alt_search,
+    'weighted_astar': weighted_astar_search,
+    'anytime': anytime_search,
+}
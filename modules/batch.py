@@ -0,0 +1,219 @@
+"""
+Headless batch runner: solves scenario lists on a process pool and streams the results.
+
+Scenarios are JSON Lines records such as
+    {"map": "maze:512x512:7", "start": [0, 0], "goal": [511, 511], "algorithm": "astar"}
+or CSV rows with the columns map, start_row, start_col, goal_row, goal_col, algorithm.
+Moving AI .scen files are accepted too, with one algorithm for all of their entries.
+A map is "demo" (the built-in 15x15 map), "<style>:<width>x<height>[:<seed>]" for
+generate_grid, or the path of a .map or .grid file (see mapio), and algorithm is any key
+of algorithms.SOLVERS. Results are written as CSV or JSON Lines in completion order.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import (Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set,
+                    TextIO, Tuple)
+
+from .algorithms import SOLVERS
+from .cache import PathCache
+from .frontier import FRONTIERS
+from .instrumentation import SearchStats
+from .grid import Grid, MAP_STYLES, create_grid, generate_grid
+from .mapio import MAP_FORMATS, load_grid, read_scen, scen_map_path
+
+Point = Tuple[int, int]
+
+RESULT_FIELDS = ('id', 'map', 'start', 'goal', 'algorithm', 'found', 'cost', 'length',
+                 'expanded', 'time', 'error')
+STATS_FIELDS = ('pushes', 'pops', 'stale_pops', 'relaxations', 'peak_open')
+
+class Scenario(NamedTuple):
+    id: int
+    map: str
+    start: Point
+    goal: Point
+    algorithm: str
+
+def load_map(spec: str) -> Grid:
+    """Build the grid a map spec refers to."""
+    if spec == 'demo':
+        return create_grid()[0]
+    if spec.endswith(MAP_FORMATS):
+        return load_grid(spec)
+    style, _, rest = spec.partition(':')
+    size, _, seed = rest.partition(':')
+    if style not in MAP_STYLES or 'x' not in size:
+        raise ValueError(f"unrecognised map spec {spec!r}")
+    width, height = (int(n) for n in size.split('x'))
+    return generate_grid(width, height, seed=int(seed) if seed else None, style=style)
+
+def read_scenarios(path: str, algorithm: str = 'astar') -> Iterator[Scenario]:
+    """
+    Stream scenarios from a .csv, JSON Lines or Moving AI .scen file without loading it
+    whole. algorithm is the default for records that do not name one (all .scen entries).
+    """
+    if path.endswith('.scen'):
+        maps: Dict[str, str] = {}
+        for i, entry in enumerate(read_scen(path)):
+            if entry.map not in maps:
+                maps[entry.map] = scen_map_path(path, entry)
+            yield Scenario(i, maps[entry.map], entry.start, entry.goal, algorithm)
+        return
+    with open(path, newline='') as fh:
+        if path.endswith('.csv'):
+            for i, row in enumerate(csv.DictReader(fh)):
+                yield Scenario(i, row['map'],
+                               (int(row['start_row']), int(row['start_col'])),
+                               (int(row['goal_row']), int(row['goal_col'])),
+                               row.get('algorithm') or algorithm)
+        else:
+            for i, line in enumerate(line for line in fh if line.strip()):
+                record = json.loads(line)
+                yield Scenario(i, record['map'], tuple(record['start']), tuple(record['goal']),
+                               record.get('algorithm', algorithm))
+
+def chunk_scenarios(scenarios: Iterable[Scenario], size: int) -> Iterator[List[Scenario]]:
+    """Group consecutive scenarios on the same map into chunks of at most size."""
+    chunk: List[Scenario] = []
+    for scenario in scenarios:
+        if chunk and (len(chunk) >= size or scenario.map != chunk[0].map):
+            yield chunk
+            chunk = []
+        chunk.append(scenario)
+    if chunk:
+        yield chunk
+
+# Maps already built in this worker process, so each is loaded once per worker.
+_maps: Dict[str, Grid] = {}
+# Query cache of this worker process, if caching is enabled.
+_cache: Optional[PathCache] = None
+
+def worker_map(spec: str) -> Grid:
+    """The grid of a map spec, built on first use in this process and kept."""
+    grid = _maps.get(spec)
+    if grid is None:
+        grid = _maps[spec] = load_map(spec)
+    return grid
+
+def _worker_cache(size: int, frontier: str = 'heap') -> PathCache:
+    global _cache
+    if _cache is None or _cache.maxsize != size or _cache.frontier != frontier:
+        _cache = PathCache(size, frontier=frontier)
+    return _cache
+
+def solve_chunk(chunk: List[Scenario], with_stats: bool = False,
+                frontier: str = 'heap', cache_size: int = 0) -> List[dict]:
+    cache = _worker_cache(cache_size, frontier) if cache_size else None
+    results = []
+    for scenario in chunk:
+        row = {'id': scenario.id, 'map': scenario.map, 'start': list(scenario.start),
+               'goal': list(scenario.goal), 'algorithm': scenario.algorithm,
+               'found': False, 'cost': None, 'length': 0, 'expanded': 0, 'time': 0.0,
+               'error': ''}
+        try:
+            grid = worker_map(scenario.map)
+            solver = SOLVERS[scenario.algorithm]
+            stats = SearchStats() if with_stats else None
+            started = time.perf_counter()
+            if cache is None:
+                result = solver(grid, scenario.start, scenario.goal, stats=stats,
+                                frontier=frontier)
+            else:
+                result = cache.solve(grid, scenario.start, scenario.goal, scenario.algorithm,
+                                     stats)
+            row['time'] = time.perf_counter() - started
+        except (KeyError, ValueError, OSError) as exc:
+            row['error'] = f"{type(exc).__name__}: {exc}"
+        else:
+            row.update(found=result.found, cost=result.cost if result.found else None,
+                       length=len(result.path), expanded=result.expanded)
+            if stats is not None:
+                counters = stats.as_dict()
+                row.update((field, counters[field]) for field in STATS_FIELDS)
+        results.append(row)
+    return results
+
+def result_writer(fh: TextIO, fmt: str, with_stats: bool = False) -> Callable[[dict], None]:
+    if fmt == 'csv':
+        writer = csv.DictWriter(fh, RESULT_FIELDS + (STATS_FIELDS if with_stats else ()))
+        writer.writeheader()
+        def write(row: dict) -> None:
+            writer.writerow(dict(row, start=' '.join(map(str, row['start'])),
+                                 goal=' '.join(map(str, row['goal']))))
+            fh.flush()
+    else:
+        def write(row: dict) -> None:
+            fh.write(json.dumps(row) + '\n')
+            fh.flush()
+    return write
+
+def run_batch(scenarios: Iterable[Scenario], write: Callable[[dict], None],
+              workers: Optional[int] = None, chunk_size: int = 64,
+              with_stats: bool = False, frontier: str = 'heap', cache_size: int = 0) -> int:
+    """
+    Solve scenarios on a process pool and pass each result row to write as soon as its
+    chunk completes. At most a few chunks per worker are in flight, so arbitrarily long
+    scenario streams run in bounded memory. with_stats adds SearchStats counters to each
+    row and frontier picks the open-set implementation (see frontier.FRONTIERS). With
+    cache_size, each worker keeps a PathCache of that many results, so repeated queries and
+    repeated sources are answered without a new search. Returns the number of scenarios
+    solved.
+    """
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Set[Future] = set()
+
+        def drain() -> None:
+            nonlocal pending, count
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for row in future.result():
+                    write(row)
+                    count += 1
+
+        for chunk in chunk_scenarios(scenarios, chunk_size):
+            pending.add(pool.submit(solve_chunk, chunk, with_stats, frontier, cache_size))
+            if len(pending) >= workers * 2:
+                drain()
+        while pending:
+            drain()
+    return count
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='app.py batch',
+                                     description="Solve a scenario file on a process pool")
+    parser.add_argument('scenarios', help="scenario file (.csv, JSON Lines or Moving AI .scen)")
+    parser.add_argument('-o', '--output', help="result file (.csv or .jsonl); stdout if omitted")
+    parser.add_argument('-j', '--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=64, help="scenarios per task")
+    parser.add_argument('--stats', action='store_true', help="add search counters to each row")
+    parser.add_argument('--frontier', choices=FRONTIERS, default='heap',
+                        help="open-set implementation (default: heap)")
+    parser.add_argument('--algorithm', choices=SOLVERS, default='astar',
+                        help="solver for scenarios that do not name one (default: astar)")
+    parser.add_argument('--cache', type=int, default=0, metavar='SIZE',
+                        help="cache up to SIZE results per worker and reuse Dijkstra trees "
+                             "of repeated start cells")
+    args = parser.parse_args(argv)
+
+    fmt = 'csv' if args.output and args.output.endswith('.csv') else 'jsonl'
+    fh = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        write = result_writer(fh, fmt, args.stats)
+        started = time.perf_counter()
+        scenarios = read_scenarios(args.scenarios, args.algorithm)
+        count = run_batch(scenarios, write, args.workers, args.chunk_size, args.stats,
+                          args.frontier, args.cache)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    print(f"{count} scenarios in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
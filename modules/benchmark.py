@@ -0,0 +1,197 @@
+"""
+Benchmarks for the search core and the renderer.
+
+    python app.py bench -o bench.json                # run and save results
+    python app.py bench --compare bench.json         # run and flag regressions
+
+Search cases time the step functions (driven to completion one expansion at a time, with
+dict scores and again with a reused SearchState) and the full-search functions with each
+open-set implementation over generated maps of several sizes, obstacle densities and
+start/goal distances. Render cases time Maze2DVisualizer under the SDL dummy video driver.
+Every case reports 'seconds' (best of --repeat runs; per frame for render cases), which is
+the figure compared against a baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .algorithms import SOLVERS, astar_step, dijkstra_step
+from .frontier import FRONTIERS
+from .grid import Grid, generate_grid
+from .searchstate import SearchState
+
+STEP_FUNCTIONS = {'astar_step': astar_step, 'dijkstra_step': dijkstra_step}
+
+def best_of(repeat: int, run: Callable[[], object]) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run_steps(step, grid: Grid, start: int, goal: int, h0: int,
+              state: Optional[SearchState] = None) -> int:
+    open_set = [(h0, start)]
+    if state is None:
+        closed_set: Any = set()
+        came_from: Any = {}
+        g_score: Any = {start: 0}
+    else:
+        state.reset(start)
+        closed_set, came_from, g_score = state.views()
+    steps = 0
+    done = False
+    while not done:
+        _, done, _, _ = step(grid, start, goal, open_set, closed_set, came_from, g_score)
+        steps += 1
+    return steps
+
+def bench_search(sizes: Sequence[int], densities: Sequence[float],
+                 distances: Sequence[float], repeat: int,
+                 frontiers: Sequence[str] = FRONTIERS) -> List[dict]:
+    results = []
+    for size in sizes:
+        for density in densities:
+            for distance in distances:
+                far = max(1, round(distance * (size - 1)))
+                start, goal = (0, 0), (far, far)
+                grid = generate_grid(size, size, seed=size, obstacle_density=density,
+                                     goal=goal)
+                case = f"n={size}/density={density}/distance={distance}"
+                for name, solver in SOLVERS.items():
+                    for frontier in frontiers:
+                        result = solver(grid, start, goal, frontier=frontier)
+                        seconds = best_of(repeat,
+                                          lambda: solver(grid, start, goal, frontier=frontier))
+                        results.append({'name': f"search/{name}_search/{frontier}/{case}",
+                                        'seconds': seconds, 'expanded': result.expanded,
+                                        'us_per_expansion':
+                                            seconds / max(1, result.expanded) * 1e6})
+                for name, step in STEP_FUNCTIONS.items():
+                    source, target = grid.index(start), grid.index(goal)
+                    h0 = grid.heuristic(target)(source)
+                    steps = run_steps(step, grid, source, target, h0)
+                    seconds = best_of(repeat, lambda: run_steps(step, grid, source, target, h0))
+                    results.append({'name': f"search/{name}/{case}", 'seconds': seconds,
+                                    'steps': steps, 'us_per_step': seconds / steps * 1e6})
+                    state = SearchState(grid.size)
+                    seconds = best_of(repeat, lambda: run_steps(step, grid, source, target, h0,
+                                                                state))
+                    results.append({'name': f"search/{name}/arrays/{case}", 'seconds': seconds,
+                                    'steps': steps, 'us_per_step': seconds / steps * 1e6})
+    return results
+
+def measure_frames(frame: Callable[[], None], frames: int) -> Dict[str, float]:
+    """Per-frame time of the fastest frame, mean FPS and traced bytes allocated per frame."""
+    times = []
+    for _ in range(frames):
+        started = time.perf_counter()
+        frame()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(min(frames, 20)):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        frame()
+        allocated += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return {'seconds': min(times), 'fps': len(times) / sum(times),
+            'bytes_per_frame': allocated / min(frames, 20)}
+
+def bench_render(sizes: Sequence[int], frames: int) -> List[dict]:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame
+    from .visualizer import Maze2DVisualizer
+
+    results = []
+    for size in sizes:
+        grid = generate_grid(size, size, seed=size)
+        visualizer = Maze2DVisualizer(grid, goal=(size - 1, size - 1),
+                                      steps_per_frame=size * size * 4)
+        # Finish both searches so the frames draw a fully explored map.
+        visualizer.is_running = True
+        while not (visualizer.astar_done and visualizer.dijkstra_done):
+            visualizer.update()
+            time.sleep(0.001)
+        visualizer.render()
+
+        def draw_grid() -> None:
+            visualizer.draw_grid(visualizer.dijkstra_x, visualizer.grid,
+                                 visualizer.panel_dijkstra, visualizer.dijkstra_path,
+                                 visualizer.agent_dijkstra, visualizer.exploration_path_dijkstra)
+
+        def full_frame() -> None:
+            visualizer.full_redraw = True
+            visualizer.render()
+
+        def animated_frame() -> None:
+            visualizer.agent_dijkstra.mouth_open = not visualizer.agent_dijkstra.mouth_open
+            visualizer.render()
+
+        for name, frame in (('draw_grid', draw_grid), ('render_full', full_frame),
+                            ('render', animated_frame)):
+            results.append(dict(name=f"render/{name}/n={size}", **measure_frames(frame, frames)))
+        visualizer.reset_algorithm_states()
+    pygame.quit()
+    return results
+
+def compare(results: List[dict], baseline: List[dict], threshold: float) -> List[str]:
+    """Describe every case that got slower than the baseline by more than threshold."""
+    previous = {case['name']: case for case in baseline}
+    regressions = []
+    for case in results:
+        old = previous.get(case['name'])
+        if old is None or old['seconds'] <= 0:
+            continue
+        ratio = case['seconds'] / old['seconds']
+        if ratio > 1 + threshold:
+            regressions.append(f"{case['name']}: {old['seconds'] * 1000:.3f}ms -> "
+                               f"{case['seconds'] * 1000:.3f}ms ({(ratio - 1) * 100:+.0f}%)")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='app.py bench',
+                                     description="Benchmark the search core and renderer")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="flag regressions against a saved run")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="relative slowdown counted as a regression (default 0.10)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32, 128, 256])
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.1, 0.3])
+    parser.add_argument('--distances', type=float, nargs='+', default=[0.5, 1.0],
+                        help="goal distance as a fraction of the map diagonal")
+    parser.add_argument('--render-sizes', type=int, nargs='+', default=[15, 64])
+    parser.add_argument('--frames', type=int, default=60, help="frames per render case")
+    parser.add_argument('--frontiers', nargs='+', choices=FRONTIERS, default=list(FRONTIERS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-render', action='store_true', help="skip the render cases")
+    args = parser.parse_args(argv)
+
+    results = bench_search(args.sizes, args.densities, args.distances, args.repeat,
+                           args.frontiers)
+    if not args.no_render:
+        results += bench_render(args.render_sizes, args.frames)
+    for case in results:
+        print(f"{case['name']:<60} {case['seconds'] * 1000:10.3f}ms")
+
+    report = {'python': platform.python_version(), 'machine': platform.machine(),
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(results, json.load(fh)['results'], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,176 @@
+"""
+Cache of solved path queries.
+
+Results are keyed by (grid version, start, goal, algorithm). Grid.compile() gives the grid a
+new version, so editing the terrain invalidates every cached answer for it without any
+bookkeeping; stale entries are never matched again and age out of the LRU order.
+
+Sources that are queried repeatedly (spawn points, depots) get a full single-source Dijkstra
+tree instead: one flood from the source stores every cell's parent and distance, and any
+later query from that source, or to it, is answered by tracing parents.
+"""
+import math
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .algorithms import SOLVERS, SearchResult, _search
+from .frontier import frontier_functions, make_frontier
+from .grid import Grid
+from .instrumentation import SearchStats
+
+Point = Tuple[int, int]
+QueryKey = Tuple[int, Point, Point, str]
+
+# Solvers whose paths are optimal, so a shortest-path tree can answer for them.
+EXACT_SOLVERS = frozenset(('astar', 'dijkstra', 'bidirectional_astar',
+                           'bidirectional_dijkstra'))
+
+class DijkstraTree:
+    """
+    Shortest-path tree of every cell reachable from one source, stored as flat int32 arrays
+    over the grid's padded layout (-1 where unreached). With a reversible cost model (see
+    grid.CostModel.reversible) the cost of the reverse path from a cell back to the source
+    follows from the same tree.
+    """
+    __slots__ = ('grid', 'source', 'parent', 'distance', '_parent', '_distance')
+
+    def __init__(self, grid: Grid, source: int, frontier: str = 'dial') -> None:
+        self.grid = grid
+        self.source = source
+        open_set = make_frontier(frontier, [(0, source)])
+        came_from: Dict[int, int] = {}
+        g_score: Dict[int, int] = {source: 0}
+        # No cell has index -1, so the search runs until the open set is empty.
+        _search(grid, -1, open_set, set(), came_from, g_score, None, None,
+                *frontier_functions(open_set))
+        self.parent = np.full(grid.size, -1, dtype=np.int32)
+        self.distance = np.full(grid.size, -1, dtype=np.int32)
+        count = len(came_from)
+        self.parent[np.fromiter(came_from.keys(), np.intp, count)] = np.fromiter(
+            came_from.values(), np.int32, count)
+        count = len(g_score)
+        self.distance[np.fromiter(g_score.keys(), np.intp, count)] = np.fromiter(
+            g_score.values(), np.int32, count)
+        self._parent = memoryview(self.parent)
+        self._distance = memoryview(self.distance)
+
+    def reaches(self, index: int) -> bool:
+        return self._distance[index] >= 0
+
+    def indices(self, index: int) -> list:
+        """Cells from index back to the source, following parents."""
+        parent = self._parent
+        path = [index]
+        while index != self.source:
+            index = parent[index]
+            path.append(index)
+        return path
+
+    def path_from_source(self, goal: int) -> SearchResult:
+        if not self.reaches(goal):
+            return SearchResult([], math.inf, 0, 0)
+        point = self.grid.point
+        return SearchResult([point(i) for i in reversed(self.indices(goal))],
+                            self._distance[goal], 0, 0)
+
+    def path_to_source(self, start: int) -> SearchResult:
+        if not self.reaches(start):
+            return SearchResult([], math.inf, 0, 0)
+        point = self.grid.point
+        cost = self.grid.cost
+        # The tree path pays for every cell but the source; walked backwards it pays for
+        # every cell but start.
+        return SearchResult([point(i) for i in self.indices(start)],
+                            self._distance[start] - int(cost[start]) + int(cost[self.source]),
+                            0, 0)
+
+class PathCache:
+    """
+    Bounded LRU cache of run-to-completion queries for any solver in algorithms.SOLVERS.
+    After a source has been the start of tree_after queries on the same grid version, its
+    Dijkstra tree is built and kept (at most max_trees of them, least recently used
+    dropped first) and answers every query of an exact solver starting or ending there.
+    Tree answers are optimal but may pick a different path among equally short ones than
+    the named solver would. Cached results report zero expanded and visited cells. frontier
+    is the open set of both the solver searches and the tree builds.
+    """
+    def __init__(self, maxsize: int = 4096, max_trees: int = 16, tree_after: int = 2,
+                 frontier: str = 'heap') -> None:
+        self.maxsize = maxsize
+        self.max_trees = max_trees
+        self.tree_after = tree_after
+        self.frontier = frontier
+        self.results: 'OrderedDict[QueryKey, SearchResult]' = OrderedDict()
+        self.trees: 'OrderedDict[Tuple[int, int], DijkstraTree]' = OrderedDict()
+        self._sources: 'OrderedDict[Tuple[int, int], int]' = OrderedDict()
+        self.hits = self.tree_hits = self.misses = 0
+
+    def solve(self, grid: Grid, start: Point, goal: Point, algorithm: str = 'astar',
+              stats: Optional[SearchStats] = None) -> SearchResult:
+        """Answer a query from the cache, a Dijkstra tree or, failing both, the solver."""
+        key = (grid.version, tuple(start), tuple(goal), algorithm)
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+            self.hits += 1
+            return result
+        solver = SOLVERS[algorithm]
+        if not (grid.is_passable(start) and grid.is_passable(goal)):
+            raise ValueError(f"start {start} and goal {goal} must be passable cells of the grid")
+        result = self._from_tree(grid, grid.index(start), grid.index(goal), algorithm)
+        if result is None:
+            result = solver(grid, start, goal, stats=stats, frontier=self.frontier)
+            self.misses += 1
+        else:
+            self.tree_hits += 1
+        self.results[key] = result
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+        return result
+
+    def tree(self, grid: Grid, source: Point) -> DijkstraTree:
+        """Return the Dijkstra tree of source on the current grid version, building it once."""
+        key = (grid.version, grid.index(source))
+        tree = self.trees.get(key)
+        if tree is None:
+            tree = self.trees[key] = DijkstraTree(grid, key[1], self.frontier)
+            if len(self.trees) > self.max_trees:
+                self.trees.popitem(last=False)
+        else:
+            self.trees.move_to_end(key)
+        return tree
+
+    def _from_tree(self, grid: Grid, start: int, goal: int,
+                   algorithm: str) -> Optional[SearchResult]:
+        if algorithm not in EXACT_SOLVERS or not self.max_trees:
+            return None
+        version = grid.version
+        tree = self.trees.get((version, start))
+        if tree is not None:
+            self.trees.move_to_end((version, start))
+            return tree.path_from_source(goal)
+        tree = self.trees.get((version, goal))
+        if tree is not None and grid.cost_model.reversible:
+            self.trees.move_to_end((version, goal))
+            return tree.path_to_source(start)
+        key = (version, start)
+        uses = self._sources.pop(key, 0) + 1
+        self._sources[key] = uses
+        if len(self._sources) > self.maxsize:
+            self._sources.popitem(last=False)
+        if uses < self.tree_after:
+            return None
+        del self._sources[key]
+        return self.tree(grid, grid.point(start)).path_from_source(goal)
+
+    def clear(self) -> None:
+        self.results.clear()
+        self.trees.clear()
+        self._sources.clear()
+
+    def info(self) -> Dict[str, int]:
+        """Hit and miss counters and current sizes."""
+        return {'hits': self.hits, 'tree_hits': self.tree_hits, 'misses': self.misses,
+                'results': len(self.results), 'trees': len(self.trees)}
@@ -0,0 +1,162 @@
+"""
+Goal-rooted distance and flow fields for crowds of agents heading to shared goals.
+
+One vectorized wavefront from a goal gives every cell its cost to reach that goal, and
+each cell's flow direction points at its cheapest neighbor, so any number of agents
+steer towards the goal by table lookups instead of running a search each.
+"""
+import weakref
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .grid import Grid
+
+Point = Tuple[int, int]
+
+UNREACHABLE = np.iinfo(np.int32).max
+
+def distance_field(grid: Grid, goal: Point) -> np.ndarray:
+    """
+    Cost of the cheapest path from every cell to goal, as a flat int32 array over the
+    grid's padded layout (UNREACHABLE for walls and cut-off cells).
+    The wavefront runs like Dial's algorithm on whole arrays: cells settled at distance d
+    are expanded together, and a neighbor whose move into a settled cell costs c joins the
+    bucket for d + c, so every move is paid for exactly as the grid's cost model prices it.
+    Each bucket takes a handful of array operations per move, so the Python work grows with
+    the largest distance, not the map size.
+    """
+    if not grid.is_passable(goal):
+        raise ValueError(f"goal {goal} must be a passable cell of the grid")
+    # Row k, column i: the cost of move k's reverse, from i + offsets[k] into i.
+    offsets = np.array([offset for offset, _ in grid.reverse_moves], dtype=np.intp)[:, None]
+    costs = np.stack([np.asarray(costs) for _, costs in grid.reverse_moves])
+    dist = np.full(grid.size, UNREACHABLE, dtype=np.int32)
+    target = grid.index(goal)
+    dist[target] = 0
+    buckets: Dict[int, List[np.ndarray]] = {0: [np.array([target], dtype=np.intp)]}
+    while buckets:
+        d = min(buckets)
+        frontier = np.unique(np.concatenate(buckets.pop(d)))
+        frontier = frontier[dist[frontier] == d]
+        if not frontier.size:
+            continue
+        step = costs[:, frontier]
+        neighbors = frontier + offsets
+        # Cheapest moves first, so a cell reached at several costs keeps the lowest.
+        for c in np.unique(step).tolist():
+            if not c:
+                continue
+            reached = neighbors[step == c]
+            reached = reached[dist[reached] > d + c]
+            if reached.size:
+                dist[reached] = d + c
+                buckets.setdefault(d + c, []).append(reached)
+    return dist
+
+class FlowField:
+    """
+    Distance field of one goal plus, for every cell, the neighbor an agent should step to
+    next (-1 at the goal and where the goal is unreachable). version is the grid version the
+    field was computed for.
+    """
+    def __init__(self, grid: Grid, goal: Point) -> None:
+        self.grid = grid
+        self.goal = goal
+        self.version = grid.version
+        self.distance = distance_field(grid, goal)
+        # Cost to the goal through each neighbor, counting the move into it.
+        # UNREACHABLE plus a move cost stays above every real distance, so a reachable
+        # neighbor always beats an unreachable one.
+        distance = self.distance.astype(np.int64)
+        cells = np.arange(grid.size, dtype=np.int32)
+        best = np.full(grid.size, np.iinfo(np.int64).max)
+        self.next = np.full(grid.size, -1, dtype=np.int32)
+        for offset, costs in grid.moves:
+            shifted = np.full_like(best, UNREACHABLE)
+            if offset > 0:
+                shifted[:-offset] = distance[offset:]
+            else:
+                shifted[-offset:] = distance[:offset]
+            step = np.asarray(costs)
+            shifted += step
+            shifted[step == 0] = np.iinfo(np.int64).max
+            better = shifted < best
+            best[better] = shifted[better]
+            self.next[better] = cells[better] + offset
+        stuck = (self.distance == UNREACHABLE) | (self.distance == 0)
+        self.next[stuck] = -1
+
+    def cost(self, pos: Point) -> float:
+        """Cost from pos to the goal, inf if the goal cannot be reached."""
+        d = int(self.distance[self.grid.index(pos)])
+        return float('inf') if d == UNREACHABLE else d
+
+    def next_cell(self, pos: Point) -> Optional[Point]:
+        index = int(self.next[self.grid.index(pos)])
+        return None if index < 0 else self.grid.point(index)
+
+    def path(self, pos: Point) -> List[Point]:
+        """Cells from pos to the goal following the flow; empty if the goal is unreachable."""
+        index = self.grid.index(pos)
+        if self.distance[index] == UNREACHABLE:
+            return []
+        indices = [index]
+        while self.next[index] >= 0:
+            index = int(self.next[index])
+            indices.append(index)
+        return [self.grid.point(i) for i in indices]
+
+# Fields already computed, per grid and goal; a field is recomputed when its grid changes.
+_fields: 'weakref.WeakKeyDictionary[Grid, Dict[Point, FlowField]]' = \
+    weakref.WeakKeyDictionary()
+
+def flow_field(grid: Grid, goal: Point) -> FlowField:
+    """Return the flow field of goal on grid, computing it only when the grid has changed."""
+    fields = _fields.setdefault(grid, {})
+    field = fields.get(goal)
+    if field is None or field.version != grid.version:
+        field = fields[goal] = FlowField(grid, goal)
+    return field
+
+class Crowd:
+    """
+    Many agents, each heading for one of a few shared goals. Positions are flat cell indices
+    kept in one array, and step() moves every agent one cell along its goal's flow field,
+    so a step costs a few array lookups per goal however many agents there are.
+    """
+    def __init__(self, grid: Grid, starts: Sequence[Point], goals: Sequence[Point]) -> None:
+        if len(starts) != len(goals):
+            raise ValueError("every agent needs a start and a goal")
+        self.grid = grid
+        self.goals: List[Point] = sorted(set(map(tuple, goals)))
+        goal_ids = {goal: i for i, goal in enumerate(self.goals)}
+        self.goal_of = np.array([goal_ids[tuple(goal)] for goal in goals], dtype=np.intp)
+        self.positions = np.array([grid.index(start) for start in starts], dtype=np.intp)
+        self.steps = 0
+
+    def fields(self) -> List[FlowField]:
+        return [flow_field(self.grid, goal) for goal in self.goals]
+
+    def step(self) -> int:
+        """Move every agent that can still move one cell; return how many moved."""
+        moved = 0
+        for i, field in enumerate(self.fields()):
+            members = np.flatnonzero(self.goal_of == i)
+            following = field.next[self.positions[members]]
+            moving = following >= 0
+            self.positions[members[moving]] = following[moving]
+            moved += int(moving.sum())
+        self.steps += 1
+        return moved
+
+    def arrived(self) -> np.ndarray:
+        """Boolean mask of the agents standing on their goal."""
+        goals = np.array([self.grid.index(goal) for goal in self.goals], dtype=np.intp)
+        return self.positions == goals[self.goal_of]
+
+    def points(self) -> List[Point]:
+        return [self.grid.point(int(index)) for index in self.positions]
+
+    def __len__(self) -> int:
+        return len(self.positions)
@@ -0,0 +1,171 @@
+"""
+Open-set (frontier) implementations for the search loop.
+
+A frontier holds (priority, cell) entries and is used through pop(frontier) and
+push(frontier, item) functions with heapq's calling convention, so a plain list driven by
+heapq and the classes below are interchangeable as the open_set of any search function.
+Every implementation pops the smallest (priority, cell) pair first, so ties are broken the
+same way and all of them produce identical paths.
+"""
+import heapq
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+Entry = Tuple[Any, int]
+FrontierFunctions = Tuple[Callable[[Any], Entry], Callable[[Any, Entry], None]]
+
+class BucketQueue:
+    """
+    Dial's bucket queue for small integer priorities.
+    Entries live in one bucket per priority and a cursor walks the buckets upwards, so with
+    Dijkstra or A* on integer costs, where priorities popped never decrease, a search does
+    O(V + E) bucket work instead of O(E log V) heap work. Within a bucket cells come out in
+    index order to match the heap's tie-breaking. Like the lazy heap it keeps superseded
+    entries, which the search skips when they are popped.
+    """
+    __slots__ = ('buckets', 'cursor', 'size')
+
+    def __init__(self, items: Iterable[Entry] = ()) -> None:
+        self.buckets: Dict[int, List[int]] = {}
+        self.cursor = 0
+        self.size = 0
+        for item in items:
+            self.push(item)
+
+    def push(self, item: Entry) -> None:
+        priority = int(item[0])
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = []
+        heapq.heappush(bucket, item[1])
+        if priority < self.cursor or not self.size:
+            self.cursor = priority
+        self.size += 1
+
+    def pop(self) -> Entry:
+        cursor = self.peek()
+        bucket = self.buckets[cursor]
+        cell = heapq.heappop(bucket)
+        if not bucket:
+            del self.buckets[cursor]
+        self.size -= 1
+        return cursor, cell
+
+    def peek(self) -> int:
+        """Return the smallest priority without removing its entry."""
+        if not self.size:
+            raise IndexError("peek at an empty BucketQueue")
+        buckets = self.buckets
+        cursor = self.cursor
+        while not buckets.get(cursor):
+            cursor += 1
+        self.cursor = cursor
+        return cursor
+
+    def __len__(self) -> int:
+        return self.size
+
+class IndexedHeap:
+    """
+    Binary heap with a cell -> position index, so pushing a cell that is already queued
+    lowers its priority in place (decrease-key) instead of adding a duplicate entry. Pushing
+    a worse priority for a queued cell is ignored. The frontier therefore never holds stale
+    entries and never grows past the number of distinct open cells.
+    """
+    __slots__ = ('keys', 'position')
+
+    def __init__(self, items: Iterable[Entry] = ()) -> None:
+        self.keys: List[Entry] = []
+        self.position: Dict[int, int] = {}
+        for item in items:
+            self.push(item)
+
+    def push(self, item: Entry) -> None:
+        index = self.position.get(item[1])
+        if index is None:
+            index = len(self.keys)
+            self.keys.append(item)
+        elif item < self.keys[index]:
+            self.keys[index] = item
+        else:
+            return
+        self._sift_up(index, item)
+
+    def pop(self) -> Entry:
+        keys, position = self.keys, self.position
+        top = keys[0]
+        del position[top[1]]
+        last = keys.pop()
+        if keys:
+            self._sift_down(0, last)
+        return top
+
+    def peek(self) -> Any:
+        """Return the smallest priority without removing its entry."""
+        return self.keys[0][0]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, cell: object) -> bool:
+        return cell in self.position
+
+    def _sift_up(self, index: int, item: Entry) -> None:
+        keys, position = self.keys, self.position
+        while index:
+            parent = (index - 1) >> 1
+            above = keys[parent]
+            if not item < above:
+                break
+            keys[index] = above
+            position[above[1]] = index
+            index = parent
+        keys[index] = item
+        position[item[1]] = index
+
+    def _sift_down(self, index: int, item: Entry) -> None:
+        keys, position = self.keys, self.position
+        size = len(keys)
+        child = 2 * index + 1
+        while child < size:
+            right = child + 1
+            if right < size and keys[right] < keys[child]:
+                child = right
+            below = keys[child]
+            if not below < item:
+                break
+            keys[index] = below
+            position[below[1]] = index
+            index = child
+            child = 2 * index + 1
+        keys[index] = item
+        position[item[1]] = index
+
+FRONTIERS = ('heap', 'dial', 'indexed')
+
+def make_frontier(kind: str = 'heap', items: Iterable[Entry] = ()) -> Any:
+    """Create an open set of the given kind holding items."""
+    if kind == 'heap':
+        heap = list(items)
+        heapq.heapify(heap)
+        return heap
+    if kind == 'dial':
+        return BucketQueue(items)
+    if kind == 'indexed':
+        return IndexedHeap(items)
+    raise ValueError(f"unknown frontier {kind!r}; expected one of {FRONTIERS}")
+
+def frontier_functions(open_set: Any) -> FrontierFunctions:
+    """Return the pop and push functions that drive open_set."""
+    if isinstance(open_set, list):
+        return heapq.heappop, heapq.heappush
+    frontier_type = type(open_set)
+    return frontier_type.pop, frontier_type.push
+
+def min_priority(open_set: Any) -> Any:
+    """
+    Smallest priority in a non-empty open set. For the lazy heap and Dial buckets this may
+    belong to a superseded entry, so it is a lower bound on the best live priority.
+    """
+    if isinstance(open_set, list):
+        return open_set[0][0]
+    return open_set.peek()
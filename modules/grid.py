@@ -1,16 +1,377 @@
-from typing import List, Tuple
+import itertools
+import math
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+Point = Tuple[int, int]
 
 GRID_SIZE: int = 15
-START: Tuple[int, int] = (0, 0)
-GOAL: Tuple[int, int] = (14, 14)
+START: Point = (0, 0)
+GOAL: Point = (14, 14)
+
+# Terrain classes and the cost of entering each one (0 = impassable).
+EMPTY, WALL, SLOW = 0, 1, 2
+TERRAIN_COSTS: Tuple[int, ...] = (1, 0, 2)
+# Height drawn for each terrain class.
+TERRAIN_HEIGHTS: Tuple[float, ...] = (0.0, 1.0, 0.3)
+
+# Shared by all grids, so a version number identifies one state of one grid.
+_versions = itertools.count(1)
+
+# Edits a grid remembers for changes_since(); older states must rebuild what they derived.
+_EDIT_LOG = 256
+
+class CostModel:
+    """
+    How a Grid prices its moves; Grid.compile() turns it into per-move cost tables once per
+    map, so the search loops only ever read costs[index].
+    An orthogonal move into a cell of terrain class t costs unit * terrain_costs[t] (0 means
+    impassable) and a diagonal move that amount times sqrt(2), rounded. Diagonals are only
+    allowed between two passable orthogonal neighbors, so paths never cut corners.
+    height_penalty adds unit * height_penalty * |height difference| to every move. Costs
+    stay integers, so Dial's buckets still apply; unit defaults to 1 for plain 4-connected
+    moves and to 10 otherwise, which gives diagonals and heights a tenth of a step of
+    resolution.
+    """
+    __slots__ = ('terrain_costs', 'diagonal', 'height_penalty', 'unit')
+
+    def __init__(self, terrain_costs: Tuple[int, ...] = TERRAIN_COSTS, diagonal: bool = False,
+                 height_penalty: float = 0.0, unit: Optional[int] = None) -> None:
+        if any(cost < 0 for cost in terrain_costs) or not any(terrain_costs):
+            raise ValueError("terrain costs must be non-negative and not all zero")
+        if height_penalty < 0:
+            raise ValueError("height_penalty must be non-negative")
+        if unit is None:
+            unit = 10 if diagonal or height_penalty else 1
+        if unit < 1:
+            raise ValueError("unit must be at least 1")
+        self.terrain_costs = tuple(int(cost) for cost in terrain_costs)
+        self.diagonal = bool(diagonal)
+        self.height_penalty = float(height_penalty)
+        self.unit = int(unit)
+
+    @property
+    def key(self) -> Tuple:
+        return self.terrain_costs, self.diagonal, self.height_penalty, self.unit
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CostModel) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return (f"CostModel(terrain_costs={self.terrain_costs}, diagonal={self.diagonal}, "
+                f"height_penalty={self.height_penalty:g}, unit={self.unit})")
+
+    @property
+    def plain(self) -> bool:
+        """Every move costs exactly the entry cost of the cell it enters (HPA* needs this)."""
+        return not (self.diagonal or self.height_penalty)
+
+    @property
+    def reversible(self) -> bool:
+        """
+        Reversing a path changes its cost only by the entry costs of its two end cells.
+        True for 4-connected moves, with or without (symmetric) height penalties; landmark
+        back bounds and reversed Dijkstra trees rely on it.
+        """
+        return not self.diagonal
+
+    @property
+    def step(self) -> int:
+        """Cheapest orthogonal move."""
+        return self.unit * min(cost for cost in self.terrain_costs if cost > 0)
+
+    @property
+    def diagonal_step(self) -> int:
+        """Cheapest diagonal move."""
+        return round(self.step * math.sqrt(2))
+
+    def offsets(self, stride: int) -> Tuple[int, ...]:
+        """Move offsets in the padded layout: down, up, right, left, then the diagonals."""
+        offsets = (stride, -stride, 1, -1)
+        if self.diagonal:
+            offsets += (stride + 1, stride - 1, -stride + 1, -stride - 1)
+        return offsets
+
+    def heuristic(self, grid: 'Grid', goal: int) -> Callable[[int], int]:
+        """
+        Consistent heuristic on cell indices towards goal: Manhattan distance scaled by the
+        cheapest step, or octile distance with diagonal moves. Height penalties only add
+        cost, so both stay admissible.
+        """
+        stride = grid.stride
+        goal_row, goal_col = divmod(goal, stride)
+        step = self.step
+        if self.diagonal:
+            extra = self.diagonal_step - 2 * step
+            def octile(index: int) -> int:
+                row, col = divmod(index, stride)
+                rows, cols = abs(row - goal_row), abs(col - goal_col)
+                return step * (rows + cols) + extra * (rows if rows < cols else cols)
+            return octile
+        if step == 1:
+            def manhattan(index: int) -> int:
+                row, col = divmod(index, stride)
+                return abs(row - goal_row) + abs(col - goal_col)
+            return manhattan
+        def scaled(index: int) -> int:
+            row, col = divmod(index, stride)
+            return step * (abs(row - goal_row) + abs(col - goal_col))
+        return scaled
+
+    def lower_bounds(self, grid: 'Grid', goal: int, cells: np.ndarray) -> np.ndarray:
+        """heuristic() for many cells (flat indices) at once."""
+        rows, cols = np.divmod(np.asarray(cells, dtype=np.intp), grid.stride)
+        goal_row, goal_col = divmod(goal, grid.stride)
+        rows, cols = np.abs(rows - goal_row), np.abs(cols - goal_col)
+        bounds = self.step * (rows + cols)
+        if self.diagonal:
+            bounds += (self.diagonal_step - 2 * self.step) * np.minimum(rows, cols)
+        return bounds
+
+DEFAULT_COSTS = CostModel()
+
+def _cost_dtype(largest: int) -> type:
+    """Smallest unsigned type for move costs up to largest (uint8 for the default model)."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if largest <= np.iinfo(dtype).max:
+            return dtype
+    raise ValueError(f"move cost {largest} is too large")
+
+class Grid:
+    """
+    Terrain stored as a flat uint8 array with a one-cell wall border.
+    Searches address cells by flat index into the padded layout, so every neighbor of an
+    interior cell is a fixed offset away and no bounds checks are needed. Moves are compiled
+    from the grid's CostModel into (offset, costs) pairs where costs[i] is the cost of
+    taking that move from cell i, or 0 if it is blocked. reverse_moves holds the same pairs
+    for searching backwards from the goal: costs[i] is the cost of the move from cell
+    i + offset into cell i. cost holds the orthogonal entry cost of every cell.
+    version changes every time the tables are recompiled or patched, so anything derived
+    from the terrain (cached paths, cluster graphs) can tell whether it is still current.
+    """
+    def __init__(self, terrain, heights=None, cost_model: Optional[CostModel] = None) -> None:
+        terrain = np.asarray(terrain, dtype=np.uint8)
+        rows, cols = terrain.shape
+        cells = np.full((rows + 2) * (cols + 2), WALL, dtype=np.uint8)
+        cells.reshape(rows + 2, cols + 2)[1:-1, 1:-1] = terrain
+        self._attach(cells, rows, cols, heights, cost_model)
+
+    @classmethod
+    def from_padded(cls, cells: np.ndarray, rows: int, cols: int, heights=None,
+                    cost_model: Optional[CostModel] = None, tables=None) -> 'Grid':
+        """
+        Wrap terrain that is already in the padded flat layout, such as a memory-mapped map
+        file (see mapio), without copying it. The border cells must be walls. tables, as
+        returned by tables(), are used as they are instead of compiling the cost model; they
+        must have been compiled from the same terrain and model.
+        """
+        grid = cls.__new__(cls)
+        grid._attach(cells, rows, cols, heights, cost_model, tables)
+        return grid
+
+    def _attach(self, cells: np.ndarray, rows: int, cols: int, heights,
+                cost_model: Optional[CostModel], tables=None) -> None:
+        if cells.dtype != np.uint8 or cells.shape != ((rows + 2) * (cols + 2),):
+            raise ValueError(f"expected {(rows + 2) * (cols + 2)} uint8 cells for a "
+                             f"{cols}x{rows} grid")
+        self.rows, self.cols = rows, cols
+        self.stride = cols + 2
+        self.cells = cells
+        padded = cells.reshape(rows + 2, self.stride)
+        if (padded[[0, -1], :] != WALL).any() or (padded[:, [0, -1]] != WALL).any():
+            raise ValueError("the border of a padded grid must be walls")
+        # 2D view of the interior, sharing memory with cells.
+        self.terrain = padded[1:-1, 1:-1]
+        if heights is None:
+            heights = np.zeros((rows, cols), dtype=np.float32)
+        self.heights = np.asarray(heights, dtype=np.float32)
+        self.cost_model = cost_model or DEFAULT_COSTS
+        if tables is None:
+            self.compile()
+            return
+        cost, passable, forward, reverse = tables
+        count = len(self.cost_model.offsets(self.stride))
+        if (len(forward) != count or len(reverse) != count or passable.dtype != np.bool_ or
+                any(table.shape != (self.size,) for table in (cost, passable, *forward, *reverse))):
+            raise ValueError("tables do not match the grid's size and cost model")
+        self._use_tables(cost, passable, list(forward), list(reverse))
+
+    def set_cost_model(self, cost_model: CostModel) -> None:
+        """Price moves with a different cost model; recompiles the tables."""
+        self.cost_model = cost_model
+        self.compile()
+
+    def heuristic(self, goal: int) -> Callable[[int], int]:
+        """The cost model's admissible heuristic towards goal (a flat index)."""
+        return self.cost_model.heuristic(self, goal)
+
+    def compile(self) -> None:
+        """Rebuild the passability and move-cost tables from the terrain and cost model."""
+        model = self.cost_model
+        entry = model.unit * np.asarray(model.terrain_costs, dtype=np.int64)
+        self.cost = entry.astype(_cost_dtype(int(entry.max())))[self.cells]
+        self.passable = self.cost > 0
+        # Same neighbor order as the original tuple-based search: down, up, right, left,
+        # with the diagonals after them.
+        offsets = model.offsets(self.stride)
+        cells = np.arange(self.size)
+        # Size the tables for the dearest move set_terrain could create, not just this map's.
+        largest = int(entry.max())
+        if model.diagonal:
+            largest = round(largest * math.sqrt(2))
+        if model.height_penalty:
+            span = (max(float(self.heights.max(initial=0)), max(TERRAIN_HEIGHTS)) -
+                    min(float(self.heights.min(initial=0)), min(TERRAIN_HEIGHTS)))
+            largest += round(model.unit * model.height_penalty * span)
+        dtype = _cost_dtype(largest)
+        forward = [self._move_costs(offset, cells).astype(dtype) for offset in offsets]
+        # The move from cell i + offset back into cell i is the opposite move out of
+        # i + offset.
+        reverse = []
+        for offset in offsets:
+            backward = forward[offsets.index(-offset)]
+            costs = np.zeros_like(backward)
+            if offset > 0:
+                costs[:-offset] = backward[offset:]
+            else:
+                costs[-offset:] = backward[:offset]
+            reverse.append(costs)
+        self._use_tables(self.cost, self.passable, forward, reverse)
+
+    def _use_tables(self, cost: np.ndarray, passable: np.ndarray, forward: List[np.ndarray],
+                    reverse: List[np.ndarray]) -> None:
+        self.version = next(_versions)
+        # (version, cells) of every set_terrain since the tables were built, after _edits_base.
+        self._edits: List[Tuple[int, List[Point]]] = []
+        self._edits_base = self.version
+        self.cost, self.passable = cost, passable
+        self._forward, self._reverse = forward, reverse
+        offsets = self.cost_model.offsets(self.stride)
+        self.moves: Tuple[Tuple[int, memoryview], ...] = tuple(
+            (offset, memoryview(costs)) for offset, costs in zip(offsets, self._forward))
+        self.reverse_moves: Tuple[Tuple[int, memoryview], ...] = tuple(
+            (offset, memoryview(costs)) for offset, costs in zip(offsets, self._reverse))
 
-def create_grid() -> Tuple[List[List[int]], List[List[float]]]:
+    def tables(self) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray], List[np.ndarray]]:
+        """
+        The compiled arrays: entry costs, passability, and the forward and reverse move
+        costs in the order of the cost model's offsets. mapio stores them in .grid files.
+        """
+        return self.cost, self.passable, self._forward, self._reverse
+
+    def _heights_at(self, indices: np.ndarray) -> np.ndarray:
+        """Heights of flat cell indices; 0 on the border."""
+        rows, cols = np.divmod(indices, self.stride)
+        rows, cols = rows - 1, cols - 1
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        heights = np.zeros(len(indices), dtype=np.float32)
+        heights[inside] = self.heights[rows[inside], cols[inside]]
+        return heights
+
+    def _move_costs(self, offset: int, cells: np.ndarray) -> np.ndarray:
+        """Cost of moving by offset from each of cells under the cost model, 0 if blocked."""
+        model, last = self.cost_model, self.size - 1
+        targets = np.clip(cells + offset, 0, last)
+        costs = self.cost[targets].astype(np.int64)
+        costs[~self.passable[cells] | (cells + offset != targets)] = 0
+        if abs(offset) not in (1, self.stride):
+            # A diagonal costs sqrt(2) steps and needs both cells beside it to be open.
+            vertical = self.stride if offset > 0 else -self.stride
+            costs = np.rint(costs * math.sqrt(2)).astype(np.int64)
+            costs[~(self.passable[np.clip(cells + vertical, 0, last)] &
+                    self.passable[np.clip(cells + offset - vertical, 0, last)])] = 0
+        if model.height_penalty:
+            climb = np.abs(self._heights_at(targets) - self._heights_at(cells)).astype(np.float64)
+            penalty = np.rint(model.unit * model.height_penalty * climb).astype(np.int64)
+            costs += np.where(costs > 0, penalty, 0)
+        return costs
+
+    def set_terrain(self, cells: Iterable[Point], terrain: int) -> List[Point]:
+        """
+        Change the given cells to a terrain class at runtime and return the cells that
+        actually changed. Only the move-cost entries into and out of those cells are
+        patched, so an edit costs O(changed cells) instead of a full compile(); the grid
+        still gets a new version.
+        """
+        changed = []
+        for pos in cells:
+            if self.in_bounds(pos) and self.terrain[pos] != terrain:
+                changed.append(pos)
+        if not changed:
+            return changed
+        height = TERRAIN_HEIGHTS[terrain]
+        entry = self.cost_model.unit * self.cost_model.terrain_costs[terrain]
+        for pos in changed:
+            self.terrain[pos] = terrain
+            self.heights[pos] = height
+            index = self.index(pos)
+            self.cost[index] = entry
+            self.passable[index] = entry > 0
+        # A move depends on the cells it leaves, enters and (diagonally) passes between,
+        # all of which are neighbors of its start.
+        offsets = np.array([offset for offset, _ in self.moves])
+        indices = np.array([self.index(pos) for pos in changed])
+        touched = np.unique(np.concatenate([indices, (indices[:, None] - offsets).ravel()]))
+        touched = touched[(touched >= 0) & (touched < self.size)]
+        for offset, costs in zip(offsets.tolist(), self._forward):
+            costs[touched] = self._move_costs(offset, touched)
+        for offset, costs in zip(offsets.tolist(), self._reverse):
+            backward = self._forward[offsets.tolist().index(-offset)]
+            sources = touched[(touched - offset >= 0) & (touched - offset < self.size)]
+            costs[sources - offset] = backward[sources]
+        self.version = next(_versions)
+        self._edits.append((self.version, changed))
+        if len(self._edits) > _EDIT_LOG:
+            self._edits_base = self._edits.pop(0)[0]
+        return changed
+
+    def changes_since(self, version: int) -> Optional[List[Point]]:
+        """
+        Cells changed by set_terrain since the grid was at version, or None if it has been
+        recompiled since then (or the edits are too old to remember) and anything derived
+        from that version has to be rebuilt.
+        """
+        if version < self._edits_base:
+            return None
+        return [pos for edited, cells in self._edits if edited > version for pos in cells]
+
+    @property
+    def size(self) -> int:
+        """Length of the padded flat layout, i.e. one past the largest index."""
+        return len(self.cells)
+
+    def index(self, pos: Point) -> int:
+        return (pos[0] + 1) * self.stride + pos[1] + 1
+
+    def point(self, index: int) -> Point:
+        row, col = divmod(index, self.stride)
+        return row - 1, col - 1
+
+    def in_bounds(self, pos: Point) -> bool:
+        return 0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols
+
+    def is_passable(self, pos: Point) -> bool:
+        return self.in_bounds(pos) and bool(self.passable[self.index(pos)])
+
+    def __getitem__(self, row: int) -> np.ndarray:
+        return self.terrain[row]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self.terrain)
+
+def create_grid() -> Tuple[Grid, np.ndarray]:
     """
     Create a 15x15 grid with enhanced 3D terrain.
     Obstacles and slow terrain are placed, ensuring that START and GOAL cells remain clear.
     """
-    grid: List[List[int]] = [[0] * GRID_SIZE for _ in range(GRID_SIZE)]
-    heights: List[List[float]] = [[0.0] * GRID_SIZE for _ in range(GRID_SIZE)]
+    grid = np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.uint8)
+    heights = np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.float32)
     
     obstacles = [
         # Top-left corner maze pattern
@@ -71,18 +432,175 @@ def create_grid() -> Tuple[List[List[int]], List[List[float]]]:
         (12, 10), (12, 11)
     ]
     
-    for pos in obstacles:
-        grid[pos[0]][pos[1]] = 1
-        heights[pos[0]][pos[1]] = 1.0
+    rows, cols = zip(*obstacles)
+    grid[rows, cols] = WALL
+    heights[rows, cols] = 1.0
     
-    for pos in slow_terrain:
-        grid[pos[0]][pos[1]] = 2
-        heights[pos[0]][pos[1]] = 0.3
+    rows, cols = zip(*slow_terrain)
+    grid[rows, cols] = SLOW
+    heights[rows, cols] = 0.3
     
     # Ensure START and GOAL are clear.
-    grid[START[0]][START[1]] = 0
-    grid[GOAL[0]][GOAL[1]] = 0
-    heights[START[0]][START[1]] = 0.0
-    heights[GOAL[0]][GOAL[1]] = 0.0
+    grid[START] = EMPTY
+    grid[GOAL] = EMPTY
+    heights[START] = 0.0
+    heights[GOAL] = 0.0
     
-    return grid, heights
+    result = Grid(grid, heights)
+    return result, result.heights
+
+MAP_STYLES: Tuple[str, ...] = ('noise', 'maze', 'rooms')
+
+def reachable(passable: np.ndarray, source: Point) -> np.ndarray:
+    """
+    Return a boolean mask of the cells 4-connected to source through passable cells.
+    The fill is vectorized: horizontal runs of passable cells are labelled with a cumulative
+    sum, runs that touch vertically are merged by min-label hooking with pointer jumping,
+    and the mask is read off the resulting run labels. It takes a few whole-array passes
+    instead of one Python step per cell.
+    """
+    rows, cols = passable.shape
+    stride = cols + 1
+    # A blocked column after every row keeps runs from wrapping onto the next row.
+    flat = np.zeros((rows, stride), dtype=bool)
+    flat[:, :cols] = passable
+    flat = flat.ravel()
+    run_id = np.cumsum(~flat)
+    touching = flat[:-stride] & flat[stride:]
+    upper, lower = run_id[:-stride][touching], run_id[stride:][touching]
+    parent = np.arange(run_id[-1] + 1)
+    while True:
+        root_upper, root_lower = parent[upper], parent[lower]
+        merge = root_upper != root_lower
+        if not merge.any():
+            break
+        low = np.minimum(root_upper[merge], root_lower[merge])
+        high = np.maximum(root_upper[merge], root_lower[merge])
+        np.minimum.at(parent, high, low)
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+    if not passable[source]:
+        return np.zeros_like(passable, dtype=bool)
+    labels = parent[run_id]
+    mask = flat & (labels == labels[source[0] * stride + source[1]])
+    return mask.reshape(rows, stride)[:, :cols]
+
+def _noise_walls(rng: np.random.Generator, shape: Tuple[int, int],
+                 obstacle_density: float) -> np.ndarray:
+    return rng.random(shape) < obstacle_density
+
+def _maze_walls(rng: np.random.Generator, shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Perfect maze on the even-coordinate lattice, carved with the sidewinder algorithm.
+    Each row of the lattice is split into random runs joined eastwards, and every run opens
+    one random cell northwards; all of it is done with array operations per row block.
+    """
+    rows, cols = shape
+    walls = np.ones(shape, dtype=bool)
+    lattice_rows, lattice_cols = (rows + 1) // 2, (cols + 1) // 2
+    walls[::2, ::2] = False
+    # The top lattice row is one long corridor.
+    walls[0, 1:2 * lattice_cols - 1:2] = False
+    if lattice_rows < 2:
+        return walls
+    # Decide where each run in the remaining lattice rows closes.
+    close = rng.random((lattice_rows - 1, lattice_cols)) < 0.5
+    close[:, -1] = True
+    east = ~close[:, :-1]
+    walls[2::2, 1:2 * lattice_cols - 1:2] = ~east
+    # Pick one random member of each run and carve north from it.
+    run_start = np.ones_like(close)
+    run_start[:, 1:] = close[:, :-1]
+    run_id = np.cumsum(run_start.ravel()) - 1
+    keys = rng.random(run_id.size)
+    order = np.lexsort((keys, run_id))
+    last_of_run = np.ones(run_id.size, dtype=bool)
+    last_of_run[:-1] = run_id[order][1:] != run_id[order][:-1]
+    chosen = order[last_of_run]
+    lattice_row, lattice_col = np.divmod(chosen, lattice_cols)
+    walls[2 * lattice_row + 1, 2 * lattice_col] = False
+    return walls
+
+def _rooms_walls(rng: np.random.Generator, shape: Tuple[int, int],
+                 obstacle_density: float) -> np.ndarray:
+    """Rooms separated by one-cell walls with a door into every neighboring room."""
+    rows, cols = shape
+    walls = np.zeros(shape, dtype=bool)
+
+    def partitions(length: int) -> np.ndarray:
+        # Wall lines roughly every 6-12 cells, never on the outer edge.
+        if length < 5:
+            return np.empty(0, dtype=int)
+        lines = np.cumsum(rng.integers(6, 13, size=length // 6 + 1))
+        return lines[lines < length - 1]
+
+    row_lines, col_lines = partitions(rows), partitions(cols)
+    walls[row_lines, :] = True
+    walls[:, col_lines] = True
+    # Spans of room cells between wall lines along each axis.
+    col_bounds = np.concatenate(([0], col_lines + 1)), np.concatenate((col_lines, [cols]))
+    row_bounds = np.concatenate(([0], row_lines + 1)), np.concatenate((row_lines, [rows]))
+    for lines, (lo, hi), horizontal in ((row_lines, col_bounds, True),
+                                        (col_lines, row_bounds, False)):
+        if not lines.size:
+            continue
+        doors = lo[None, :] + (rng.random((lines.size, lo.size)) * (hi - lo)[None, :]).astype(int)
+        line_idx = np.broadcast_to(lines[:, None], doors.shape)
+        if horizontal:
+            walls[line_idx, doors] = False
+        else:
+            walls[doors, line_idx] = False
+    # Scatter furniture inside the rooms.
+    if obstacle_density > 0:
+        walls |= _noise_walls(rng, shape, obstacle_density)
+    return walls
+
+def generate_grid(width: int, height: int, seed: Optional[int] = None,
+                  obstacle_density: float = 0.25, slow_density: float = 0.1,
+                  style: str = 'noise', start: Optional[Point] = None,
+                  goal: Optional[Point] = None) -> Grid:
+    """
+    Generate a width x height grid of the given style ('noise', 'maze' or 'rooms').
+    The same seed always yields the same map. Maze walls come from the maze itself, so
+    obstacle_density only applies to the other styles. start and goal default to opposite
+    corners; both are cleared and, if the walls separate them, an L-shaped corridor is
+    carved so a path always exists.
+    """
+    if style not in MAP_STYLES:
+        raise ValueError(f"unknown map style {style!r}; expected one of {MAP_STYLES}")
+    if width < 1 or height < 1:
+        raise ValueError("width and height must be positive")
+    shape = (height, width)
+    start = START if start is None else start
+    goal = (height - 1, width - 1) if goal is None else goal
+    for pos in (start, goal):
+        if not (0 <= pos[0] < height and 0 <= pos[1] < width):
+            raise ValueError(f"{pos} is outside a {width}x{height} grid")
+    rng = np.random.default_rng(seed)
+
+    if style == 'maze':
+        walls = _maze_walls(rng, shape)
+        # Link start and goal to their nearest lattice cell, which the maze always reaches.
+        for row, col in (start, goal):
+            walls[row, col] = walls[row - row % 2, col] = False
+            walls[row - row % 2, col - col % 2] = False
+    elif style == 'rooms':
+        walls = _rooms_walls(rng, shape, obstacle_density)
+    else:
+        walls = _noise_walls(rng, shape, obstacle_density)
+    walls[start] = walls[goal] = False
+
+    if style != 'maze' and not reachable(~walls, start)[goal]:
+        walls[start[0], min(start[1], goal[1]):max(start[1], goal[1]) + 1] = False
+        walls[min(start[0], goal[0]):max(start[0], goal[0]) + 1, goal[1]] = False
+
+    terrain = np.where(walls, WALL, EMPTY).astype(np.uint8)
+    slow = ~walls & (rng.random(shape) < slow_density)
+    terrain[slow] = SLOW
+    heights = np.zeros(shape, dtype=np.float32)
+    heights[walls] = 1.0
+    heights[slow] = 0.3
+    return Grid(terrain, heights)
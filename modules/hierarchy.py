@@ -0,0 +1,470 @@
+"""
+Hierarchical pathfinding (HPA*) on a Grid.
+
+The map is cut into square clusters. Every maximal run of open cell pairs along the
+border between two clusters becomes one transition, whose two cells are abstract nodes,
+and the cheapest path that stays inside a cluster is precomputed between every pair of
+its nodes. A query links start and goal to the nodes of their own clusters, searches the
+small abstract graph, and refines each abstract hop with a search confined to a single
+cluster only when that part of the path is read.
+"""
+import heapq
+import math
+import time
+import weakref
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .algorithms import CameFrom, GScore, Point, SearchResult, manhattan_to
+from .frontier import frontier_functions, make_frontier
+from .grid import Grid
+from .instrumentation import SearchStats
+
+# Intra-cluster costs at or above this mean "no path inside the cluster".
+UNREACHABLE = 1 << 16
+_FAR = 1 << 30
+
+# (axis, cluster row, cluster col): the border below (axis 0) or right of (axis 1) a cluster.
+BorderKey = Tuple[int, int, int]
+
+def cluster_distances(costs: np.ndarray, dist: np.ndarray) -> np.ndarray:
+    """
+    Shortest path costs inside square blocks, for many blocks and sources at once.
+    costs is (blocks, K, K) with the cost of entering each cell (UNREACHABLE for walls)
+    and dist is (blocks, sources, K, K), zero at each source and _FAR elsewhere; it is
+    updated in place and returned. Each sweep relaxes whole rows or columns in one
+    direction with a running minimum over prefix sums, and sweeps repeat until nothing
+    changes, so the number of rounds grows with the number of turns on the paths rather
+    than their length. Blocks drop out of the rounds as soon as they settle.
+    """
+    costs = costs[:, None]
+    sweeps = []
+    for axis in (3, 2):
+        forward = np.cumsum(costs, axis=axis)
+        backward = np.flip(np.cumsum(np.flip(costs, axis), axis=axis), axis)
+        sweeps.append((axis, forward, backward))
+    scratch = np.empty_like(dist)
+    active = np.arange(len(dist))
+    while len(active):
+        current = dist[active]
+        before = current.copy()
+        temp = scratch[:len(active)]
+        for axis, forward, backward in sweeps:
+            # Backward sweeps accumulate over a reversed view of the same scratch space.
+            for prefix, flipped in ((forward[active], temp),
+                                    (backward[active], np.flip(temp, axis))):
+                np.subtract(current, prefix, out=temp)
+                np.minimum.accumulate(flipped, axis=axis, out=flipped)
+                np.add(temp, prefix, out=current)
+        changed = (current != before).any(axis=(1, 2, 3))
+        dist[active] = current
+        active = active[changed]
+    return dist
+
+class ClusterGraph:
+    """
+    Abstract graph of a Grid split into cluster_size x cluster_size clusters.
+    Abstract nodes are flat cell indices of the grid. After editing cells of the grid with
+    set_terrain, pass them to update() to rebuild only the clusters and borders they touch
+    (cluster_graph() does this by itself). version is the grid version the graph was last
+    brought up to date with. Costs inside clusters are swept from entry costs, so the
+    grid's cost model must be plain (4-connected, no height penalties).
+    """
+    def __init__(self, grid: Grid, cluster_size: int = 16) -> None:
+        if not 2 <= cluster_size <= 128:
+            raise ValueError("cluster_size must be between 2 and 128")
+        if not grid.cost_model.plain:
+            raise ValueError("HPA* needs a 4-connected cost model without height penalties")
+        self.grid = grid
+        self.size = cluster_size
+        self.cluster_rows = -(-grid.rows // cluster_size)
+        self.cluster_cols = -(-grid.cols // cluster_size)
+        count = self.cluster_rows * self.cluster_cols
+        self.nodes: List[List[int]] = [[] for _ in range(count)]
+        # Per cluster, the cost of the abstract edge between each pair of its nodes.
+        self.distances: List[np.ndarray] = [np.zeros((0, 0), dtype=np.int32)] * count
+        self.slot: Dict[int, int] = {}             # node -> row of its cluster's distances
+        self.partners: Dict[int, List[int]] = {}   # node -> nodes across a border
+        self.transitions: Dict[BorderKey, List[Tuple[int, int]]] = {}
+        self.build()
+
+    def cluster_of(self, index: int) -> int:
+        row, col = divmod(index, self.grid.stride)
+        return (row - 1) // self.size * self.cluster_cols + (col - 1) // self.size
+
+    def bounds(self, cluster: int) -> Tuple[int, int, int, int]:
+        """First row, first col and the ends (exclusive) of a cluster's cells."""
+        cluster_row, cluster_col = divmod(cluster, self.cluster_cols)
+        row, col = cluster_row * self.size, cluster_col * self.size
+        return (row, col, min(row + self.size, self.grid.rows),
+                min(col + self.size, self.grid.cols))
+
+    def _interior(self, values: np.ndarray) -> np.ndarray:
+        """2D view of the interior of a flat padded grid array."""
+        return values.reshape(self.grid.rows + 2, self.grid.stride)[1:-1, 1:-1]
+
+    def _blocks(self, clusters: Sequence[int]) -> np.ndarray:
+        """Entry costs of each cluster as a full square block, UNREACHABLE outside the map."""
+        size = self.size
+        cost = self._interior(self.grid.cost)
+        blocks = np.zeros((len(clusters), size, size), dtype=np.int32)
+        for i, cluster in enumerate(clusters):
+            row, col, row_end, col_end = self.bounds(cluster)
+            blocks[i, :row_end - row, :col_end - col] = cost[row:row_end, col:col_end]
+        blocks[blocks == 0] = UNREACHABLE
+        return blocks
+
+    def build(self) -> None:
+        """Find every transition and precompute the costs inside every cluster."""
+        self.version = self.grid.version
+        rows, cols = self.cluster_rows, self.cluster_cols
+        keys = ([(0, r, c) for r in range(rows - 1) for c in range(cols)] +
+                [(1, r, c) for r in range(rows) for c in range(cols - 1)])
+        self.transitions = dict(zip(keys, self._find_transitions(keys)))
+        self.partners = {}
+        for pairs in self.transitions.values():
+            self._link(pairs)
+        self._rebuild_clusters(range(rows * cols))
+
+    def update(self, cells: Iterable[Point]) -> None:
+        """Rebuild the transitions and costs affected by changes to the given cells."""
+        self.version = self.grid.version
+        size = self.size
+        clusters: Set[int] = set()
+        borders: Set[BorderKey] = set()
+        for row, col in cells:
+            cluster_row, cluster_col = row // size, col // size
+            clusters.add(cluster_row * self.cluster_cols + cluster_col)
+            if row % size == size - 1 and cluster_row + 1 < self.cluster_rows:
+                borders.add((0, cluster_row, cluster_col))
+            if row % size == 0 and cluster_row > 0:
+                borders.add((0, cluster_row - 1, cluster_col))
+            if col % size == size - 1 and cluster_col + 1 < self.cluster_cols:
+                borders.add((1, cluster_row, cluster_col))
+            if col % size == 0 and cluster_col > 0:
+                borders.add((1, cluster_row, cluster_col - 1))
+        keys = sorted(borders)
+        for key, pairs in zip(keys, self._find_transitions(keys)):
+            self._unlink(self.transitions[key])
+            self.transitions[key] = pairs
+            self._link(pairs)
+            axis, cluster_row, cluster_col = key
+            clusters.add(cluster_row * self.cluster_cols + cluster_col)
+            clusters.add((cluster_row + 1 - axis) * self.cluster_cols + cluster_col + axis)
+        self._rebuild_clusters(sorted(clusters))
+
+    def _link(self, pairs: List[Tuple[int, int]]) -> None:
+        for a, b in pairs:
+            self.partners.setdefault(a, []).append(b)
+            self.partners.setdefault(b, []).append(a)
+
+    def _unlink(self, pairs: List[Tuple[int, int]]) -> None:
+        for a, b in pairs:
+            for node, other in ((a, b), (b, a)):
+                others = self.partners[node]
+                others.remove(other)
+                if not others:
+                    del self.partners[node]
+
+    def _find_transitions(self, keys: Sequence[BorderKey]) -> List[List[Tuple[int, int]]]:
+        """Transition cell pairs of each border: the middle of every run of open pairs."""
+        if not keys:
+            return []
+        grid, size = self.grid, self.size
+        passable = self._interior(grid.passable)
+        axis, cluster_row, cluster_col = np.array(keys).T
+        span = np.arange(size)
+        # Near side of each border: the last row (axis 0) or col (axis 1) of the cluster.
+        line = np.where(axis == 0, (cluster_row + 1) * size - 1, (cluster_col + 1) * size - 1)
+        across = np.where(axis == 0, cluster_col, cluster_row)[:, None] * size + span
+        # The last cluster of a row or column may be cut short by the edge of the map.
+        limit = np.where(axis == 0, grid.cols, grid.rows)[:, None]
+        inside = across < limit
+        across = np.minimum(across, limit - 1)
+        along = np.broadcast_to(line[:, None], across.shape)
+        near_rows = np.where(axis[:, None] == 0, along, across)
+        near_cols = np.where(axis[:, None] == 0, across, along)
+        far_rows, far_cols = near_rows + (axis[:, None] == 0), near_cols + (axis[:, None] == 1)
+        open_pairs = np.zeros((len(keys), size + 2), dtype=np.int8)
+        open_pairs[:, 1:-1] = (passable[near_rows, near_cols] & passable[far_rows, far_cols] &
+                               inside)
+        edges = np.diff(open_pairs, axis=1)
+        border, first = np.nonzero(edges == 1)
+        _, end = np.nonzero(edges == -1)
+        middle = (first + end - 1) // 2
+        stride = grid.stride
+        near = (near_rows[border, middle] + 1) * stride + near_cols[border, middle] + 1
+        far = (far_rows[border, middle] + 1) * stride + far_cols[border, middle] + 1
+        transitions: List[List[Tuple[int, int]]] = [[] for _ in keys]
+        for b, a_index, b_index in zip(border.tolist(), near.tolist(), far.tolist()):
+            transitions[b].append((a_index, b_index))
+        return transitions
+
+    def _cluster_nodes(self, cluster: int) -> List[int]:
+        cluster_row, cluster_col = divmod(cluster, self.cluster_cols)
+        nodes = set()
+        for key, side in (((0, cluster_row, cluster_col), 0), ((1, cluster_row, cluster_col), 0),
+                          ((0, cluster_row - 1, cluster_col), 1),
+                          ((1, cluster_row, cluster_col - 1), 1)):
+            for pair in self.transitions.get(key, ()):
+                nodes.add(pair[side])
+        return sorted(nodes)
+
+    def _rebuild_clusters(self, clusters: Iterable[int]) -> None:
+        """Recollect the nodes of the given clusters and recompute their internal costs."""
+        pending = []
+        for cluster in clusters:
+            for node in self.nodes[cluster]:
+                self.slot.pop(node, None)
+            nodes = self.nodes[cluster] = self._cluster_nodes(cluster)
+            self.slot.update((node, slot) for slot, node in enumerate(nodes))
+            if nodes:
+                pending.append(cluster)
+            else:
+                self.distances[cluster] = np.zeros((0, 0), dtype=np.int32)
+        if not pending:
+            return
+        size = self.size
+        # Clusters with similar node counts share a batch, so little work goes to padding.
+        pending.sort(key=lambda cluster: len(self.nodes[cluster]))
+        start = 0
+        while start < len(pending):
+            width = len(self.nodes[pending[start]])
+            batch_size = max(1, (1 << 22) // (width * size * size))
+            end = start
+            while end < len(pending) and end - start < batch_size:
+                width = max(width, len(self.nodes[pending[end]]))
+                end += 1
+                batch_size = max(1, (1 << 22) // (width * size * size))
+            self._compute_batch(pending[start:end], width)
+            start = end
+
+    def _local(self, cluster: int, nodes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and cols of cells within their cluster's block."""
+        row, col, _, _ = self.bounds(cluster)
+        rows, cols = np.divmod(np.asarray(nodes, dtype=np.intp), self.grid.stride)
+        return rows - 1 - row, cols - 1 - col
+
+    def _compute_batch(self, clusters: List[int], width: int) -> None:
+        size = self.size
+        dist = np.full((len(clusters), width, size, size), _FAR, dtype=np.int32)
+        local_rows = np.zeros((len(clusters), width), dtype=np.intp)
+        local_cols = np.zeros((len(clusters), width), dtype=np.intp)
+        for i, cluster in enumerate(clusters):
+            rows, cols = self._local(cluster, self.nodes[cluster])
+            count = len(rows)
+            local_rows[i, :count], local_cols[i, :count] = rows, cols
+            dist[i, np.arange(count), rows, cols] = 0
+        dist = cluster_distances(self._blocks(clusters), dist)
+        batch = np.arange(len(clusters))[:, None, None]
+        slots = np.arange(width)[None, :, None]
+        table = np.minimum(dist[batch, slots, local_rows[:, None, :], local_cols[:, None, :]],
+                           UNREACHABLE)
+        counts = np.array([len(self.nodes[cluster]) for cluster in clusters])
+        padding = np.arange(width) >= counts[:, None]
+        table[padding[:, :, None] | padding[:, None, :]] = UNREACHABLE
+        # Drop edges that cost exactly as much as going through another node of the same
+        # cluster; every such path is still found through the shorter edges, and the
+        # abstract search relaxes far fewer edges.
+        through = table[:, :, :, None] + table[:, None, :, :]
+        eye = np.eye(width, dtype=bool)
+        through[:, eye] = _FAR
+        through[:, :, eye] = _FAR
+        table[(through == table[:, :, None, :]).any(axis=2)] = UNREACHABLE
+        for i, cluster in enumerate(clusters):
+            count = len(self.nodes[cluster])
+            self.distances[cluster] = table[i, :count, :count].copy()
+
+    def costs_within(self, index: int, targets: Iterable[int],
+                     came_from: Optional[CameFrom] = None) -> Dict[int, int]:
+        """
+        Costs from cell index to each target cell reachable without leaving its cluster,
+        by a Dijkstra search confined to the cluster that stops once every target is settled.
+        Moves are priced by the grid's own tables. If came_from is given, it is filled with
+        the parent of every cell reached, so the paths can be walked back.
+        """
+        grid = self.grid
+        row, col, row_end, col_end = self.bounds(self.cluster_of(index))
+        stride = grid.stride
+        low, high = (row + 1) * stride, (row_end + 1) * stride
+        col_low, col_high = col + 1, col_end + 1
+        remaining = set(targets)
+        found: Dict[int, int] = {}
+        open_set = [(0, index)]
+        g_score = {index: 0}
+        closed_set = set()
+        moves = grid.moves
+        while open_set and remaining:
+            current_g, current = heapq.heappop(open_set)
+            if current in closed_set:
+                continue
+            closed_set.add(current)
+            if current in remaining:
+                remaining.discard(current)
+                found[current] = current_g
+            for offset, costs in moves:
+                step = costs[current]
+                neighbor = current + offset
+                if (not step or not low <= neighbor < high or
+                        not col_low <= neighbor % stride < col_high):
+                    continue
+                tentative_g = current_g + step
+                if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                    g_score[neighbor] = tentative_g
+                    if came_from is not None:
+                        came_from[neighbor] = current
+                    heapq.heappush(open_set, (tentative_g, neighbor))
+        return found
+
+    def search(self, start: Point, goal: Point, stats: Optional[SearchStats] = None,
+               frontier: str = 'heap') -> SearchResult:
+        """
+        Search the abstract graph from start to goal. The path is a HierarchicalPath whose
+        hops are refined on first access; cost is exact for that path, expanded and visited
+        count abstract nodes.
+        """
+        grid = self.grid
+        if not (grid.is_passable(start) and grid.is_passable(goal)):
+            raise ValueError(f"start {start} and goal {goal} must be passable cells of the grid")
+        started = time.perf_counter()
+        source, target = grid.index(start), grid.index(goal)
+        cost = memoryview(grid.cost)
+        start_cluster, goal_cluster = self.cluster_of(source), self.cluster_of(target)
+        targets = list(self.nodes[start_cluster])
+        if start_cluster == goal_cluster:
+            targets.append(target)
+        start_edges = list(self.costs_within(source, targets).items())
+        # Paths cost the same both ways up to the end cells' own costs, so costs from the
+        # goal give the cost from each node of its cluster to the goal.
+        goal_edges = {node: d - cost[node] + cost[target]
+                      for node, d in self.costs_within(target, self.nodes[goal_cluster]).items()}
+
+        stride = grid.stride
+        goal_row, goal_col = divmod(target, stride)
+        open_set = make_frontier(frontier, [(manhattan_to(grid, target)(source), source)])
+        closed_set: Set[int] = set()
+        pop, push = frontier_functions(open_set)
+        if stats is not None:
+            pop, push = stats.instrument(open_set, closed_set, pop, push)
+        came_from: CameFrom = {}
+        g_score: GScore = {source: 0}
+        nodes, distances, slots, partners = self.nodes, self.distances, self.slot, self.partners
+        size, cluster_cols = self.size, self.cluster_cols
+        expanded = 0
+        found = False
+        while open_set:
+            _, current = pop(open_set)
+            if current in closed_set:
+                continue
+            if current == target:
+                found = True
+                break
+            closed_set.add(current)
+            expanded += 1
+            current_g = g_score[current]
+            edges: List[Tuple[int, int]] = []
+            slot = slots.get(current)
+            if slot is not None:
+                row, col = divmod(current, stride)
+                cluster = (row - 1) // size * cluster_cols + (col - 1) // size
+                edges.extend(zip(nodes[cluster], distances[cluster][slot].tolist()))
+                edges.extend((other, cost[other]) for other in partners.get(current, ()))
+            if current == source:
+                edges.extend(start_edges)
+            if current in goal_edges:
+                edges.append((target, goal_edges[current]))
+            for neighbor, step in edges:
+                if step >= UNREACHABLE or neighbor in closed_set:
+                    continue
+                tentative_g = current_g + step
+                if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    row, col = divmod(neighbor, stride)
+                    push(open_set, (tentative_g + abs(row - goal_row) + abs(col - goal_col),
+                                    neighbor))
+        if stats is not None:
+            stats.elapsed += time.perf_counter() - started
+        if not found:
+            return SearchResult([], math.inf, expanded, len(closed_set))
+        waypoints = [target]
+        while waypoints[-1] in came_from:
+            waypoints.append(came_from[waypoints[-1]])
+        return SearchResult(HierarchicalPath(self, waypoints[::-1]), g_score[target],
+                            expanded, len(closed_set))
+
+    def refine(self, a: int, b: int) -> List[Point]:
+        """Cells of the cheapest path from a to b that stays inside their cluster."""
+        grid = self.grid
+        if self.cluster_of(a) != self.cluster_of(b):
+            return [grid.point(a), grid.point(b)]  # a transition between adjacent cells
+        # Searched on the grid itself, so the hop costs what the abstract edge said it would.
+        came_from: CameFrom = {}
+        if b not in self.costs_within(a, (b,), came_from):
+            return []
+        cells = [b]
+        while cells[-1] != a:
+            cells.append(came_from[cells[-1]])
+        return [grid.point(index) for index in reversed(cells)]
+
+class HierarchicalPath(Sequence[Point]):
+    """
+    Path through the abstract waypoints of a ClusterGraph search. Each hop is refined into
+    cells by a search confined to one cluster the first time it is read, so walking the
+    start of a long path only pays for the hops walked so far.
+    """
+    __slots__ = ('graph', 'waypoints', '_hops', '_cells')
+
+    def __init__(self, graph: ClusterGraph, waypoints: List[int]) -> None:
+        self.graph = graph
+        self.waypoints = waypoints
+        self._hops: Dict[int, List[Point]] = {}
+        self._cells: Optional[List[Point]] = None
+
+    def hop(self, i: int) -> List[Point]:
+        """Cells from waypoint i to waypoint i + 1, both included."""
+        cells = self._hops.get(i)
+        if cells is None:
+            cells = self._hops[i] = self.graph.refine(self.waypoints[i], self.waypoints[i + 1])
+        return cells
+
+    def __iter__(self) -> Iterator[Point]:
+        if self._cells is not None:
+            yield from self._cells
+            return
+        yield self.graph.grid.point(self.waypoints[0])
+        for i in range(len(self.waypoints) - 1):
+            yield from self.hop(i)[1:]
+
+    def cells(self) -> List[Point]:
+        if self._cells is None:
+            self._cells = list(iter(self))
+        return self._cells
+
+    def __len__(self) -> int:
+        return len(self.cells())
+
+    def __getitem__(self, index):
+        return self.cells()[index]
+
+    def __repr__(self) -> str:
+        return f"HierarchicalPath(waypoints={len(self.waypoints)})"
+
+_graphs: 'weakref.WeakKeyDictionary[Grid, ClusterGraph]' = weakref.WeakKeyDictionary()
+
+def cluster_graph(grid: Grid, cluster_size: int = 16) -> ClusterGraph:
+    """
+    Return the ClusterGraph of grid, building it on first use. After set_terrain edits only
+    the clusters they touch are updated; the graph is rebuilt if the grid was recompiled.
+    """
+    graph = _graphs.get(grid)
+    if graph is not None and graph.size == cluster_size and graph.version != grid.version:
+        changed = grid.changes_since(graph.version)
+        if changed is None:
+            graph = None
+        else:
+            graph.update(changed)
+    if graph is None or graph.size != cluster_size:
+        graph = _graphs[grid] = ClusterGraph(grid, cluster_size)
+    return graph
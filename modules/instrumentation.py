@@ -0,0 +1,82 @@
+"""
+Search instrumentation: counters, per-expansion hooks and sampled timings.
+"""
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+FrontierFunctions = Tuple[Callable[[Any], Any], Callable[[Any, Any], None]]
+
+class SearchStats:
+    """
+    Counters for one search, filled in when passed as stats= to a search function.
+    The search loop calls whatever open-set pop/push functions it is given; instrumenting a
+    search swaps in counting wrappers, so a search run without stats uses the bare frontier
+    functions and pays nothing for the instrumentation.
+
+    on_expand is called with the cell index of every node popped for expansion (stale
+    entries are skipped). With sample_every=N, every Nth pop records a (seconds, pops,
+    open set size) sample. trace_memory records the peak traced allocation of a full
+    search with tracemalloc, which slows the search down considerably.
+    """
+    def __init__(self, on_expand: Optional[Callable[[int], None]] = None,
+                 sample_every: int = 0, trace_memory: bool = False) -> None:
+        self.on_expand = on_expand
+        self.sample_every = sample_every
+        self.trace_memory = trace_memory
+        self.pushes = 0        # entries added to the open set (decrease-key updates excluded)
+        self.pops = 0
+        self.stale_pops = 0
+        self.relaxations = 0   # edges that improved a neighbor's g-score
+        self.peak_open = 0
+        self.peak_memory = 0   # bytes, only with trace_memory
+        self.elapsed = 0.0     # seconds spent inside instrumented search calls
+        self.samples: List[Tuple[float, int, int]] = []
+        self._started: Optional[float] = None
+
+    @property
+    def expansions(self) -> int:
+        return self.pops - self.stale_pops
+
+    def instrument(self, open_set: Any, closed_set: Any, base_pop: Callable[[Any], Any],
+                   base_push: Callable[[Any, Any], None]) -> FrontierFunctions:
+        """Wrap the open set's pop/push functions so that they record into these stats."""
+        on_expand, sample_every = self.on_expand, self.sample_every
+        if self._started is None:
+            self._started = time.perf_counter()
+        self.peak_open = max(self.peak_open, len(open_set))
+
+        def pop(heap: Any) -> Any:
+            item = base_pop(heap)
+            self.pops += 1
+            if item[1] in closed_set:
+                self.stale_pops += 1
+            elif on_expand is not None:
+                on_expand(item[1])
+            if sample_every and self.pops % sample_every == 0:
+                self.samples.append((time.perf_counter() - self._started, self.pops, len(heap)))
+            return item
+
+        def push(heap: Any, item: Any) -> None:
+            size = len(heap)
+            base_push(heap, item)
+            self.relaxations += 1
+            if len(heap) > size:
+                self.pushes += 1
+                if size >= self.peak_open:
+                    self.peak_open = size + 1
+
+        return pop, push
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'pushes': self.pushes, 'pops': self.pops, 'stale_pops': self.stale_pops,
+                'expansions': self.expansions, 'relaxations': self.relaxations,
+                'peak_open': self.peak_open, 'peak_memory': self.peak_memory,
+                'elapsed': self.elapsed, 'samples': [list(s) for s in self.samples]}
+
+    def to_json(self, **kwargs: Any) -> str:
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def __repr__(self) -> str:
+        return (f"SearchStats(pops={self.pops}, pushes={self.pushes}, "
+                f"stale_pops={self.stale_pops}, peak_open={self.peak_open})")
@@ -0,0 +1,191 @@
+"""
+Landmark (ALT) heuristics: A* lower bounds from precomputed landmark distances.
+
+For a landmark L, the triangle inequality gives d(v, t) >= d(v, L) - d(t, L) and
+d(v, t) >= d(L, t) - d(L, v). Both bounds are differences of exact distances, so they are
+consistent and usually much tighter than Manhattan distance behind walls and slow terrain.
+One distance field per landmark is enough for 4-connected cost models: a path reversed
+costs the same but for its end cells' entry costs, so d(L, v) = d(v, L) - cost(L) + cost(v).
+With diagonal moves that no longer holds and only the first bound is used.
+"""
+import math
+import weakref
+import zlib
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .flowfield import UNREACHABLE, distance_field
+from .grid import DEFAULT_COSTS, Grid
+
+class Landmarks:
+    """
+    Exact distances from every cell to each of K landmarks, stored as one (K, grid.size)
+    array over the grid's padded layout. The array is uint16 when every distance fits
+    (uint32 otherwise) with the dtype's largest value marking cells that cannot reach the
+    landmark. Build with Landmarks.build(grid, count) or load one saved next to the map.
+    """
+    def __init__(self, grid: Grid, cells: Sequence[int], distances: np.ndarray) -> None:
+        self.grid = grid
+        self.version = grid.version
+        self.cells = list(cells)
+        self.distances = distances
+        self.sentinel = int(np.iinfo(distances.dtype).max)
+        self._rows = [memoryview(row) for row in distances]
+        self._heuristic: Tuple[Optional[tuple], Optional[Callable[[int], int]]] = (None, None)
+
+    @classmethod
+    def build(cls, grid: Grid, count: int = 8) -> 'Landmarks':
+        """
+        Pick count landmarks by farthest-point selection (each new landmark is the reachable
+        cell farthest from those already chosen) and store their distance fields.
+        """
+        open_cells = np.flatnonzero(grid.passable)
+        if not open_cells.size:
+            raise ValueError("the grid has no passable cells")
+        # Landmarks go in the largest connected region. Regions are flooded from the open
+        # cells nearest the middle of the map until no unflooded region can be larger.
+        rows, cols = np.divmod(open_cells, grid.stride)
+        open_cells = open_cells[np.argsort(np.abs(rows - grid.rows // 2) +
+                                           np.abs(cols - grid.cols // 2), kind='stable')]
+        covered = np.zeros(grid.size, dtype=bool)
+        reachable = covered
+        nearest = None
+        for seed in open_cells:
+            if covered[seed]:
+                continue
+            field = distance_field(grid, grid.point(int(seed)))
+            region = field != UNREACHABLE
+            covered |= region
+            if nearest is None or region.sum() > reachable.sum():
+                nearest, reachable = field.astype(np.int64), region
+            if reachable.sum() >= len(open_cells) - covered.sum():
+                break
+        cells: List[int] = []
+        fields = []
+        for _ in range(count):
+            candidates = np.where(reachable, nearest, -1)
+            if cells:
+                candidates[cells] = -1
+            cell = int(np.argmax(candidates))
+            if candidates[cell] < 0:
+                break
+            field = distance_field(grid, grid.point(cell))
+            cells.append(cell)
+            fields.append(field)
+            nearest = field if len(cells) == 1 else np.minimum(nearest, field)
+        distances = np.stack(fields)
+        finite = distances[distances != UNREACHABLE]
+        dtype = np.uint16 if finite.size == 0 or finite.max() < 0xFFFF else np.uint32
+        distances = np.where(distances == UNREACHABLE, np.iinfo(dtype).max,
+                             distances).astype(dtype)
+        return cls(grid, cells, distances)
+
+    def save(self, path: str) -> None:
+        """Save to an .npz file, tagged with the map's shape and terrain checksum."""
+        np.savez_compressed(path, cells=np.asarray(self.cells, dtype=np.int64),
+                            distances=self.distances,
+                            shape=np.asarray((self.grid.rows, self.grid.cols)),
+                            checksum=np.asarray(terrain_checksum(self.grid)))
+
+    @classmethod
+    def load(cls, path: str, grid: Grid) -> 'Landmarks':
+        """Load landmarks saved for grid; raises ValueError if they belong to another map."""
+        with np.load(path) as data:
+            if (tuple(data['shape']) != (grid.rows, grid.cols) or
+                    int(data['checksum']) != terrain_checksum(grid)):
+                raise ValueError(f"{path} holds landmarks for a different map")
+            return cls(grid, data['cells'].tolist(), data['distances'])
+
+    def lower_bounds(self, goal: int, cells: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Vectorized heuristic: the largest landmark or cost model lower bound on the cost
+        from each of cells (flat indices, all cells if None) to goal.
+        """
+        grid = self.grid
+        if cells is None:
+            cells = np.arange(grid.size)
+        cells = np.asarray(cells, dtype=np.intp)
+        at_cells = self.distances[:, cells].astype(np.int64)
+        at_goal = self.distances[:, goal].astype(np.int64)[:, None]
+        valid = (at_cells != self.sentinel) & (at_goal != self.sentinel)
+        cost = grid.cost.astype(np.int64)
+        bounds = at_cells - at_goal
+        if grid.cost_model.reversible:
+            bounds = np.maximum(bounds, (at_goal + cost[goal]) - (at_cells + cost[cells]))
+        bound = np.where(valid, bounds, 0).max(axis=0, initial=0)
+        return np.maximum(bound, grid.cost_model.lower_bounds(grid, goal, cells))
+
+    def heuristic(self, goal: int, start: Optional[int] = None,
+                  active: int = 4) -> Callable[[int], int]:
+        """
+        Per-cell heuristic towards goal for the search loop, the largest of the cost model's
+        bound and the bounds of the active landmarks that are tightest at start (all of
+        them if start is None). The last one built is reused, so step functions can ask for
+        it on every expansion.
+        """
+        key = (goal, start)
+        if self._heuristic[0] == key:
+            return self._heuristic[1]
+        base = self.grid.heuristic(goal)
+        reversible = self.grid.cost_model.reversible
+        sentinel = self.sentinel
+        cost = memoryview(self.grid.cost)
+        order = range(len(self.cells))
+        if start is not None:
+            at_start = self.lower_bounds_by_landmark(goal, start)
+            order = sorted(order, key=lambda k: -at_start[k])[:active]
+        terms = []
+        for k in order:
+            row = self._rows[k]
+            at_goal = row[goal]
+            if at_goal != sentinel:
+                # Without reversible paths the second bound does not hold; -inf disables it.
+                back = at_goal + cost[goal] if reversible else -math.inf
+                terms.append((row, at_goal, back))
+
+        def h(index: int) -> int:
+            best = base(index)
+            for row, at_goal, back in terms:
+                at_index = row[index]
+                if at_index == sentinel:
+                    continue
+                bound = at_index - at_goal
+                if bound > best:
+                    best = bound
+                bound = back - at_index - cost[index]
+                if bound > best:
+                    best = bound
+            return best
+        self._heuristic = (key, h)
+        return h
+
+    def lower_bounds_by_landmark(self, goal: int, cell: int) -> List[int]:
+        """The bound each landmark gives on the cost from cell to goal (0 if none)."""
+        at_cell = self.distances[:, cell].astype(np.int64)
+        at_goal = self.distances[:, goal].astype(np.int64)
+        cost = self.grid.cost
+        bounds = at_cell - at_goal
+        if self.grid.cost_model.reversible:
+            bounds = np.maximum(bounds, (at_goal + int(cost[goal])) - (at_cell + int(cost[cell])))
+        valid = (at_cell != self.sentinel) & (at_goal != self.sentinel)
+        return np.where(valid, bounds, 0).tolist()
+
+def terrain_checksum(grid: Grid) -> int:
+    """Checksum of the terrain, and of the cost model unless it is the default one."""
+    checksum = zlib.crc32(np.ascontiguousarray(grid.terrain).tobytes())
+    if grid.cost_model != DEFAULT_COSTS:
+        checksum = zlib.crc32(repr(grid.cost_model).encode(), checksum)
+    return checksum
+
+# Landmarks already built per grid, with the count they were asked for.
+_landmarks: 'weakref.WeakKeyDictionary[Grid, Tuple[int, Landmarks]]' = \
+    weakref.WeakKeyDictionary()
+
+def grid_landmarks(grid: Grid, count: int = 8) -> Landmarks:
+    """Return the landmarks of grid, building them on first use or after the grid changed."""
+    built, landmarks = _landmarks.get(grid, (0, None))
+    if landmarks is None or built != count or landmarks.version != grid.version:
+        landmarks = Landmarks.build(grid, count)
+        _landmarks[grid] = (count, landmarks)
+    return landmarks
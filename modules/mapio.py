@@ -0,0 +1,224 @@
+"""
+Map and scenario files.
+
+Two map formats are supported:
+
+- Moving AI benchmark maps (.map): a short text header followed by one character per cell.
+  '.' and 'G' are open ground, 'S' (swamp) is slow terrain, and '@', 'O', 'T' and 'W' are
+  impassable. Saved maps use '.', '@' and 'S'.
+- Binary grids (.grid): a 32-byte header, then the terrain in the grid's padded flat
+  layout (uint8), the heights (float32) and, optionally, the move-cost tables compiled
+  under the default cost model. Everything is opened with numpy.memmap, so nothing is
+  parsed, compiled or copied on load; processes that open the same file share its pages.
+
+Moving AI scenario files (.scen) are read one line at a time.
+"""
+import os
+from typing import Iterable, Iterator, NamedTuple, Tuple
+
+import numpy as np
+
+from .grid import DEFAULT_COSTS, EMPTY, SLOW, TERRAIN_HEIGHTS, WALL, Grid
+
+Point = Tuple[int, int]
+
+MAP_FORMATS: Tuple[str, ...] = ('.map', '.grid')
+
+# Terrain class of each Moving AI map character; anything else is an error.
+_MAP_CHARS = {b'.': EMPTY, b'G': EMPTY, b'S': SLOW,
+              b'@': WALL, b'O': WALL, b'T': WALL, b'W': WALL}
+_TERRAIN_CHARS = np.frombuffer(b'.@S', dtype=np.uint8)
+
+_MAGIC = b'PFGRID\x00\x01'
+_HEADER = np.dtype([('magic', 'S8'), ('rows', '<u4'), ('cols', '<u4'),
+                    ('heights_offset', '<u8'), ('tables_offset', '<u8')])
+# At tables_offset (0 if there are none): the dtypes of the entry costs and of the move
+# costs, and the number of moves. Then the entry costs, passability (one byte per cell),
+# and the forward and reverse move costs, each starting at a multiple of 8 bytes.
+_TABLES = np.dtype([('cost_dtype', 'S4'), ('move_dtype', 'S4'), ('moves', '<u4'),
+                    ('reserved', '<u4')])
+
+class ScenarioEntry(NamedTuple):
+    """One line of a Moving AI .scen file, with points as (row, col)."""
+    bucket: int
+    map: str
+    width: int
+    height: int
+    start: Point
+    goal: Point
+    optimal: float  # reference length from the file (8-connected for most benchmark sets)
+
+def read_moving_ai_map(path: str) -> Grid:
+    """Load a Moving AI .map file."""
+    with open(path, 'rb') as fh:
+        header = {}
+        for line in fh:
+            line = line.strip()
+            if line == b'map':
+                break
+            key, _, value = line.partition(b' ')
+            header[key.decode()] = value.strip().decode()
+        else:
+            raise ValueError(f"{path}: no 'map' line")
+        try:
+            rows, cols = int(header['height']), int(header['width'])
+        except (KeyError, ValueError):
+            raise ValueError(f"{path}: header needs numeric height and width") from None
+        lines = [line.rstrip(b'\r\n') for line in fh]
+    lines = [line for line in lines if line]
+    if len(lines) != rows or any(len(line) != cols for line in lines):
+        raise ValueError(f"{path}: expected {rows} rows of {cols} cells")
+    chars = np.frombuffer(b''.join(lines), dtype=np.uint8).reshape(rows, cols)
+    table = np.full(256, 255, dtype=np.uint8)
+    for char, terrain in _MAP_CHARS.items():
+        table[char[0]] = terrain
+    terrain = table[chars]
+    if (terrain == 255).any():
+        bad = bytes(sorted(set(chars[terrain == 255].tolist())))
+        raise ValueError(f"{path}: unknown map characters {bad!r}")
+    return Grid(terrain, np.asarray(TERRAIN_HEIGHTS, dtype=np.float32)[terrain])
+
+def write_moving_ai_map(grid: Grid, path: str) -> None:
+    """Save a grid as a Moving AI .map file (heights are not stored)."""
+    rows = _TERRAIN_CHARS[grid.terrain]
+    with open(path, 'wb') as fh:
+        fh.write(f"type octile\nheight {grid.rows}\nwidth {grid.cols}\nmap\n".encode())
+        for row in rows:
+            fh.write(row.tobytes() + b'\n')
+
+def _aligned(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+def write_binary_grid(grid: Grid, path: str, tables: bool = True) -> None:
+    """
+    Save a grid's padded terrain and its heights in the memory-mappable .grid format, with
+    the move-cost tables of the default cost model unless tables is False. Tables make the
+    file about 3x larger, but read_binary_grid can then map them instead of compiling.
+    """
+    terrain_bytes, heights_bytes = grid.size, 4 * grid.rows * grid.cols
+    heights_offset = _HEADER.itemsize + _aligned(terrain_bytes)
+    header = np.zeros((), dtype=_HEADER)
+    header['magic'] = _MAGIC
+    header['rows'], header['cols'] = grid.rows, grid.cols
+    header['heights_offset'] = heights_offset
+    arrays = []
+    if tables:
+        if grid.cost_model != DEFAULT_COSTS:
+            grid = Grid.from_padded(grid.cells, grid.rows, grid.cols, grid.heights)
+        cost, passable, forward, reverse = grid.tables()
+        arrays = [cost, passable, *forward, *reverse]
+        header['tables_offset'] = heights_offset + _aligned(heights_bytes)
+        info = np.zeros((), dtype=_TABLES)
+        info['cost_dtype'], info['move_dtype'] = cost.dtype.str, forward[0].dtype.str
+        info['moves'] = len(forward)
+    with open(path, 'wb') as fh:
+        fh.write(header.tobytes())
+        fh.write(np.ascontiguousarray(grid.cells).tobytes())
+        fh.write(bytes(heights_offset - _HEADER.itemsize - terrain_bytes))
+        fh.write(np.ascontiguousarray(grid.heights, dtype='<f4').tobytes())
+        if arrays:
+            fh.write(bytes(_aligned(heights_bytes) - heights_bytes))
+            fh.write(info.tobytes())
+            for array in arrays:
+                data = np.ascontiguousarray(array).tobytes()
+                fh.write(data + bytes(_aligned(len(data)) - len(data)))
+
+def read_binary_grid(path: str, mode: str = 'c') -> Grid:
+    """
+    Open a .grid file through numpy.memmap, with its move-cost tables if it has them
+    (otherwise they are compiled, which is a full pass over the map). Searches only read
+    the mapped arrays, so the default copy-on-write mode shares every page with other
+    processes that open the file; Grid.set_terrain patches terrain and tables in place, so
+    only the pages an edit touches are copied into the process, and the file is never
+    written. 'r' maps it read-only, so edits raise instead.
+    """
+    header = np.fromfile(path, dtype=_HEADER, count=1)
+    if header.size != 1 or header['magic'][0] != _MAGIC:
+        raise ValueError(f"{path} is not a binary grid file")
+    rows, cols = int(header['rows'][0]), int(header['cols'][0])
+    size = (rows + 2) * (cols + 2)
+    heights_offset = int(header['heights_offset'][0])
+    file_size = os.path.getsize(path)
+    if file_size < heights_offset + 4 * rows * cols:
+        raise ValueError(f"{path} is truncated")
+    tables = None
+    tables_offset = int(header['tables_offset'][0])
+    if tables_offset:
+        tables = _map_tables(path, mode, tables_offset, size, file_size)
+    cells = np.memmap(path, dtype=np.uint8, mode=mode, offset=_HEADER.itemsize, shape=(size,))
+    heights = np.memmap(path, dtype='<f4', mode=mode, offset=heights_offset,
+                        shape=(rows, cols))
+    return Grid.from_padded(cells, rows, cols, heights, tables=tables)
+
+def _map_tables(path: str, mode: str, offset: int, size: int, file_size: int):
+    """Memory-map the tables stored at offset, in the form Grid.tables() returns them."""
+    info = np.fromfile(path, dtype=_TABLES, count=1, offset=offset)
+    if info.size != 1:
+        raise ValueError(f"{path} is truncated")
+    count = int(info['moves'][0])
+    dtypes = ([np.dtype(info['cost_dtype'][0].decode()), np.dtype(np.bool_)] +
+              [np.dtype(info['move_dtype'][0].decode())] * (2 * count))
+    offset += _TABLES.itemsize
+    if file_size < offset + sum(_aligned(size * dtype.itemsize) for dtype in dtypes):
+        raise ValueError(f"{path} is truncated")
+    arrays = []
+    for dtype in dtypes:
+        arrays.append(np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=(size,)))
+        offset += _aligned(size * dtype.itemsize)
+    return arrays[0], arrays[1], arrays[2:2 + count], arrays[2 + count:]
+
+def load_grid(path: str) -> Grid:
+    """Load a .map or .grid file, picking the format from the extension."""
+    if path.endswith('.map'):
+        return read_moving_ai_map(path)
+    if path.endswith('.grid'):
+        return read_binary_grid(path)
+    raise ValueError(f"unknown map format {path!r}; expected one of {MAP_FORMATS}")
+
+def save_grid(grid: Grid, path: str) -> None:
+    """Save a grid as a .map or .grid file, picking the format from the extension."""
+    if path.endswith('.map'):
+        write_moving_ai_map(grid, path)
+    elif path.endswith('.grid'):
+        write_binary_grid(grid, path)
+    else:
+        raise ValueError(f"unknown map format {path!r}; expected one of {MAP_FORMATS}")
+
+def default_endpoints(grid: Grid) -> Tuple[Point, Point]:
+    """The first and last open cells, for maps that may have walls in the corners."""
+    open_cells = grid.terrain.ravel() != WALL
+    first, last = open_cells.argmax(), open_cells.size - 1 - open_cells[::-1].argmax()
+    return divmod(int(first), grid.cols), divmod(int(last), grid.cols)
+
+def read_scen(path: str) -> Iterator[ScenarioEntry]:
+    """Stream the entries of a Moving AI .scen file without loading it whole."""
+    with open(path) as fh:
+        for number, line in enumerate(fh, 1):
+            fields = line.split()
+            if not fields or fields[0] == 'version':
+                continue
+            if len(fields) != 9:
+                raise ValueError(f"{path}:{number}: expected 9 fields, got {len(fields)}")
+            bucket, name, width, height, start_x, start_y, goal_x, goal_y = fields[:8]
+            yield ScenarioEntry(int(bucket), name, int(width), int(height),
+                                (int(start_y), int(start_x)), (int(goal_y), int(goal_x)),
+                                float(fields[8]))
+
+def write_scen(path: str, entries: Iterable[ScenarioEntry]) -> None:
+    with open(path, 'w') as fh:
+        fh.write("version 1\n")
+        for entry in entries:
+            fh.write(f"{entry.bucket}\t{entry.map}\t{entry.width}\t{entry.height}\t"
+                     f"{entry.start[1]}\t{entry.start[0]}\t{entry.goal[1]}\t{entry.goal[0]}\t"
+                     f"{entry.optimal:.8f}\n")
+
+def scen_map_path(scen_path: str, entry: ScenarioEntry) -> str:
+    """
+    Locate the map of a scenario entry. Benchmark sets name maps relative to their own
+    root, so the path is tried next to the .scen file first and then by file name alone.
+    """
+    folder = os.path.dirname(scen_path)
+    candidate = os.path.join(folder, entry.map)
+    if os.path.exists(candidate):
+        return candidate
+    return os.path.join(folder, os.path.basename(entry.map))
@@ -0,0 +1,162 @@
+"""
+Incremental replanning with D* Lite for terrain that changes while an agent moves.
+
+The planner searches backwards from the goal, so its g-values are distances to the goal and
+stay valid as the agent walks. After cells are edited (see grid.Grid.set_terrain), only the
+cells whose outgoing moves changed are re-evaluated and the search repairs the part of the
+tree that depended on them, instead of starting over.
+"""
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .grid import Grid
+
+Point = Tuple[int, int]
+Key = Tuple[float, float]
+
+class DStarLite:
+    """
+    D* Lite (Koenig and Likhachev) on a Grid from a moving start to a fixed goal.
+    Call move_to() as the agent advances, update() with the cells that were edited, then
+    compute() and path() for the repaired route. Like the other searches it keeps lazy heap
+    entries: an entry whose key no longer matches the cell's current key is skipped.
+    """
+    def __init__(self, grid: Grid, start: Point, goal: Point) -> None:
+        if not (grid.is_passable(start) and grid.is_passable(goal)):
+            raise ValueError(f"start {start} and goal {goal} must be passable cells of the grid")
+        self.grid = grid
+        self.start = grid.index(start)
+        self.goal = grid.index(goal)
+        self.h = grid.heuristic(self.start)
+        self.km = 0
+        self.g: Dict[int, float] = {}
+        self.rhs: Dict[int, float] = {self.goal: 0}
+        self.keys: Dict[int, Key] = {}
+        self.open_set: List[Tuple[float, float, int]] = []
+        self.expanded = 0
+        self._queue(self.goal)
+
+    def _key(self, index: int) -> Key:
+        best = min(self.g.get(index, math.inf), self.rhs.get(index, math.inf))
+        return best + self.h(index) + self.km, best
+
+    def _queue(self, index: int) -> None:
+        """Queue a cell if it is inconsistent (g != rhs), otherwise drop it from the queue."""
+        if self.g.get(index, math.inf) != self.rhs.get(index, math.inf):
+            key = self.keys[index] = self._key(index)
+            heapq.heappush(self.open_set, (key[0], key[1], index))
+        else:
+            self.keys.pop(index, None)
+
+    def _lookahead(self, index: int) -> float:
+        """Cheapest move from index plus the g-value of the cell it leads to."""
+        g = self.g
+        best = math.inf
+        for offset, costs in self.grid.moves:
+            cost = costs[index]
+            if cost:
+                best = min(best, cost + g.get(index + offset, math.inf))
+        return best
+
+    def _set_rhs(self, index: int, value: float) -> None:
+        if value == math.inf:
+            self.rhs.pop(index, None)
+        else:
+            self.rhs[index] = value
+
+    def move_to(self, pos: Point) -> None:
+        """Move the start to the agent's new cell; queued keys stay valid through km."""
+        index = self.grid.index(pos)
+        self.km += self.h(index)
+        self.start = index
+        self.h = self.grid.heuristic(index)
+
+    def update(self, cells: Iterable[Point]) -> None:
+        """Re-evaluate every cell whose moves changed when the given cells were edited."""
+        offsets = [0] + [offset for offset, _ in self.grid.moves]
+        touched = {self.grid.index(pos) + offset for pos in cells for offset in offsets}
+        for index in touched:
+            if index != self.goal:
+                self._set_rhs(index, self._lookahead(index))
+                self._queue(index)
+
+    def compute(self, max_expansions: Optional[int] = None) -> bool:
+        """
+        Expand cells until the start is consistent and nothing queued can improve it, or
+        max_expansions cells were expanded. Returns whether the plan is complete.
+        """
+        open_set, keys, g, rhs = self.open_set, self.keys, self.g, self.rhs
+        reverse_moves, goal = self.grid.reverse_moves, self.goal
+        expanded = 0
+        while open_set:
+            top_k1, top_k2, u = open_set[0]
+            if keys.get(u) != (top_k1, top_k2):
+                heapq.heappop(open_set)
+                continue
+            start = self.start
+            if ((top_k1, top_k2) >= self._key(start) and
+                    rhs.get(start, math.inf) <= g.get(start, math.inf)):
+                return True
+            if expanded == max_expansions:
+                return False
+            heapq.heappop(open_set)
+            del keys[u]
+            new_key = self._key(u)
+            if (top_k1, top_k2) < new_key:
+                # The key went stale after the start moved; requeue it with its real key.
+                keys[u] = new_key
+                heapq.heappush(open_set, (new_key[0], new_key[1], u))
+                continue
+            expanded += 1
+            self.expanded += 1
+            g_u = g.get(u, math.inf)
+            rhs_u = rhs.get(u, math.inf)
+            if g_u > rhs_u:
+                g[u] = rhs_u
+                for offset, costs in reverse_moves:
+                    cost = costs[u]
+                    if cost:
+                        s = u + offset
+                        if s != goal and cost + rhs_u < rhs.get(s, math.inf):
+                            rhs[s] = cost + rhs_u
+                            self._queue(s)
+            else:
+                g.pop(u, None)
+                for offset, costs in reverse_moves:
+                    cost = costs[u]
+                    if cost:
+                        s = u + offset
+                        if s != goal and rhs.get(s, math.inf) == cost + g_u:
+                            self._set_rhs(s, self._lookahead(s))
+                            self._queue(s)
+                if u != goal:
+                    self._set_rhs(u, self._lookahead(u))
+                self._queue(u)
+        return True
+
+    @property
+    def cost(self) -> float:
+        """Cost of the current plan from the start, inf if the goal is cut off."""
+        return self.rhs.get(self.start, math.inf)
+
+    def path(self) -> List[Point]:
+        """Follow the cheapest moves from the start to the goal; empty if there is no path."""
+        if self.cost == math.inf:
+            return []
+        g, moves, point = self.g, self.grid.moves, self.grid.point
+        current = self.start
+        path = [point(current)]
+        for _ in range(self.grid.size):
+            if current == self.goal:
+                return path
+            best, best_cost = None, math.inf
+            for offset, costs in moves:
+                cost = costs[current]
+                if cost and cost + g.get(current + offset, math.inf) < best_cost:
+                    best, best_cost = current + offset, cost + g.get(current + offset, math.inf)
+            if best is None:
+                return []
+            current = best
+            path.append(point(current))
+        return []
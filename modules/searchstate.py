@@ -0,0 +1,173 @@
+"""
+Reusable, array-backed search state.
+
+A search needs a g-score, a parent and a closed flag per cell. Dicts and sets hold them for
+one query and are rebuilt for the next; a SearchState keeps flat arrays sized to the grid
+instead and tells current entries from old ones by generation stamps, so reset() is O(1)
+and the arrays are reused across queries without being cleared or reallocated.
+"""
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+
+# g-score of a cell that was given a parent before its g-score (never a real cost).
+NO_SCORE = (1 << 63) - 1
+_STAMP_LIMIT = (1 << 32) - 1
+
+class SearchState:
+    """
+    g-scores, parents and closed flags for every cell of a grid of size cells.
+    A cell's g-score and parent are current when seen[cell] equals generation, and it is
+    closed when closed[cell] equals closed_generation. reset() bumps both generations;
+    clear_closed() bumps only the closed one, for searches that reopen cells. views() gives
+    dict- and set-like wrappers for code written against came_from/g_score/closed_set;
+    the A* and Dijkstra loops recognise them and work on the arrays directly.
+    """
+    __slots__ = ('size', 'g', 'parent', 'seen', 'closed', 'generation', 'closed_generation',
+                 'closed_count', '_views')
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.g = array('q', bytes(8 * size))
+        self.parent = array('i', bytes(4 * size))
+        self.seen = array('I', bytes(4 * size))
+        self.closed = array('I', bytes(4 * size))
+        self.generation = 0
+        self.closed_generation = 0
+        self.closed_count = 0
+        self._views = (ClosedView(self), ParentView(self), ScoreView(self))
+        self.reset()
+
+    def reset(self, start: Optional[int] = None) -> None:
+        """Forget every cell in O(1); with start, begin a new query there at g-score 0."""
+        if max(self.generation, self.closed_generation) >= _STAMP_LIMIT:
+            # The stamps would wrap around; clear them once and start counting again.
+            self.seen = array('I', bytes(4 * self.size))
+            self.closed = array('I', bytes(4 * self.size))
+            self.generation = self.closed_generation = 0
+        self.generation += 1
+        self.closed_generation += 1
+        self.closed_count = 0
+        if start is not None:
+            self.seen[start] = self.generation
+            self.g[start] = 0
+            self.parent[start] = -1
+
+    def clear_closed(self) -> None:
+        if self.closed_generation >= _STAMP_LIMIT:
+            self.closed = array('I', bytes(4 * self.size))
+            self.closed_generation = 0
+        self.closed_generation += 1
+        self.closed_count = 0
+
+    def views(self) -> Tuple['ClosedView', 'ParentView', 'ScoreView']:
+        """The (closed_set, came_from, g_score) triple the step functions take."""
+        return self._views
+
+class ClosedView:
+    """Set-like view of a SearchState's closed cells."""
+    __slots__ = ('state',)
+
+    def __init__(self, state: SearchState) -> None:
+        self.state = state
+
+    def __contains__(self, index: Any) -> bool:
+        state = self.state
+        return state.closed[index] == state.closed_generation
+
+    def add(self, index: int) -> None:
+        state = self.state
+        if state.closed[index] != state.closed_generation:
+            state.closed[index] = state.closed_generation
+            state.closed_count += 1
+
+    def discard(self, index: int) -> None:
+        state = self.state
+        if state.closed[index] == state.closed_generation:
+            state.closed[index] = 0
+            state.closed_count -= 1
+
+    def clear(self) -> None:
+        self.state.clear_closed()
+
+    def __len__(self) -> int:
+        return self.state.closed_count
+
+    def __iter__(self) -> Iterator[int]:
+        state = self.state
+        mark = state.closed_generation
+        return (index for index, stamp in enumerate(state.closed) if stamp == mark)
+
+class ParentView:
+    """Dict-like view of a SearchState's parent links (the start has none)."""
+    __slots__ = ('state',)
+
+    def __init__(self, state: SearchState) -> None:
+        self.state = state
+
+    def __contains__(self, index: Any) -> bool:
+        state = self.state
+        return state.seen[index] == state.generation and state.parent[index] >= 0
+
+    def __getitem__(self, index: int) -> int:
+        if index not in self:
+            raise KeyError(index)
+        return self.state.parent[index]
+
+    def get(self, index: int, default: Any = None) -> Any:
+        return self.state.parent[index] if index in self else default
+
+    def __setitem__(self, index: int, parent: int) -> None:
+        state = self.state
+        if state.seen[index] != state.generation:
+            state.seen[index] = state.generation
+            state.g[index] = NO_SCORE
+        state.parent[index] = parent
+
+class ScoreView:
+    """Dict-like view of a SearchState's g-scores."""
+    __slots__ = ('state',)
+
+    def __init__(self, state: SearchState) -> None:
+        self.state = state
+
+    def __contains__(self, index: Any) -> bool:
+        state = self.state
+        return state.seen[index] == state.generation and state.g[index] != NO_SCORE
+
+    def __getitem__(self, index: int) -> int:
+        if index not in self:
+            raise KeyError(index)
+        return self.state.g[index]
+
+    def get(self, index: int, default: Any = None) -> Any:
+        return self.state.g[index] if index in self else default
+
+    def __setitem__(self, index: int, score: int) -> None:
+        state = self.state
+        if state.seen[index] != state.generation:
+            state.seen[index] = state.generation
+            state.parent[index] = -1
+        state.g[index] = score
+
+# One spare state per thread for run-to-completion searches.
+_local = threading.local()
+
+@contextmanager
+def borrowed_state(size: int, start: int) -> Iterator[SearchState]:
+    """
+    Lend this thread's spare SearchState, reset for a query from start and large enough for
+    size cells. It only grows, so one state serves every grid; a nested search gets a state
+    of its own.
+    """
+    state = getattr(_local, 'state', None)
+    if state is None or state.size < size:
+        state = SearchState(size)
+    else:
+        _local.state = None
+    state.reset(start)
+    try:
+        yield state
+    finally:
+        _local.state = state
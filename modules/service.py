@@ -0,0 +1,356 @@
+"""
+Long-lived local pathfinding service: keeps maps loaded and caches warm in a process pool
+and answers queries from any number of clients over a Unix socket or local TCP port.
+
+The protocol is JSON Lines. Each request is one object per line, such as
+    {"id": 7, "map": "maze:512x512:7", "start": [0, 0], "goal": [511, 511],
+     "algorithm": "astar", "path": true}
+and gets one response line with the same id and the fields of a batch result row
+(found, cost, length, expanded, time, error), plus path as [row, col] pairs unless the
+request sets "path": false. {"id": 8, "op": "stats"} returns the service counters.
+Requests may be pipelined; responses are written as they complete, not in request order.
+A map is any batch.load_map spec; every worker builds it once and keeps it, along with a
+PathCache of results and Dijkstra trees, for as long as the service runs.
+
+Queries for the same map, start and algorithm that arrive within batch_window seconds of
+each other are solved together in one worker task. For the exact solvers, a batch of
+several goals builds the start's Dijkstra tree once and reads every goal's path from it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from .algorithms import SOLVERS
+from .batch import _worker_cache, worker_map
+from .cache import EXACT_SOLVERS
+from .frontier import FRONTIERS
+
+Point = Tuple[int, int]
+Address = Union[str, Tuple[str, int]]
+BatchKey = Tuple[str, Point, str]
+
+def _warm(specs: Sequence[str]) -> None:
+    """Pool initializer: build the preloaded maps in every worker before it takes queries."""
+    for spec in specs:
+        worker_map(spec)
+
+def solve_group(spec: str, start: Point, goals: List[Point], algorithm: str,
+                frontier: str = 'heap', cache_size: int = 4096,
+                with_path: bool = True) -> List[dict]:
+    """
+    Solve queries from one start to several goals in a worker process, one result row per
+    goal. Rows carry the batch result fields and, with with_path, the path. Failures,
+    including unexpected ones such as a MemoryError while building a huge map, become
+    error rows, so that every query gets an answer.
+    """
+    rows = []
+    try:
+        grid = worker_map(spec)
+        cache = _worker_cache(cache_size, frontier)
+        if len(goals) > 1 and algorithm in EXACT_SOLVERS and grid.is_passable(start):
+            cache.tree(grid, start)  # every goal below is then a parent walk
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        return [{'found': False, 'cost': None, 'length': 0, 'expanded': 0, 'time': 0.0,
+                 'error': error} for _ in goals]
+    for goal in goals:
+        row = {'found': False, 'cost': None, 'length': 0, 'expanded': 0, 'time': 0.0,
+               'error': ''}
+        try:
+            started = time.perf_counter()
+            result = cache.solve(grid, start, goal, algorithm)
+            row['time'] = time.perf_counter() - started
+        except Exception as exc:
+            row['error'] = f"{type(exc).__name__}: {exc}"
+        else:
+            row.update(found=result.found, cost=int(result.cost) if result.found else None,
+                       length=len(result.path), expanded=result.expanded)
+            if with_path:
+                row['path'] = [list(point) for point in result.path]
+        rows.append(row)
+    return rows
+
+def _point(value: Any, name: str) -> Point:
+    if (not isinstance(value, (list, tuple)) or len(value) != 2
+            or not all(isinstance(n, int) for n in value)):
+        raise ValueError(f"{name} must be a [row, col] pair of integers")
+    return (value[0], value[1])
+
+class ServiceStats:
+    """
+    Request counters and the latencies of the last `window` responses, measured from the
+    moment a request is read until its response is ready.
+    """
+    def __init__(self, window: int = 10000) -> None:
+        self.started = time.perf_counter()
+        self.requests = self.errors = self.batches = self.batched = self.in_flight = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.finished: Deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float, error: bool) -> None:
+        self.finished.append(time.perf_counter())
+        self.latencies.append(latency)
+        self.errors += error
+
+    def as_dict(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        latencies = sorted(self.latencies)
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+        recent = [t for t in self.finished if t >= now - 10.0]
+        return {'uptime': now - self.started, 'requests': self.requests,
+                'errors': self.errors, 'in_flight': self.in_flight,
+                'batches': self.batches,
+                'mean_batch': self.batched / self.batches if self.batches else 0.0,
+                'throughput': self.requests / (now - self.started),
+                'recent_throughput': len(recent) / 10.0,
+                'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95),
+                               'p99': percentile(0.99),
+                               'max': latencies[-1] * 1000 if latencies else None}}
+
+class PathService:
+    """
+    Solves queries on a process pool, batching concurrent queries that share a map, start
+    and algorithm (see the module docstring). Use solve() from a coroutine, or serve() to
+    answer socket clients. Workers preload the maps in preload and each keep a PathCache
+    of cache_size results; max_batch caps the goals sent to a worker in one task.
+    """
+    def __init__(self, workers: Optional[int] = None, preload: Sequence[str] = (),
+                 batch_window: float = 0.002, max_batch: int = 256,
+                 cache_size: int = 4096, frontier: str = 'heap') -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.preload = tuple(preload)
+        self.pool = self._start_pool()
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.frontier = frontier
+        self.stats = ServiceStats()
+        self._pending: Dict[BatchKey, List[Tuple[Point, bool, asyncio.Future]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_warm,
+                                   initargs=(self.preload,))
+
+    async def solve(self, spec: str, start: Point, goal: Point, algorithm: str = 'astar',
+                    with_path: bool = True) -> dict:
+        """Queue one query for the next batch of its map, start and algorithm."""
+        if algorithm not in SOLVERS:
+            raise ValueError(f"unknown algorithm {algorithm!r}")
+        loop = asyncio.get_running_loop()
+        key = (spec, tuple(start), algorithm)
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((tuple(goal), with_path, future))
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.batch_window, self._flush, key)
+        return await future
+
+    def _flush(self, key: BatchKey) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        task = asyncio.ensure_future(self._run_batch(key, self._pending.pop(key)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, key: BatchKey,
+                         batch: List[Tuple[Point, bool, asyncio.Future]]) -> None:
+        spec, start, algorithm = key
+        goals = list(dict.fromkeys(goal for goal, _, _ in batch))  # repeated goals once
+        with_path = any(with_path for _, with_path, _ in batch)
+        self.stats.batches += 1
+        self.stats.batched += len(batch)
+        pool = self.pool
+        try:
+            rows = await asyncio.get_running_loop().run_in_executor(
+                pool, solve_group, spec, start, goals, algorithm, self.frontier,
+                self.cache_size, with_path)
+        except Exception as exc:
+            # A worker died (e.g. out of memory) or its rows could not be sent back: fail
+            # this batch, and after a crash go on with a new pool.
+            if isinstance(exc, BrokenProcessPool) and self.pool is pool:
+                pool.shutdown(wait=False)
+                self.pool = self._start_pool()
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        by_goal = dict(zip(goals, rows))
+        for goal, with_path, future in batch:
+            row = by_goal[goal]
+            if not with_path and 'path' in row:
+                row = {name: value for name, value in row.items() if name != 'path'}
+            if not future.done():
+                future.set_result(row)
+
+    async def respond(self, request: dict) -> dict:
+        """Answer one decoded protocol request (a query or an op) with a response object."""
+        if request.get('op') == 'stats':
+            return {'id': request.get('id'), **self.stats.as_dict()}
+        if 'op' in request:
+            raise ValueError(f"unknown op {request['op']!r}")
+        row = await self.solve(request['map'], _point(request['start'], 'start'),
+                               _point(request['goal'], 'goal'),
+                               request.get('algorithm', 'astar'), request.get('path', True))
+        return {'id': request.get('id'), **row}
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter,
+                      lock: asyncio.Lock) -> None:
+        received = time.perf_counter()
+        self.stats.requests += 1
+        self.stats.in_flight += 1
+        request: Any = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+            response = await self.respond(request)
+        except Exception as exc:
+            response = {'id': request.get('id') if isinstance(request, dict) else None,
+                        'error': f"{type(exc).__name__}: {exc}"}
+        finally:
+            self.stats.in_flight -= 1
+        self.stats.record(time.perf_counter() - received, bool(response.get('error')))
+        async with lock:
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+    async def _connection(self, reader: asyncio.StreamReader,
+                          writer: asyncio.StreamWriter) -> None:
+        lock = asyncio.Lock()
+        answers = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(self._answer(line, writer, lock))
+                    answers.add(task)
+                    task.add_done_callback(answers.discard)
+            await asyncio.gather(*answers, return_exceptions=True)
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass  # client went away, sent an overlong line, or the service is stopping
+        finally:
+            writer.close()
+
+    async def serve(self, address: Address) -> None:
+        """Answer clients on a Unix socket path or a (host, port) pair until cancelled."""
+        if isinstance(address, str):
+            # A socket file left behind by a previous run would make the bind fail.
+            if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+                os.unlink(address)
+            server = await asyncio.start_unix_server(self._connection, address,
+                                                     limit=1 << 20)
+        else:
+            server = await asyncio.start_server(self._connection, *address, limit=1 << 20)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+class ServiceClient:
+    """
+    Blocking client for game servers and scripts. address is the service's Unix socket
+    path or a (host, port) pair.
+    """
+    def __init__(self, address: Address, timeout: Optional[float] = None) -> None:
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self._file = self.sock.makefile('rwb')
+        self._next_id = 0
+
+    def request(self, requests: List[dict]) -> List[dict]:
+        """Send requests pipelined and return their responses in request order."""
+        ids = []
+        for request in requests:
+            self._next_id += 1
+            ids.append(self._next_id)
+            self._file.write(json.dumps(dict(request, id=self._next_id)).encode() + b'\n')
+        self._file.flush()
+        responses = {}
+        while len(responses) < len(ids):
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("the path service closed the connection")
+            response = json.loads(line)
+            responses[response['id']] = response
+        return [responses[i] for i in ids]
+
+    def solve(self, spec: str, start: Point, goal: Point, algorithm: str = 'astar',
+              path: bool = True) -> dict:
+        return self.request([{'map': spec, 'start': list(start), 'goal': list(goal),
+                              'algorithm': algorithm, 'path': path}])[0]
+
+    def solve_many(self, spec: str, queries: Sequence[Tuple[Point, Point]],
+                   algorithm: str = 'astar', path: bool = True) -> List[dict]:
+        return self.request([{'map': spec, 'start': list(start), 'goal': list(goal),
+                              'algorithm': algorithm, 'path': path}
+                             for start, goal in queries])
+
+    def stats(self) -> dict:
+        return self.request([{'op': 'stats'}])[0]
+
+    def close(self) -> None:
+        self._file.close()
+        self.sock.close()
+
+    def __enter__(self) -> 'ServiceClient':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='app.py serve',
+                                     description="Answer path queries from local clients")
+    parser.add_argument('--socket', metavar='PATH', help="listen on this Unix socket")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP host if --socket is not given")
+    parser.add_argument('--port', type=int, default=7878, help="TCP port if --socket is not given")
+    parser.add_argument('-j', '--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--preload', nargs='*', default=[], metavar='MAP',
+                        help="map specs every worker builds at startup")
+    parser.add_argument('--batch-window', type=float, default=2.0, metavar='MS',
+                        help="how long a query waits for others from the same start")
+    parser.add_argument('--max-batch', type=int, default=256,
+                        help="most goals solved in one worker task")
+    parser.add_argument('--cache', type=int, default=4096, metavar='SIZE',
+                        help="results each worker keeps")
+    parser.add_argument('--frontier', choices=FRONTIERS, default='heap')
+    args = parser.parse_args(argv)
+
+    service = PathService(args.workers, args.preload, args.batch_window / 1000,
+                          args.max_batch, args.cache, args.frontier)
+    address: Address = args.socket or (args.host, args.port)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # stop like Ctrl+C
+    print(f"path service on {address} with {service.workers} workers", file=sys.stderr)
+    try:
+        asyncio.run(service.serve(address))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        print(json.dumps(service.stats.as_dict()), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Compact binary exploration traces: record a search once, replay and scrub it cheaply.
+
+A trace is the sequence of expanded cells with each one's parent, streamed to disk in
+blocks as the search runs. Within a block every cell is stored as the zigzag varint of its
+delta from the previous cell, shifted left by four bits to make room for the parent: the
+index of the move that leads from the parent to the cell, 14 for no parent, or 15 when the
+parent is not a neighbor and follows in a second varint stream. Most steps take one to
+three bytes. Every keyframe_every steps a keyframe stores the set of cells visited so far
+as a zlib-compressed bitmap, so seeking decodes at most one keyframe interval. The
+final path and a few statistics close the trace.
+
+Records after the header are a tag byte followed by their payload:
+    S  steps block: uint32 count, int64 first cell, uint32 and uint32 stream lengths, streams
+    K  keyframe:    uint64 step, uint32 length, zlib(packbits(visited))
+    P  final path:  uint32 count, int32 cells
+    E  end:         uint32 length, JSON metadata (elapsed seconds, search counters)
+"""
+import json
+import os
+import struct
+import zlib
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .algorithms import astar_step, dijkstra_step
+from .frontier import make_frontier
+from .grid import Grid
+from .landmarks import terrain_checksum
+from .searchstate import SearchState
+
+_MAGIC = b'PFTRACE\x01'
+_HEADER = struct.Struct('<8sIIqqII')   # magic, rows, cols, start, goal, checksum, moves
+_BLOCK = struct.Struct('<IqII')
+_KEYFRAME = struct.Struct('<QI')
+_NO_PARENT, _FAR_PARENT = 14, 15
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """LEB128-encode unsigned integers, all of them in a few array operations."""
+    values = np.asarray(values, dtype=np.uint64)
+    if not values.size:
+        return b''
+    # Number of 7-bit groups in each value.
+    groups = np.ones(values.size, dtype=np.intp)
+    for shift in range(7, 64, 7):
+        groups += values >> np.uint64(shift) > 0
+    width = int(groups.max())
+    shifts = np.arange(width, dtype=np.uint64) * np.uint64(7)
+    chunks = ((values[:, None] >> shifts) & np.uint64(0x7F)).astype(np.uint8)
+    position = np.arange(width)
+    chunks[position < groups[:, None] - 1] |= 0x80
+    return chunks[position < groups[:, None]].tobytes()
+
+def decode_varints(data: bytes) -> np.ndarray:
+    """Decode a byte string of LEB128 varints into a uint64 array."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not raw.size:
+        return np.empty(0, dtype=np.uint64)
+    last = raw < 0x80
+    ends = np.flatnonzero(last)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(raw.size) - np.repeat(starts, ends - starts + 1)
+    payload = (raw & 0x7F).astype(np.uint64) << (position.astype(np.uint64) * np.uint64(7))
+    return np.bitwise_or.reduceat(payload, starts)
+
+class TraceWriter:
+    """
+    Streams a trace to path while a search runs: call record(cell, parent) for every
+    expansion and finish(path) at the end, or close() to abandon it. Steps are buffered and
+    written one block at a time to path + '.part', which replaces path only when the trace
+    is finished, so an abandoned search never clobbers an earlier recording.
+    """
+    def __init__(self, path: str, grid: Grid, start: int, goal: int, block: int = 4096,
+                 keyframe_every: int = 65536) -> None:
+        self.grid = grid
+        self.offsets = [offset for offset, _ in grid.moves]
+        self.block = block
+        # Keyframes fall on block boundaries.
+        self.keyframe_every = max(block, keyframe_every // block * block)
+        self.path = path
+        self.fh: Optional[BinaryIO] = open(path + '.part', 'wb')
+        self.fh.write(_HEADER.pack(_MAGIC, grid.rows, grid.cols, start, goal,
+                                   terrain_checksum(grid), len(self.offsets)))
+        self.fh.write(np.asarray(self.offsets, dtype='<i4').tobytes())
+        self.visited = np.zeros(grid.size, dtype=bool)
+        self.cells: List[int] = []
+        self.parents: List[int] = []
+        self.steps = 0
+
+    def record(self, cell: int, parent: Optional[int]) -> None:
+        self.cells.append(cell)
+        self.parents.append(-1 if parent is None else parent)
+        if len(self.cells) >= self.block:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered steps as one block, and a keyframe if one is due."""
+        if not self.cells or self.fh is None:
+            return
+        cells = np.asarray(self.cells, dtype=np.int64)
+        parents = np.asarray(self.parents, dtype=np.int64)
+        deltas = np.diff(cells, prepend=cells[0])
+        codes = np.full(cells.size, _FAR_PARENT, dtype=np.int64)
+        codes[parents < 0] = _NO_PARENT
+        for code, offset in enumerate(self.offsets):
+            codes[(parents >= 0) & (cells - parents == offset)] = code
+        far = codes == _FAR_PARENT
+        steps = encode_varints((_zigzag(deltas) << np.uint64(4)) | codes.astype(np.uint64))
+        far_parents = encode_varints(_zigzag(parents[far] - cells[far]))
+        self.fh.write(b'S' + _BLOCK.pack(cells.size, int(cells[0]), len(steps),
+                                         len(far_parents)))
+        self.fh.write(steps)
+        self.fh.write(far_parents)
+        self.visited[cells] = True
+        before = self.steps
+        self.steps += cells.size
+        self.cells, self.parents = [], []
+        if self.steps // self.keyframe_every > before // self.keyframe_every:
+            bitmap = zlib.compress(np.packbits(self.visited).tobytes())
+            self.fh.write(b'K' + _KEYFRAME.pack(self.steps, len(bitmap)))
+            self.fh.write(bitmap)
+
+    def finish(self, path: Optional[Sequence[int]] = None,
+               meta: Optional[Dict[str, Any]] = None) -> None:
+        """Write the remaining steps, the final path (if any) and metadata, then close."""
+        if self.fh is None:
+            return
+        self.flush()
+        if path is not None:
+            self.fh.write(b'P' + struct.pack('<I', len(path)))
+            self.fh.write(np.asarray(path, dtype='<i4').tobytes())
+        data = json.dumps(meta or {}).encode()
+        self.fh.write(b'E' + struct.pack('<I', len(data)) + data)
+        self.fh.close()
+        self.fh = None
+        os.replace(self.path + '.part', self.path)
+
+    def close(self) -> None:
+        """Abandon an unfinished trace."""
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+            os.remove(self.path + '.part')
+
+    def __enter__(self) -> 'TraceWriter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+class TraceReader:
+    """
+    Random access to a recorded trace. Opening it only reads the record headers; blocks
+    are decoded when first needed and kept, so replaying forwards decodes each block once
+    and seeking back starts from the nearest keyframe.
+    """
+    def __init__(self, path: str) -> None:
+        self.fh = open(path, 'rb')
+        header = self.fh.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:8] != _MAGIC:
+            raise ValueError(f"{path} is not a search trace")
+        _, self.rows, self.cols, self.start, self.goal, self.checksum, moves = \
+            _HEADER.unpack(header)
+        self.offsets = np.frombuffer(self.fh.read(4 * moves), dtype='<i4').astype(np.int64)
+        self.size = (self.rows + 2) * (self.cols + 2)
+        self.blocks: List[Tuple[int, int, int]] = []     # (first step, count, file offset)
+        self.keyframes: List[Tuple[int, int, int]] = []  # (step, length, file offset)
+        self.path: Optional[List[int]] = None
+        self.meta: Dict[str, Any] = {}
+        self.steps = 0
+        self._decoded: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._first_step: Optional[np.ndarray] = None
+        self._parent: Optional[np.ndarray] = None
+        while True:
+            tag = self.fh.read(1)
+            if not tag:
+                break
+            if tag == b'S':
+                count, _, steps_len, far_len = _BLOCK.unpack(self.fh.read(_BLOCK.size))
+                self.blocks.append((self.steps, count, self.fh.tell() - _BLOCK.size))
+                self.steps += count
+                self.fh.seek(steps_len + far_len, 1)
+            elif tag == b'K':
+                step, length = _KEYFRAME.unpack(self.fh.read(_KEYFRAME.size))
+                self.keyframes.append((step, length, self.fh.tell()))
+                self.fh.seek(length, 1)
+            elif tag == b'P':
+                count, = struct.unpack('<I', self.fh.read(4))
+                self.path = np.frombuffer(self.fh.read(4 * count), dtype='<i4').tolist()
+            elif tag == b'E':
+                length, = struct.unpack('<I', self.fh.read(4))
+                self.meta = json.loads(self.fh.read(length))
+            else:
+                raise ValueError(f"{path}: corrupt trace record {tag!r}")
+        self._block_starts = np.array([first for first, _, _ in self.blocks], dtype=np.int64)
+
+    def close(self) -> None:
+        self.fh.close()
+
+    def check_grid(self, grid: Grid) -> None:
+        """Raise ValueError unless the trace was recorded on this map."""
+        if (grid.rows, grid.cols) != (self.rows, self.cols) or \
+                terrain_checksum(grid) != self.checksum:
+            raise ValueError("the trace was recorded on a different map")
+
+    def _block(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cells and parents (-1 for none) of block i."""
+        decoded = self._decoded.get(i)
+        if decoded is not None:
+            return decoded
+        _, _, offset = self.blocks[i]
+        self.fh.seek(offset)
+        count, first, steps_len, far_len = _BLOCK.unpack(self.fh.read(_BLOCK.size))
+        values = decode_varints(self.fh.read(steps_len))
+        codes = (values & np.uint64(15)).astype(np.int64)
+        cells = first + np.cumsum(_unzigzag(values >> np.uint64(4)))
+        parents = np.full(count, -1, dtype=np.int64)
+        near = codes < len(self.offsets)
+        parents[near] = cells[near] - self.offsets[codes[near]]
+        far = codes == _FAR_PARENT
+        parents[far] = cells[far] + _unzigzag(decode_varints(self.fh.read(far_len)))
+        decoded = self._decoded[i] = (cells, parents)
+        return decoded
+
+    def steps_range(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cells expanded in steps [start, stop) and their parents."""
+        start, stop = max(0, start), min(stop, self.steps)
+        if start >= stop:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        first = int(np.searchsorted(self._block_starts, start, 'right')) - 1
+        last = int(np.searchsorted(self._block_starts, stop, 'left'))
+        cells, parents = zip(*(self._block(i) for i in range(first, last)))
+        base = self.blocks[first][0]
+        return (np.concatenate(cells)[start - base:stop - base],
+                np.concatenate(parents)[start - base:stop - base])
+
+    def visited_at(self, step: int) -> np.ndarray:
+        """Boolean mask of the cells expanded in the first step steps."""
+        step = max(0, min(step, self.steps))
+        keyframe = None
+        for candidate in self.keyframes:
+            if candidate[0] > step:
+                break
+            keyframe = candidate
+        if keyframe is None:
+            visited = np.zeros(self.size, dtype=bool)
+            base = 0
+        else:
+            base, length, offset = keyframe
+            self.fh.seek(offset)
+            bits = np.frombuffer(zlib.decompress(self.fh.read(length)), dtype=np.uint8)
+            visited = np.unpackbits(bits, count=self.size).astype(bool)
+        visited[self.steps_range(base, step)[0]] = True
+        return visited
+
+    def path_to(self, step: int) -> List[int]:
+        """
+        Cells from the start to the cell expanded at step, following the parents recorded
+        up to that step. The first call decodes the whole trace to index the parents.
+        """
+        if self._first_step is None:
+            cells, parents = self.steps_range(0, self.steps)
+            order = np.arange(cells.size)
+            # Each cell's first expansion is the one its descendants were reached through.
+            self._first_step = np.full(self.size, self.steps, dtype=np.int64)
+            np.minimum.at(self._first_step, cells, order)
+            self._parent = np.full(self.size, -1, dtype=np.int64)
+            self._parent[cells[::-1]] = parents[::-1]
+        cell = int(self.steps_range(step, step + 1)[0][0])
+        path = [cell]
+        parent, first_step = self._parent, self._first_step
+        for _ in range(self.size):
+            cell = int(parent[cell])
+            if cell < 0 or first_step[cell] > step:
+                break
+            path.append(cell)
+        return path[::-1]
+
+def record_search(path: str, grid: Grid, start: Tuple[int, int], goal: Tuple[int, int],
+                  astar: bool = True, frontier: str = 'heap') -> int:
+    """
+    Run A* (or Dijkstra) from start to goal headlessly, recording its trace to path.
+    Returns the number of expansions recorded.
+    """
+    if not (grid.is_passable(start) and grid.is_passable(goal)):
+        raise ValueError(f"start {start} and goal {goal} must be passable cells of the grid")
+    source, target = grid.index(start), grid.index(goal)
+    step = astar_step if astar else dijkstra_step
+    state = SearchState(grid.size)
+    state.reset(source)
+    closed_set, came_from, g_score = state.views()
+    open_set = make_frontier(frontier, [(0, source)])
+    with TraceWriter(path, grid, source, target) as trace:
+        while True:
+            current, done, result, _ = step(grid, source, target, open_set, closed_set,
+                                            came_from, g_score)
+            if done:
+                break
+            trace.record(current, came_from.get(current))
+        trace.finish(result.indices() if result is not None else None)
+    return trace.steps
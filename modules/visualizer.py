@@ -1,23 +1,237 @@
-import pygame
-from typing import List, Tuple
+import os
 import time
+from functools import partial
+
+import numpy as np
+import pygame
+from typing import List, Optional, Sequence, Set, Tuple
 
-from .algorithms import heuristic, astar_step, dijkstra_step
+from .algorithms import (astar_step, dijkstra_step, bidirectional_astar_step,
+                         bidirectional_dijkstra_step, BidirectionalState, PathView,
+                         anytime_astar_step, AnytimeState)
+from .frontier import make_frontier
 from .agent import PathAgent
-from .grid import create_grid, START, GOAL
+from .flowfield import UNREACHABLE, Crowd, FlowField, flow_field
+from .instrumentation import SearchStats
+from .landmarks import grid_landmarks
+from .replan import DStarLite
+from .searchstate import SearchState
+from .trace import TraceReader, TraceWriter
+from .worker import SolverSnapshot, SolverWorker
+from .grid import Grid, create_grid, START, GOAL, EMPTY, WALL, SLOW
+
+Point = Tuple[int, int]
+
+def trace_path(prefix: str, name: str) -> str:
+    """File a panel's trace is recorded to or replayed from."""
+    return f"{prefix}.{name}.trace"
+
+def path_members(path) -> Set[Point]:
+    """Cells of a path as a set, reusing the set a PathView already caches."""
+    return path.members() if isinstance(path, PathView) else set(path)
+
+def block_mean(rgb: np.ndarray, block: int) -> np.ndarray:
+    """Average an (h, w, 3) color array over block x block tiles, repeating the last row
+    and column to fill partial tiles."""
+    if block == 1:
+        return rgb
+    h, w = -(-rgb.shape[0] // block), -(-rgb.shape[1] // block)
+    rgb = np.pad(rgb, ((0, h * block - rgb.shape[0]), (0, w * block - rgb.shape[1]), (0, 0)),
+                 mode='edge')
+    # Summing strided slices touches every cell once; a reduction over the tile axes of
+    # a reshaped array is several times slower on large maps.
+    rows = sum(rgb[i::block].astype(np.uint16) for i in range(block))
+    total = sum(rows[:, j::block].astype(np.uint32) for j in range(block))
+    return (total // (block * block)).astype(np.uint8)
+
+def block_any(mask: np.ndarray, block: int) -> np.ndarray:
+    """Whether any cell of each block x block tile of a boolean array is set."""
+    if block == 1:
+        return mask
+    h, w = -(-mask.shape[0] // block), -(-mask.shape[1] // block)
+    mask = np.pad(mask, ((0, h * block - mask.shape[0]), (0, w * block - mask.shape[1])))
+    rows = np.logical_or.reduce([mask[i::block] for i in range(block)])
+    return np.logical_or.reduce([rows[:, j::block] for j in range(block)])
+
+def array_surface(rgb: np.ndarray, scale: int = 1) -> pygame.Surface:
+    """A surface showing an (h, w, 3) color array, each entry as scale x scale pixels."""
+    surface = pygame.surfarray.make_surface(rgb.swapaxes(0, 1))
+    if scale > 1:
+        surface = pygame.transform.scale(surface, (rgb.shape[1] * scale, rgb.shape[0] * scale))
+    return surface
+
+class Camera:
+    """
+    The window of a grid that a panel shows. Zoomed in, every cell takes size x size
+    pixels; zoomed out, every pixel stands for block x block cells. row and col are the
+    top-left cell in view. The camera never zooms out past the level at which the whole
+    map fits the panel, so the panel (width x height pixels) is always filled.
+    """
+    max_size = 64
+
+    def __init__(self, rows: int, cols: int, pixels: int, largest: int) -> None:
+        self.rows, self.cols = rows, cols
+        cells = max(rows, cols)
+        if cells <= pixels:
+            self.fit = (max(1, min(largest, pixels // cells)), 1)
+        else:
+            self.fit = (1, -(-cells // pixels))
+        self.size, self.block = self.fit
+        self.row = self.col = 0
+        self.width, self.height = self.span(cols), self.span(rows)
+
+    def span(self, cells: int) -> int:
+        """Pixels that a run of cells takes at the current zoom."""
+        return -(-cells * self.size // self.block)
+
+    def view_cells(self) -> Tuple[int, int]:
+        """Rows and columns of cells the panel has room for."""
+        return (-(-self.height * self.block // self.size),
+                -(-self.width * self.block // self.size))
+
+    def window(self) -> Tuple[int, int, int, int]:
+        """First and past-the-end row and column of the cells in view."""
+        rows, cols = self.view_cells()
+        return (self.row, min(self.rows, self.row + rows),
+                self.col, min(self.cols, self.col + cols))
+
+    def shows(self, pos: Point) -> bool:
+        first_row, end_row, first_col, end_col = self.window()
+        return first_row <= pos[0] < end_row and first_col <= pos[1] < end_col
+
+    def pixel(self, pos: Point) -> Tuple[int, int]:
+        """Panel coordinates (x, y) of a cell's top-left corner."""
+        return ((pos[1] - self.col) * self.size // self.block,
+                (pos[0] - self.row) * self.size // self.block)
+
+    def cell_at(self, x: int, y: int) -> Optional[Point]:
+        """The cell under panel coordinates (x, y), if any."""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        row = self.row + y * self.block // self.size
+        col = self.col + x * self.block // self.size
+        return (row, col) if row < self.rows and col < self.cols else None
+
+    def zoom(self, steps: int, x: Optional[int] = None, y: Optional[int] = None) -> bool:
+        """
+        Zoom in (steps > 0) or out by factors of two, keeping the cell under panel
+        coordinates (x, y), by default the center, in place. Returns whether it zoomed.
+        """
+        x = self.width // 2 if x is None else x
+        y = self.height // 2 if y is None else y
+        anchor = (self.row + y * self.block / self.size, self.col + x * self.block / self.size)
+        size, block = self.size, self.block
+        for _ in range(abs(steps)):
+            if steps > 0:
+                if block > 1:
+                    block //= 2
+                else:
+                    size = min(max(self.max_size, self.fit[0]), size * 2)
+            elif size > 1:
+                size //= 2
+            else:
+                block *= 2
+        if size * self.fit[1] < self.fit[0] * block:
+            size, block = self.fit
+        if (size, block) == (self.size, self.block):
+            return False
+        self.size, self.block = size, block
+        self.row = round(anchor[0] - y * block / size)
+        self.col = round(anchor[1] - x * block / size)
+        self.pan(0, 0)
+        return True
+
+    def pan(self, rows: int, cols: int) -> bool:
+        """Move the view by rows and cols cells, stopping at the map's edges."""
+        view_rows, view_cols = self.view_cells()
+        row = max(0, min(self.rows - view_rows, self.row + rows))
+        col = max(0, min(self.cols - view_cols, self.col + cols))
+        moved = (row, col) != (self.row, self.col)
+        self.row, self.col = row, col
+        return moved
+
+    def reset(self) -> bool:
+        """Zoom out to the whole map."""
+        moved = (self.size, self.block, self.row, self.col) != (*self.fit, 0, 0)
+        self.size, self.block = self.fit
+        self.row = self.col = 0
+        return moved
+
+class PanelCache:
+    """What was last drawn on one algorithm's grid, so a frame can redraw only what changed."""
+    def __init__(self, size: int) -> None:
+        # Cells expanded so far as a flat mask over the grid's padded layout, so that the
+        # cells in view can be drawn without walking the whole closed set.
+        self.visited = np.zeros(size, dtype=bool)
+        self.dirty: Set[Point] = set()
+        self.path_cells: Set[Point] = set()
+        self.path_color: Optional[Tuple[int, int, int]] = None
+        self.agent: Tuple = ()
+
+    def sync(self, path_cells: Set[Point], path_color: Tuple[int, int, int],
+             agent: Tuple) -> None:
+        self.path_cells = path_cells
+        self.path_color = path_color
+        self.agent = agent
 
 class Maze2DVisualizer:
-    def __init__(self) -> None:
+    terrain_colors = {WALL: (51, 51, 51), SLOW: (153, 76, 0)}
+    # Scrubbing keys while replaying, as fractions of the recording to move by.
+    replay_keys = {pygame.K_LEFT: -0.05, pygame.K_RIGHT: 0.05, pygame.K_HOME: -1.0,
+                   pygame.K_END: 1.0}
+    # Panning keys, as the rows and columns to move the view by (in quarter views).
+    pan_keys = {pygame.K_w: (-1, 0), pygame.K_s: (1, 0), pygame.K_a: (0, -1),
+                pygame.K_d: (0, 1)}
+    floor_color = (200, 200, 200)
+    visited_color = (128, 179, 255)
+    # Below this many pixels per cell, panels are drawn from arrays without grid lines.
+    detail_size = 6
+
+    def __init__(self, grid: Optional[Grid] = None, start: Point = START,
+                 goal: Point = GOAL, steps_per_frame: int = 1,
+                 ms_per_frame: Optional[float] = None, frontier: str = 'heap',
+                 bidirectional: bool = False, landmarks: int = 0,
+                 epsilon: Optional[float] = None, anytime: bool = False,
+                 deadline: Optional[float] = None, record: Optional[str] = None,
+                 replay: Optional[str] = None, headless: bool = False) -> None:
+        # Headless visualizers draw to an offscreen surface (see export.py): no window,
+        # no mouse, and a clock that only moves when advance_clock() is called.
+        self.headless = headless
+        self.ticks = 0.0
+        if headless:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
         pygame.init()
         pygame.font.init()
         # Adjust window size and layout
         self.width = 1800
         self.height = 900
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption("2D Pathfinding Visualization")
+        if headless:
+            self.screen = pygame.Surface((self.width, self.height))
+        else:
+            self.screen = pygame.display.set_mode((self.width, self.height))
+            pygame.display.set_caption("2D Pathfinding Visualization")
         self.font = pygame.font.Font(None, 36)
         self.font_bold = pygame.font.Font(None, 42)  # Slightly larger font for time difference
-        self.cell_size = 35  # Slightly smaller cells
+        self.max_cell_size = 35  # Slightly smaller cells
+        self.max_grid_pixels = 15 * self.max_cell_size  # panel size; larger maps zoom out
+        self.text_cache = {}
+        # Search budget per frame for each solver thread
+        self.steps_per_frame = steps_per_frame
+        self.ms_per_frame = ms_per_frame
+        self.frontier = frontier  # open-set implementation, see frontier.FRONTIERS
+        self.bidirectional = bidirectional  # search from both ends (toggle with B)
+        self.landmarks = landmarks  # landmark count for an ALT heuristic in A*, 0 for none
+        # Heuristic inflation for weighted A*, or the starting one of anytime A* (ARA*),
+        # which then tightens the path until deadline seconds of search have passed.
+        self.epsilon = epsilon
+        self.anytime = anytime
+        self.deadline = deadline
+        # Trace file prefix: record both searches to <prefix>.astar.trace and
+        # <prefix>.dijkstra.trace, or replay them from there instead of searching.
+        self.record = record
+        self.replay = replay
+        self.traces = {}
+        self.replay_pos = {'astar': 0, 'dijkstra': 0}
         
         # Move buttons to bottom center of screen
         button_y = self.height - 60
@@ -32,9 +246,15 @@ class Maze2DVisualizer:
             'text': (255, 255, 255)
         }
         
-        self.grid, _ = create_grid()
-        self.start = START
-        self.goal = GOAL
+        if grid is None:
+            grid, _ = create_grid()
+        self.set_grid(grid, start, goal)
+        if replay is not None:
+            # The recording decides the endpoints, and must come from this map.
+            for name in ('astar', 'dijkstra'):
+                reader = self.traces[name] = TraceReader(trace_path(replay, name))
+                reader.check_grid(grid)
+                self.start, self.goal = grid.point(reader.start), grid.point(reader.goal)
         
         self.reset_algorithm_states()
         self.is_running = False
@@ -42,8 +262,73 @@ class Maze2DVisualizer:
         self.agent_astar = PathAgent(self.start)
         self.agent_dijkstra = PathAgent(self.start)
         
-        # Create base Pacman sprites (facing right)
-        pacman_size = 30
+        self.animation_speed = 50  # milliseconds per frame for mouth animation
+        self.movement_delay = 100   # milliseconds between moves
+        self.last_animation = self.now()
+        self.last_movement = self.now()
+
+        # Initialize UI surfaces
+        self.ui_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        self.ui_background = pygame.Surface((400, 200), pygame.SRCALPHA)
+        self.ui_background.fill((0, 0, 0, 180))
+
+        self.exploration_path_astar = []
+        self.exploration_path_dijkstra = []
+        self.hovered_button = None
+        self.paint: Optional[int] = None  # terrain being painted while a mouse button is held
+        self.drag: Optional[Tuple] = None  # press position and view origin while panning
+
+    def now(self) -> float:
+        """Milliseconds on the animation clock: real time, or the headless frame clock."""
+        return self.ticks if self.headless else pygame.time.get_ticks()
+
+    def advance_clock(self, ms: float) -> None:
+        self.ticks += ms
+
+    def mouse_pos(self) -> Tuple[int, int]:
+        return (-1, -1) if self.headless else pygame.mouse.get_pos()
+
+    def present(self, rects: Optional[List[pygame.Rect]] = None) -> None:
+        """Push the drawn frame (or only rects of it) to the window, if there is one."""
+        if self.headless:
+            return
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+
+    def set_grid(self, grid: Grid, start: Point, goal: Point) -> None:
+        """Show a new map, zoomed out so that it fits the grid area."""
+        self.grid = grid
+        self.start = start
+        self.goal = goal
+        self.camera = Camera(grid.rows, grid.cols, self.max_grid_pixels, self.max_cell_size)
+        self.grid_width = self.camera.width
+        self.grid_height = self.camera.height
+        palette = np.empty((256, 3), dtype=np.uint8)
+        palette[:] = self.floor_color
+        for terrain, color in self.terrain_colors.items():
+            palette[terrain] = color
+        self.palette = palette
+        # Center the grids and add more spacing between them
+        self.astar_x = (self.width - (2 * self.grid_width + 200)) // 2
+        self.dijkstra_x = self.astar_x + self.grid_width + 200
+        self.build_sprites()
+        self.invalidate_terrain()
+
+    @property
+    def cell_size(self) -> int:
+        return self.camera.size
+
+    @property
+    def detail(self) -> bool:
+        """Whether cells are large enough to draw one by one, with grid lines."""
+        return self.camera.block == 1 and self.camera.size >= self.detail_size
+
+    def build_sprites(self) -> None:
+        """Build the Pacman sprites and translucent overlay tiles for the current cell size."""
+        # Create base Pacman sprites (facing right); zoomed out they stay visible
+        pacman_size = max(4, self.cell_size * 6 // 7) if self.detail else 12
         self.pacman_open = pygame.Surface((pacman_size, pacman_size), pygame.SRCALPHA)
         self.pacman_closed = pygame.Surface((pacman_size, pacman_size), pygame.SRCALPHA)
         
@@ -64,155 +349,366 @@ class Maze2DVisualizer:
         self.pacman_open_original = self.pacman_open.copy()
         self.pacman_closed_original = self.pacman_closed.copy()
         
-        self.animation_speed = 50  # milliseconds per frame for mouth animation
-        self.movement_delay = 100   # milliseconds between moves
-        self.last_animation = pygame.time.get_ticks()
-        self.last_movement = pygame.time.get_ticks()
+        # Pre-rotate every facing for both mouth states
+        self.pacman_sprites = {
+            (rotation, mouth_open): pygame.transform.rotate(
+                self.pacman_open_original if mouth_open else self.pacman_closed_original, rotation)
+            for rotation in (0, 90, 180, 270) for mouth_open in (True, False)
+        }
+        
+        # Overlay tiles are shared by every tinted cell
+        self.overlay_tiles = {}
+        for color in (self.visited_color, (255, 255, 0), (255, 0, 255)):
+            tile = pygame.Surface((self.cell_size, self.cell_size))
+            tile.set_alpha(128)
+            tile.fill(color)
+            self.overlay_tiles[color] = tile
 
-        # Initialize UI surfaces
-        self.ui_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        self.ui_background = pygame.Surface((400, 200), pygame.SRCALPHA)
-        self.ui_background.fill((0, 0, 0, 180))
+    def render_text(self, text: str, font: Optional[pygame.font.Font] = None,
+                    color: Tuple[int, int, int] = (0, 0, 0)) -> pygame.Surface:
+        """Render text through a cache, since the same strings are drawn every frame."""
+        font = font or self.font
+        key = (text, id(font), color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            if len(self.text_cache) >= 256:
+                self.text_cache.clear()
+            surface = self.text_cache[key] = font.render(text, True, color)
+        return surface
 
-        self.exploration_path_astar = []
-        self.exploration_path_dijkstra = []
+    def cell_rect(self, pos: Point, offset_x: int = 0) -> pygame.Rect:
+        """Screen rectangle of a cell in the panel at offset_x (offset 0: on the layers)."""
+        x, y = self.camera.pixel(pos)
+        size = max(1, self.cell_size // self.camera.block)
+        return pygame.Rect(x + offset_x, y, size, size)
 
-    def draw_grid(self, offset_x: int, grid: List[List[int]], visited: set,
-                 path: List[Tuple[int, int]], agent: PathAgent, 
-                 exploration_path: List[Tuple[int, int]]) -> None:
-        for i in range(len(grid)):
-            for j in range(len(grid[0])):
-                x = j * self.cell_size + offset_x
-                y = i * self.cell_size
-                rect = pygame.Rect(x, y, self.cell_size, self.cell_size)
-                
-                # Draw base cell
-                if grid[i][j] == 1:  # Wall
-                    pygame.draw.rect(self.screen, (51, 51, 51), rect)
-                elif grid[i][j] == 2:  # Slow terrain
-                    pygame.draw.rect(self.screen, (153, 76, 0), rect)
-                else:  # Normal terrain
-                    pygame.draw.rect(self.screen, (200, 200, 200), rect)
-                
-                # Draw visited cells
-                if (i, j) in visited:
-                    s = pygame.Surface((self.cell_size, self.cell_size))
-                    s.set_alpha(128)
-                    s.fill((128, 179, 255))
-                    self.screen.blit(s, (x, y))
-                
-                # Draw path
-                if not agent.exploring and path and (i, j) in path:
-                    # Final path in yellow (existing)
-                    s = pygame.Surface((self.cell_size, self.cell_size))
-                    s.set_alpha(128)
-                    s.fill((255, 255, 0))
-                    self.screen.blit(s, (x, y))
-                elif agent.exploring and exploration_path and (i, j) in exploration_path:
-                    # Current best path in magenta during exploration
-                    s = pygame.Surface((self.cell_size, self.cell_size))
-                    s.set_alpha(128)
-                    s.fill((255, 0, 255))  # Magenta
-                    self.screen.blit(s, (x, y))
-                
-                # Draw grid lines
-                pygame.draw.rect(self.screen, (100, 100, 100), rect, 1)
+    def marker_rect(self, pos: Point, offset_x: int = 0) -> pygame.Rect:
+        """A cell's rectangle, grown to stay visible when zoomed out."""
+        rect = self.cell_rect(pos, offset_x)
+        if not self.detail:
+            rect = rect.inflate(max(0, 7 - rect.width), max(0, 7 - rect.height))
+        return rect
+
+    def panel_rect(self, offset_x: int) -> pygame.Rect:
+        return pygame.Rect(offset_x, 0, self.grid_width, self.grid_height)
+
+    def window(self, flat: np.ndarray) -> np.ndarray:
+        """The cells in view of an array over the grid's padded layout, as rows x cols."""
+        first_row, end_row, first_col, end_col = self.camera.window()
+        return flat.reshape(-1, self.grid.stride)[first_row + 1:end_row + 1,
+                                                  first_col + 1:end_col + 1]
+
+    def invalidate_terrain(self) -> None:
+        """Drop the cached terrain layers; they are rebuilt on the next full redraw."""
+        self.terrain_layer = None
+        self.lines_layer = None
+        self.full_redraw = True
+
+    def build_terrain_layers(self) -> None:
+        """
+        Pre-render the parts of the cells in view that never change during a run: the
+        terrain, and, zoomed in, a transparent layer with the grid lines and start/goal
+        markers that is blitted above the visited and path overlays. The terrain comes from
+        a color array of the cells in view, averaged over blocks of cells when zoomed out.
+        """
+        first_row, end_row, first_col, end_col = self.camera.window()
+        colors = self.palette[self.grid.terrain[first_row:end_row, first_col:end_col]]
+        self.terrain_pixels = block_mean(colors, self.camera.block)
+        self.terrain_layer = array_surface(self.terrain_pixels, self.cell_size)
+        if not self.detail:
+            self.lines_layer = None
+            return
+        self.lines_layer = pygame.Surface(self.terrain_layer.get_size(), pygame.SRCALPHA)
+        width, height = self.lines_layer.get_size()
+        size, color = self.cell_size, (100, 100, 100)
+        # The outlines of every cell: each cell's first and last row and column of pixels
+        for x in range(0, width, size):
+            for edge in (x, x + size - 1):
+                pygame.draw.line(self.lines_layer, color, (edge, 0), (edge, height - 1))
+        for y in range(0, height, size):
+            for edge in (y, y + size - 1):
+                pygame.draw.line(self.lines_layer, color, (0, edge), (width - 1, edge))
+        pygame.draw.rect(self.lines_layer, (0, 255, 0), self.cell_rect(self.start))
+        if self.goal != self.start:
+            pygame.draw.rect(self.lines_layer, (255, 0, 0), self.cell_rect(self.goal))
+
+    def redraw_terrain(self, cells: List[Point]) -> None:
+        """Repaint edited cells on the terrain layer and mark them dirty in both panels."""
+        if self.terrain_layer is None:
+            return
+        if not self.detail:
+            self.invalidate_terrain()  # rebuilt from the terrain array on the next frame
+            return
+        for pos in cells:
+            if self.camera.shows(pos):
+                color = self.terrain_colors.get(int(self.grid.terrain[pos]), self.floor_color)
+                pygame.draw.rect(self.terrain_layer, color, self.cell_rect(pos))
+        self.panel_astar.dirty.update(cells)
+        self.panel_dijkstra.dirty.update(cells)
+
+    def path_overlay(self, agent: PathAgent, path, exploration_path
+                    ) -> Tuple[Set[Point], Tuple[int, int, int]]:
+        """Return the cells to tint as a path and their color."""
+        if not agent.exploring and path:
+            # Final path in yellow (existing)
+            return path_members(path), (255, 255, 0)
+        if agent.exploring and exploration_path:
+            # Current best path in magenta during exploration
+            return path_members(exploration_path), (255, 0, 255)
+        return set(), (255, 0, 255)
+
+    def draw_overlay(self, rect: pygame.Rect, color: Tuple[int, int, int]) -> None:
+        self.screen.blit(self.overlay_tiles[color], rect)
+
+    def draw_agent(self, offset_x: int, agent: PathAgent) -> None:
+        if not self.camera.shows(agent.pos):
+            return
+        # Draw agent with animation and rotation
+        if agent.moving:
+            mouth_open = agent.mouth_open
+            
+            # Calculate next position if available
+            next_pos = None
+            if agent.path_index + 1 < len(agent.path):
+                next_pos = agent.path[agent.path_index + 1]
                 
-                # Draw start and goal
-                if (i, j) == self.start:
-                    pygame.draw.rect(self.screen, (0, 255, 0), rect)
-                elif (i, j) == self.goal:
-                    pygame.draw.rect(self.screen, (255, 0, 0), rect)
+            # Determine direction based on next position
+            if next_pos:
+                dx = next_pos[1] - agent.pos[1]  # Column difference
+                dy = next_pos[0] - agent.pos[0]  # Row difference
                 
-                # Draw agent with animation and rotation
-                if (i, j) == agent.pos:
-                    if agent.moving:
-                        base_sprite = self.pacman_open_original if agent.mouth_open else self.pacman_closed_original
-                        
-                        # Calculate next position if available
-                        next_pos = None
-                        if agent.path_index + 1 < len(agent.path):
-                            next_pos = agent.path[agent.path_index + 1]
-                            
-                        # Determine direction based on next position
-                        if next_pos:
-                            dx = next_pos[1] - agent.pos[1]  # Column difference
-                            dy = next_pos[0] - agent.pos[0]  # Row difference
-                            
-                            if dx > 0:      # Moving right
-                                rotation = 0    # No rotation needed, sprite faces right by default
-                            elif dx < 0:     # Moving left
-                                rotation = 90  # Rotate 180° to face left
-                            elif dy > 0:     # Moving down
-                                rotation = 270   # Rotate 90° to face down
-                            else:            # Moving up
-                                rotation = 270  # Rotate 270° to face up
-                        else:
-                            rotation = agent.direction
-                    else:
-                        base_sprite = self.pacman_open_original
-                        rotation = agent.direction
-                    
-                    # Rotate sprite
-                    sprite = pygame.transform.rotate(base_sprite, rotation)
-                    sprite_rect = sprite.get_rect(center=(x + self.cell_size//2, y + self.cell_size//2))
-                    self.screen.blit(sprite, sprite_rect)
+                if dx > 0:      # Moving right
+                    rotation = 0    # No rotation needed, sprite faces right by default
+                elif dx < 0:     # Moving left
+                    rotation = 90  # Rotate 180° to face left
+                elif dy > 0:     # Moving down
+                    rotation = 270   # Rotate 90° to face down
+                else:            # Moving up
+                    rotation = 270  # Rotate 270° to face up
+            else:
+                rotation = agent.direction
+        else:
+            mouth_open = True
+            rotation = agent.direction
+        
+        sprite = self.pacman_sprites[rotation % 360, mouth_open]
+        sprite_rect = sprite.get_rect(center=self.cell_rect(agent.pos, offset_x).center)
+        self.screen.blit(sprite, sprite_rect)
+
+    def draw_grid(self, offset_x: int, grid: Grid, panel: PanelCache,
+                 path: List[Tuple[int, int]], agent: PathAgent, 
+                 exploration_path: List[Tuple[int, int]]) -> None:
+        """Draw the cells of one panel that are in view."""
+        if self.terrain_layer is None:
+            self.build_terrain_layers()
+        self.screen.set_clip(self.panel_rect(offset_x))
+        if not self.detail:
+            self.draw_grid_pixels(offset_x, panel, path, agent, exploration_path)
+            self.screen.set_clip(None)
+            return
+        self.screen.blit(self.terrain_layer, (offset_x, 0))
+        
+        blit, size = self.screen.blit, self.cell_size
+        first_row, end_row, first_col, end_col = self.camera.window()
+        
+        # Draw visited cells
+        tile = self.overlay_tiles[self.visited_color]
+        rows, cols = np.nonzero(self.window(panel.visited))
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            blit(tile, (j * size + offset_x, i * size))
+        
+        # Draw path
+        cells, color = self.path_overlay(agent, path, exploration_path)
+        tile = self.overlay_tiles[color]
+        for i, j in cells:
+            if first_row <= i < end_row and first_col <= j < end_col:
+                blit(tile, ((j - first_col) * size + offset_x, (i - first_row) * size))
+        
+        # Grid lines and start/goal markers go above the overlays
+        self.screen.blit(self.lines_layer, (offset_x, 0))
+        self.draw_agent(offset_x, agent)
+        self.screen.set_clip(None)
+
+    def draw_grid_pixels(self, offset_x: int, panel: PanelCache,
+                         path: List[Tuple[int, int]], agent: PathAgent,
+                         exploration_path: List[Tuple[int, int]]) -> None:
+        """
+        Zoomed out: blend the terrain, visited and path layers of the cells in view as
+        color arrays (a block of cells is tinted if any of its cells is) and blit the
+        result in one go.
+        """
+        block = self.camera.block
+        rgb = self.terrain_pixels.astype(np.uint16)
+        visited = block_any(self.window(panel.visited), block)
+        rgb[visited] = (rgb[visited] + self.visited_color) // 2
+        cells, color = self.path_overlay(agent, path, exploration_path)
+        if cells:
+            first_row, end_row, first_col, end_col = self.camera.window()
+            rows, cols = np.array(list(cells)).T
+            inside = (rows >= first_row) & (rows < end_row) & (cols >= first_col) & (cols < end_col)
+            on_path = np.zeros(rgb.shape[:2], dtype=bool)
+            on_path[(rows[inside] - first_row) // block, (cols[inside] - first_col) // block] = True
+            rgb[on_path] = (rgb[on_path] + color) // 2
+        self.screen.blit(array_surface(rgb.astype(np.uint8), self.cell_size), (offset_x, 0))
+        for pos, marker in ((self.start, (0, 255, 0)), (self.goal, (255, 0, 0))):
+            if self.camera.shows(pos):
+                pygame.draw.rect(self.screen, marker, self.marker_rect(pos, offset_x))
+        self.draw_agent(offset_x, agent)
+
+    def agent_state(self, agent: PathAgent) -> Tuple:
+        return agent.pos, agent.moving, agent.mouth_open, agent.direction, agent.path_index
+
+    def draw_dirty_cells(self, panel: 'PanelCache', offset_x: int, grid: Grid, visited: set,
+                         path: List[Tuple[int, int]], agent: PathAgent,
+                         exploration_path: List[Tuple[int, int]]) -> List[pygame.Rect]:
+        """Redraw only the cells of one grid whose overlays or agent changed since last frame."""
+        cells, color = self.path_overlay(agent, path, exploration_path)
+        dirty = panel.dirty
+        if color != panel.path_color:
+            dirty |= cells | panel.path_cells
+        else:
+            dirty |= cells ^ panel.path_cells
+        state = self.agent_state(agent)
+        if state != panel.agent:
+            dirty.add(agent.pos)
+            if panel.agent:
+                dirty.add(panel.agent[0])
+        panel.sync(cells, color, state)
+        if not self.detail:
+            # Zoomed out, the whole panel is one array blit anyway
+            if not dirty:
+                return []
+            dirty.clear()
+            self.draw_grid(offset_x, grid, panel, path, agent, exploration_path)
+            return [self.panel_rect(offset_x)]
+        
+        rects = []
+        shows = self.camera.shows
+        panel_rect = self.panel_rect(offset_x)
+        self.screen.set_clip(panel_rect)
+        for pos in dirty:
+            if not shows(pos):
+                continue
+            area = self.cell_rect(pos)
+            rect = area.move(offset_x, 0)
+            self.screen.blit(self.terrain_layer, rect, area)
+            if grid.index(pos) in visited:
+                self.draw_overlay(rect, self.visited_color)
+            if pos in cells:
+                self.draw_overlay(rect, color)
+            self.screen.blit(self.lines_layer, rect, area)
+            rects.append(rect.clip(panel_rect))
+        if agent.pos in dirty:
+            self.draw_agent(offset_x, agent)
+        self.screen.set_clip(None)
+        dirty.clear()
+        return rects
 
     def render(self) -> None:
+        """
+        Draw a frame. The whole window is redrawn only when something outside the grids
+        changed (reset, map change, finished search, button hover); otherwise only the
+        changed cells are redrawn and pushed to the display.
+        """
+        hovered = next((name for name, rect in self.ui_buttons.items()
+                        if rect.collidepoint(self.mouse_pos())), None)
+        if hovered != self.hovered_button:
+            self.hovered_button = hovered
+            self.full_redraw = True
+        if self.full_redraw:
+            self.render_full()
+            self.panel_astar.sync(*self.path_overlay(self.agent_astar, self.astar_path,
+                                                     self.exploration_path_astar),
+                                  self.agent_state(self.agent_astar))
+            self.panel_dijkstra.sync(*self.path_overlay(self.agent_dijkstra, self.dijkstra_path,
+                                                        self.exploration_path_dijkstra),
+                                     self.agent_state(self.agent_dijkstra))
+            self.panel_astar.dirty.clear()
+            self.panel_dijkstra.dirty.clear()
+            self.full_redraw = False
+            self.present()
+            return
+        rects = self.draw_dirty_cells(self.panel_astar, self.astar_x, self.grid,
+                                      self.astar_closed, self.astar_path,
+                                      self.agent_astar, self.exploration_path_astar)
+        rects += self.draw_dirty_cells(self.panel_dijkstra, self.dijkstra_x, self.grid,
+                                       self.dijkstra_closed, self.dijkstra_path,
+                                       self.agent_dijkstra, self.exploration_path_dijkstra)
+        self.present(rects)
+
+    def render_full(self) -> None:
         self.screen.fill((255, 255, 255))
         
         # Draw legend on the left side
-        self.draw_legend(20, 500)
-        
-        # Center the grids and add more spacing between them
-        grid_offset = (self.width - (2 * 15 * self.cell_size + 200)) // 2
+        self.draw_legend(20, 470)
         
         # Draw A* grid and info
-        astar_x = grid_offset
-        self.draw_grid(astar_x, self.grid, self.astar_closed,
+        astar_x = self.astar_x
+        self.draw_grid(astar_x, self.grid, self.panel_astar,
                       self.astar_path, self.agent_astar,
                       self.exploration_path_astar)
         
         # Draw Dijkstra grid and info
-        dijkstra_x = astar_x + (15 * self.cell_size) + 200
-        self.draw_grid(dijkstra_x, self.grid, self.dijkstra_closed,
+        dijkstra_x = self.dijkstra_x
+        self.draw_grid(dijkstra_x, self.grid, self.panel_dijkstra,
                       self.dijkstra_path, self.agent_dijkstra,
                       self.exploration_path_dijkstra)
 
         # Draw statistics and labels at the bottom
-        stats_y = self.height - 120
+        stats_y = self.height - 170
         title_y = stats_y - 40  # Position titles just above stats
 
         # Draw A* label and stats
-        astar_title = self.font.render("A* Algorithm", True, (0, 0, 0))
-        self.screen.blit(astar_title, (astar_x + (15 * self.cell_size)//2 - astar_title.get_width()//2, title_y))
+        prefix = "Bidirectional " if self.bidirectional else ""
+        suffix = " (ALT)" if self.landmarks and not self.bidirectional else ""
+        astar_title = self.render_text(f"{prefix}{self.astar_name()}{suffix}")
+        self.screen.blit(astar_title, (astar_x + self.grid_width // 2 - astar_title.get_width()//2, title_y))
         
+        astar_stats = []
         if self.astar_done:
             astar_stats = [
-                f"Time: {self.astar_time:.3f}s",
+                f"Time: {self.astar_time * 1000:.2f}ms",
                 f"Path Length: {len(self.astar_path) if self.astar_path else 0}",
-                f"Nodes Explored: {len(self.astar_closed)}"
+                f"Nodes Explored: {len(self.astar_closed)}",
+                f"Heap Pushes: {self.astar_stats.pushes}",
+                f"Stale Pops: {self.astar_stats.stale_pops}",
+                f"Peak Open Set: {self.astar_stats.peak_open}"
             ]
+        solutions = getattr(self.astar_open, 'solutions', None)
+        if solutions:
+            # Anytime A*: the latest solutions and the bound proven for the last one, shown
+            # as soon as the first solution is found. They share the path length's row, so
+            # the counters below stay on the same rows as in the other modes.
+            costs = [f"{cost:g}" for cost in dict.fromkeys(s.cost for s in solutions)]
+            astar_stats = [
+                f"Time: {self.astar_time * 1000:.2f}ms",
+                f"Solutions: {'... -> ' if len(costs) > 2 else ''}{' -> '.join(costs[-2:])} "
+                f"({solutions[-1].bound:.2f}x)",
+            ] + astar_stats[2:5]
+        if astar_stats:
             y = stats_y
             for stat in astar_stats:
-                text = self.font.render(stat, True, (0, 0, 0))
-                self.screen.blit(text, (astar_x + (15 * self.cell_size)//2 - text.get_width()//2, y))
+                text = self.render_text(stat)
+                self.screen.blit(text, (astar_x + self.grid_width // 2 - text.get_width()//2, y))
                 y += 25
 
         # Draw Dijkstra label and stats
-        dijkstra_title = self.font.render("Dijkstra's Algorithm", True, (0, 0, 0))
-        self.screen.blit(dijkstra_title, (dijkstra_x + (15 * self.cell_size)//2 - dijkstra_title.get_width()//2, title_y))
+        dijkstra_title = self.render_text(f"{prefix}Dijkstra's Algorithm")
+        self.screen.blit(dijkstra_title, (dijkstra_x + self.grid_width // 2 - dijkstra_title.get_width()//2, title_y))
         
         if self.dijkstra_done:
             dijkstra_stats = [
-                f"Time: {self.dijkstra_time:.3f}s",
+                f"Time: {self.dijkstra_time * 1000:.2f}ms",
                 f"Path Length: {len(self.dijkstra_path) if self.dijkstra_path else 0}",
-                f"Nodes Explored: {len(self.dijkstra_closed)}"
+                f"Nodes Explored: {len(self.dijkstra_closed)}",
+                f"Heap Pushes: {self.dijkstra_stats.pushes}",
+                f"Stale Pops: {self.dijkstra_stats.stale_pops}",
+                f"Peak Open Set: {self.dijkstra_stats.peak_open}"
             ]
             y = stats_y
             for stat in dijkstra_stats:
-                text = self.font.render(stat, True, (0, 0, 0))
-                self.screen.blit(text, (dijkstra_x + (15 * self.cell_size)//2 - text.get_width()//2, y))
+                text = self.render_text(stat)
+                self.screen.blit(text, (dijkstra_x + self.grid_width // 2 - text.get_width()//2, y))
                 y += 25
 
         # Draw time difference in the center between grids
@@ -223,51 +719,227 @@ class Maze2DVisualizer:
             
             diff_text = [
                 f"Time Difference:",
-                f"{time_diff:.3f}s",
+                f"{time_diff * 1000:.2f}ms",
                 f"{faster_algo} is faster!"
             ]
             
             y = self.height - 180
             for text in diff_text:
-                surface = self.font_bold.render(text, True, (0, 0, 100))
+                surface = self.render_text(text, self.font_bold, (0, 0, 100))
                 self.screen.blit(surface, 
                                (center_x - surface.get_width()//2, y))
                 y += 30
 
         # Draw instructions and UI
-        self.draw_instructions(20, self.height - 145)
+        self.draw_instructions(20, self.height - 180)  # seven lines; the last ends above the edge
         self.draw_ui()
-        
-        pygame.display.flip()
+
+    def astar_name(self) -> str:
+        """Panel title of the A* variant that is running."""
+        if self.anytime and not self.bidirectional:
+            return "Anytime A* (ARA*)"
+        if self.epsilon and self.epsilon != 1 and not self.bidirectional:
+            return f"Weighted A* (eps {self.epsilon:g})"
+        return "A* Algorithm"
 
     # Keep other methods the same, just remove OpenGL-specific code
     def reset_algorithm_states(self) -> None:
-        self.astar_open = [(heuristic(self.start, self.goal), self.start)]
+        # The searches run on flat cell indices of the grid, each on its own worker thread.
+        for worker in (getattr(self, 'worker_astar', None), getattr(self, 'worker_dijkstra', None)):
+            if worker is not None:
+                worker.stop(wait=True)  # its search state is about to be reused
+        self.start_index = self.grid.index(self.start)
+        self.goal_index = self.grid.index(self.goal)
+        if self.bidirectional:
+            # Each open set carries both frontiers; both grow on the same panel.
+            astar, dijkstra = bidirectional_astar_step, bidirectional_dijkstra_step
+            self.astar_open = BidirectionalState(self.grid, self.start_index, self.goal_index,
+                                                 True, self.frontier)
+            self.dijkstra_open = BidirectionalState(self.grid, self.start_index,
+                                                    self.goal_index, False, self.frontier)
+        else:
+            astar, dijkstra = astar_step, dijkstra_step
+            if self.anytime:
+                astar = anytime_astar_step
+            elif self.landmarks or self.epsilon:
+                landmarks = grid_landmarks(self.grid, self.landmarks) if self.landmarks else None
+                astar = partial(astar_step, landmarks=landmarks, epsilon=self.epsilon or 1.0)
+            if self.anytime:
+                self.astar_open = AnytimeState(self.grid, self.start_index, self.goal_index,
+                                               self.epsilon or 3.0, deadline=self.deadline,
+                                               frontier=self.frontier)
+            else:
+                h0 = self.grid.heuristic(self.goal_index)(self.start_index)
+                self.astar_open = make_frontier(self.frontier, [(h0, self.start_index)])
+            self.dijkstra_open = make_frontier(self.frontier, [(0, self.start_index)])
         self.astar_closed = set()
-        self.astar_came_from = {}
-        self.astar_g_score = {self.start: 0}
         self.astar_done = False
         self.astar_path = None
-        self.dijkstra_open = [(0, self.start)]
         self.dijkstra_closed = set()
-        self.dijkstra_came_from = {}
-        self.dijkstra_g_score = {self.start: 0}
         self.dijkstra_done = False
         self.dijkstra_path = None
+        self.astar_stats = SearchStats()
+        self.dijkstra_stats = SearchStats()
+        budget = {'steps_per_frame': self.steps_per_frame, 'ms_per_frame': self.ms_per_frame}
+        # Plain A* and Dijkstra keep their scores in arrays that are reused by every reset;
+        # the bidirectional and anytime searches keep their own dicts.
+        states = getattr(self, 'search_states', (None, None))
+        if states[0] is None or states[0].size < self.grid.size:
+            states = self.search_states = (SearchState(self.grid.size),
+                                           SearchState(self.grid.size))
+        if self.bidirectional or self.anytime:
+            states = (None, None)
+        traces = (None, None)
+        if self.record is not None:
+            traces = tuple(TraceWriter(trace_path(self.record, name), self.grid,
+                                       self.start_index, self.goal_index)
+                           for name in ('astar', 'dijkstra'))
+        if self.replay is not None:
+            # Replays read the recorded traces; nothing is searched.
+            self.worker_astar = self.worker_dijkstra = None
+            self.replay_pos = {'astar': 0, 'dijkstra': 0}
+        else:
+            self.worker_astar = SolverWorker(astar, self.grid, self.start_index,
+                                             self.goal_index, self.astar_open,
+                                             stats=self.astar_stats, search_state=states[0],
+                                             trace=traces[0], **budget)
+            self.worker_dijkstra = SolverWorker(dijkstra, self.grid, self.start_index,
+                                                self.goal_index, self.dijkstra_open,
+                                                stats=self.dijkstra_stats,
+                                                search_state=states[1], trace=traces[1],
+                                                **budget)
         self.agent_astar = PathAgent(self.start)
         self.agent_dijkstra = PathAgent(self.start)
-        self.start_time = None
-        self.accumulated_time = 0.0
         self.astar_time = 0.0
         self.dijkstra_time = 0.0
         self.exploration_path_astar = []
         self.exploration_path_dijkstra = []
+        self.panel_astar = PanelCache(self.grid.size)
+        self.panel_dijkstra = PanelCache(self.grid.size)
+        self.planners = {}  # D* Lite replanner per agent, created on the first edit
+        self.full_redraw = True
+
+    def edit_cells(self, cells: List[Point], terrain: int) -> List[Point]:
+        """
+        Change cells to a terrain class at runtime and return the cells that changed.
+        Searches that are still running restart on the edited map. Once both have finished,
+        each agent's route is repaired incrementally with D* Lite from where it stands and
+        the agent keeps moving along the repaired path.
+        """
+        agents = (self.agent_astar, self.agent_dijkstra)
+        blocked = {self.start, self.goal}
+        if terrain == WALL:
+            blocked.update(agent.pos for agent in agents)
+        changed = self.grid.set_terrain([pos for pos in cells if pos not in blocked], terrain)
+        if not changed:
+            return changed
+        self.redraw_terrain(changed)
+        if not (self.astar_done and self.dijkstra_done):
+            self.reset_algorithm_states()
+            return changed
+        for name, agent in zip(('astar', 'dijkstra'), agents):
+            planner = self.planners.get(name)
+            if planner is None:
+                planner = self.planners[name] = DStarLite(self.grid, agent.pos, self.goal)
+            else:
+                planner.move_to(agent.pos)
+                planner.update(changed)
+            planner.compute()
+            path = planner.path()
+            agent.reroute(path)
+            setattr(self, f'{name}_path', path)
+        return changed
+
+    def panel_pos(self, pos: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """A screen position relative to the panel it is over, if any."""
+        x, y = pos
+        for offset_x in (self.astar_x, self.dijkstra_x):
+            if offset_x <= x < offset_x + self.grid_width and 0 <= y < self.grid_height:
+                return x - offset_x, y
+        return None
+
+    def cell_at(self, pos: Tuple[int, int]) -> Optional[Point]:
+        """The grid cell under a screen position on either panel, if any."""
+        local = self.panel_pos(pos)
+        return None if local is None else self.camera.cell_at(*local)
+
+    def view_changed(self) -> None:
+        """Rebuild what depends on the camera after a zoom or pan; both panels follow it."""
+        self.build_sprites()
+        self.invalidate_terrain()
+
+    def zoom_view(self, steps: int, pos: Optional[Tuple[int, int]] = None) -> None:
+        """Zoom in (steps > 0) or out around a screen position, if it is over a panel."""
+        local = None if pos is None else self.panel_pos(pos)
+        if self.camera.zoom(steps, *(local or (None, None))):
+            self.view_changed()
+
+    def pan_view(self, rows: int, cols: int) -> None:
+        if self.camera.pan(rows, cols):
+            self.view_changed()
+
+    def fit_view(self) -> None:
+        if self.camera.reset():
+            self.view_changed()
+
+    def drag_view(self, pos: Tuple[int, int]) -> None:
+        """Pan so that the cell grabbed when the drag started stays under the mouse."""
+        (x, y), row, col = self.drag
+        camera = self.camera
+        self.pan_view(row - (pos[1] - y) * camera.block // camera.size - camera.row,
+                      col - (pos[0] - x) * camera.block // camera.size - camera.col)
+
+    def handle_view_key(self, key: int) -> bool:
+        """Zoom or pan for a key press; returns whether the key was a view key."""
+        if key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.zoom_view(1)
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.zoom_view(-1)
+        elif key in (pygame.K_0, pygame.K_KP0):
+            self.fit_view()
+        elif key in self.pan_keys:
+            # A quarter of the view per press
+            rows, cols = self.camera.view_cells()
+            down, right = self.pan_keys[key]
+            self.pan_view(down * max(1, rows // 4), right * max(1, cols // 4))
+        else:
+            return False
+        return True
+
+    def paint_at(self, pos: Tuple[int, int], button: Optional[int] = None) -> None:
+        """
+        Edit the cell under the mouse. Pressing the left button toggles a wall and the right
+        button toggles slow terrain; dragging keeps painting what the press started.
+        """
+        cell = self.cell_at(pos)
+        if cell is None or self.replay is not None:  # a replay must keep its recorded map
+            return
+        if button is not None:
+            terrain = WALL if button == 1 else SLOW
+            self.paint = EMPTY if self.grid.terrain[cell] == terrain else terrain
+        if self.paint is not None:
+            self.edit_cells([cell], self.paint)
+
+    def sample_worker(self, worker: SolverWorker, closed: set, panel: PanelCache,
+                      agent: PathAgent) -> SolverSnapshot:
+        """Fold a worker's latest snapshot into the visualizer's copy of its search."""
+        snapshot = worker.snapshot()
+        closed.update(snapshot.expanded)
+        panel.visited[snapshot.expanded] = True
+        if self.detail:
+            panel.dirty.update(map(self.grid.point, snapshot.expanded))
+        elif snapshot.expanded:
+            # Zoomed out the whole panel is redrawn from the mask; one cell marks it dirty.
+            panel.dirty.add(self.grid.point(snapshot.expanded[-1]))
+        if not snapshot.done:
+            agent.set_exploration_path(snapshot.path)
+        return snapshot
 
     def update(self) -> None:
         if not self.is_running:
             return
             
-        current_time = pygame.time.get_ticks()
+        current_time = self.now()
         
         # Handle mouth animation
         if current_time - self.last_animation > self.animation_speed:
@@ -286,43 +958,109 @@ class Maze2DVisualizer:
             if self.dijkstra_done:
                 self.agent_dijkstra.move_step()
 
-        # Handle pathfinding updates
-        if self.start_time is None:
-            self.start_time = time.time()
-            
-        # A* and Dijkstra step updates
+        if self.replay is not None:
+            for name in ('astar', 'dijkstra'):
+                if not getattr(self, f'{name}_done'):
+                    self.replay_to(name, self.replay_pos[name] + self.steps_per_frame)
+            return
+
+        # Pick up what the A* worker did during the last frame, then grant it the next one
         if not self.astar_done:
-            current, is_complete, path, came_from = astar_step(
-                self.grid, self.start, self.goal,
-                self.astar_open, self.astar_closed,
-                self.astar_came_from, self.astar_g_score
-            )
-            self.agent_astar.set_exploration_path(current, came_from)
-            if path:  # Update current best path
-                self.exploration_path_astar = path
-            
-            if is_complete:
+            snapshot = self.sample_worker(self.worker_astar, self.astar_closed,
+                                          self.panel_astar, self.agent_astar)
+            self.astar_time = snapshot.elapsed
+            if snapshot.path is not None:  # Update current best path
+                if snapshot.path is not self.exploration_path_astar and \
+                        isinstance(self.astar_open, AnytimeState):
+                    self.full_redraw = True  # An improved anytime solution: update its stats
+                self.exploration_path_astar = snapshot.path
+            if snapshot.done:
                 self.astar_done = True
-                self.astar_path = path
-                self.astar_time = time.time() - self.start_time
-                self.agent_astar.set_final_path(path)
+                self.full_redraw = True  # Stats appear below the grid
+                self.astar_path = snapshot.path
+                if snapshot.path is not None:
+                    self.agent_astar.set_final_path(snapshot.path)
+            else:
+                self.worker_astar.grant()
 
         # Update Dijkstra
         if not self.dijkstra_done:
-            current, is_complete, path, came_from = dijkstra_step(
-                self.grid, self.start, self.goal,
-                self.dijkstra_open, self.dijkstra_closed,
-                self.dijkstra_came_from, self.dijkstra_g_score
-            )
-            self.agent_dijkstra.set_exploration_path(current, came_from)
-            if path:  # Update current best path
-                self.exploration_path_dijkstra = path
-            
-            if is_complete:
+            snapshot = self.sample_worker(self.worker_dijkstra, self.dijkstra_closed,
+                                          self.panel_dijkstra, self.agent_dijkstra)
+            self.dijkstra_time = snapshot.elapsed
+            if snapshot.path is not None:  # Update current best path
+                self.exploration_path_dijkstra = snapshot.path
+            if snapshot.done:
                 self.dijkstra_done = True
-                self.dijkstra_path = path
-                self.dijkstra_time = time.time() - self.start_time
-                self.agent_dijkstra.set_final_path(path)
+                self.full_redraw = True  # Stats appear below the grid
+                self.dijkstra_path = snapshot.path
+                if snapshot.path is not None:
+                    self.agent_dijkstra.set_final_path(snapshot.path)
+            else:
+                self.worker_dijkstra.grant()
+
+    def wait_for_workers(self) -> None:
+        """Block until both solver threads have run the budgets granted by update()."""
+        for worker in (self.worker_astar, self.worker_dijkstra):
+            if worker is not None:
+                worker.wait()
+
+    def finished(self, walk: bool = True) -> bool:
+        """Whether both searches are done and, with walk, both agents have stopped moving."""
+        if not (self.astar_done and self.dijkstra_done):
+            return False
+        return not walk or not (self.agent_astar.moving or self.agent_dijkstra.moving)
+
+    def replay_to(self, name: str, step: int) -> None:
+        """
+        Show a panel's recorded search as it was after step expansions. Moving forwards
+        adds the newly expanded cells; moving back rebuilds the visited set from the
+        nearest keyframe. At the last step the final path appears and the agent sets off.
+        """
+        reader = self.traces[name]
+        step = max(0, min(step, reader.steps))
+        closed = getattr(self, f'{name}_closed')
+        panel = getattr(self, f'panel_{name}')
+        point = self.grid.point
+        if step >= self.replay_pos[name]:
+            cells = reader.steps_range(self.replay_pos[name], step)[0].tolist()
+            closed.update(cells)
+            panel.visited[cells] = True
+            panel.dirty.update(map(point, cells))
+        else:
+            panel.visited[:] = reader.visited_at(step)
+            closed.clear()
+            closed.update(np.flatnonzero(panel.visited).tolist())
+            setattr(self, f'{name}_done', False)
+            setattr(self, f'{name}_path', None)
+            setattr(self, f'agent_{name}', PathAgent(self.start))
+            self.full_redraw = True
+        self.replay_pos[name] = step
+        agent = getattr(self, f'agent_{name}')
+        if step == reader.steps:
+            if getattr(self, f'{name}_done'):
+                return
+            path = None if reader.path is None else [point(i) for i in reader.path]
+            setattr(self, f'{name}_done', True)
+            setattr(self, f'{name}_path', path)
+            setattr(self, f'{name}_time', reader.meta.get('elapsed', 0.0))
+            stats = getattr(self, f'{name}_stats')
+            for counter in ('pushes', 'stale_pops', 'peak_open'):
+                setattr(stats, counter, reader.meta.get(counter, 0))
+            if path is not None:
+                agent.set_final_path(path)
+            self.full_redraw = True
+        elif step:
+            indices = reader.path_to(step - 1)
+            exploration = PathView(self.grid, dict(zip(indices[1:], indices)), indices[-1])
+            setattr(self, f'exploration_path_{name}', exploration)
+            agent.set_exploration_path(exploration)
+
+    def scrub_replay(self, fraction: float) -> None:
+        """Move each replay by a fraction of its length: -1 rewinds it, 1 skips to the end."""
+        for name, reader in self.traces.items():
+            delta = round(fraction * reader.steps) or (1 if fraction > 0 else -1)
+            self.replay_to(name, self.replay_pos[name] + delta)
 
     def draw_legend(self, x: int, y: int) -> None:
         legend_items = [
@@ -339,9 +1077,9 @@ class Maze2DVisualizer:
         for name, color, desc in legend_items:
             if color is not None:  # Only draw colored rectangle if color is specified
                 pygame.draw.rect(self.screen, color, pygame.Rect(x, y, 20, 20))
-                text = self.font.render(f"{name}: {desc}", True, (0, 0, 0))
+                text = self.render_text(f"{name}: {desc}")
             else:  # For the header, just render the text
-                text = self.font.render(desc, True, (0, 0, 0))
+                text = self.render_text(desc)
             self.screen.blit(text, (x + 30, y))
             y += 30
 
@@ -350,22 +1088,27 @@ class Maze2DVisualizer:
             "Controls:",
             "SPACE - Start/Pause",
             "R - Reset",
-            "",
+            "B - Bidirectional on/off",
+            "Click - Wall, Right-click - Slow",
+            "Wheel/+/- - Zoom, WASD - Pan",
             "Press Start to begin"
         ]
+        if self.replay is not None:
+            instructions[3:5] = ["Left/Right - Scrub, Up/Down - Speed",
+                                 "Home/End - Skip to start/end"]
         
         for instruction in instructions:
-            text = self.font.render(instruction, True, (0, 0, 0))
+            text = self.render_text(instruction)
             self.screen.blit(text, (x, y))
             y += 25
 
     def draw_ui(self) -> None:
         # Draw buttons
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = self.mouse_pos()
         for text, rect in self.ui_buttons.items():
             color = self.button_colors['hover'] if rect.collidepoint(mouse_pos) else self.button_colors['normal']
             pygame.draw.rect(self.screen, color, rect)
-            text_surface = self.font.render(text.title(), True, self.button_colors['text'])
+            text_surface = self.render_text(text.title(), color=self.button_colors['text'])
             self.screen.blit(text_surface, text_surface.get_rect(center=rect.center))
 
     def handle_mouse_click(self, pos: Tuple[int, int]) -> None:
@@ -384,23 +1127,209 @@ class Maze2DVisualizer:
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     return
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.full_redraw = True
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     self.handle_mouse_click(event.pos)
+                    if event.button in (1, 3):
+                        self.paint_at(event.pos, event.button)
+                    elif event.button == 2:
+                        self.drag = (event.pos, self.camera.row, self.camera.col)
+                elif event.type == pygame.MOUSEMOTION and self.paint is not None:
+                    self.paint_at(event.pos)
+                elif event.type == pygame.MOUSEMOTION and self.drag is not None:
+                    self.drag_view(event.pos)
+                elif event.type == pygame.MOUSEBUTTONUP:
+                    self.paint = None
+                    self.drag = None
+                elif event.type == pygame.MOUSEWHEEL:
+                    self.zoom_view(event.y, pygame.mouse.get_pos())
                 elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
-                        if self.is_running:
-                            # Pause the simulation: accumulate elapsed time and pause agents.
-                            if self.start_time is not None:
-                                self.accumulated_time += time.time() - self.start_time
-                            self.start_time = None
-                            self.is_running = False
-                        else:
-                            # Resume the simulation.
-                            self.start_time = time.time()
-                            self.is_running = True
+                    if self.handle_view_key(event.key):
+                        pass
+                    elif event.key == pygame.K_SPACE:
+                        # Pause or resume; paused workers get no budget, so their
+                        # timers stop as well.
+                        self.is_running = not self.is_running
                     elif event.key == pygame.K_r:
                         self.reset_algorithm_states()
                         self.is_running = False
+                    elif self.replay is not None and event.key in self.replay_keys:
+                        self.scrub_replay(self.replay_keys[event.key])
+                    elif self.replay is not None and event.key in (pygame.K_UP, pygame.K_DOWN):
+                        # Replay speed in expansions per frame.
+                        if event.key == pygame.K_UP:
+                            self.steps_per_frame *= 2
+                        else:
+                            self.steps_per_frame = max(1, self.steps_per_frame // 2)
+                    elif event.key == pygame.K_b:
+                        self.bidirectional = not self.bidirectional
+                        self.reset_algorithm_states()
+                        self.is_running = False
             self.update()
             self.render()
-            clock.tick(60)
\ No newline at end of file
+            clock.tick(60)
+
+class CrowdVisualizer(Maze2DVisualizer):
+    """
+    Multi-agent view: many agents heading for a few shared goals, each one steered by its
+    goal's flow field instead of a search of its own. Cells are shaded by their distance to
+    the nearest goal. Edits made with the mouse only take effect on the next step, when the
+    fields of the changed grid are recomputed once per goal.
+    """
+    goal_colors = [(255, 0, 0), (0, 120, 255), (255, 140, 0), (150, 0, 200), (0, 170, 80)]
+
+    def __init__(self, grid: Optional[Grid] = None, goals: Optional[Sequence[Point]] = None,
+                 agents: int = 200, seed: Optional[int] = None) -> None:
+        self.agent_count = agents
+        self.goals: List[Point] = list(goals or [])
+        self.rng = np.random.default_rng(seed)
+        self.max_panel_pixels = 700
+        super().__init__(grid)
+
+    def set_grid(self, grid: Grid, start: Point, goal: Point) -> None:
+        """Show the map as one centered panel, as large as fits above the stats."""
+        self.max_grid_pixels = self.max_panel_pixels
+        super().set_grid(grid, start, goal)
+        self.astar_x = self.dijkstra_x = (self.width - self.grid_width) // 2
+
+    def default_goals(self) -> List[Point]:
+        """The passable cells nearest to three corners of the map."""
+        rows, cols = np.nonzero(self.grid.terrain != WALL)
+        goals = []
+        for row, col in ((self.grid.rows - 1, self.grid.cols - 1), (0, self.grid.cols - 1),
+                         (self.grid.rows - 1, 0)):
+            nearest = np.argmin(np.abs(rows - row) + np.abs(cols - col))
+            goals.append((int(rows[nearest]), int(cols[nearest])))
+        return list(dict.fromkeys(goals))
+
+    def reset_algorithm_states(self) -> None:
+        if not self.goals:
+            self.goals = self.default_goals()
+        # Spread the agents over the goals, each starting somewhere its goal can be reached.
+        starts, goals = [], []
+        started = time.perf_counter()
+        for i, goal in enumerate(self.goals):
+            count = len(range(i, self.agent_count, len(self.goals)))
+            cells = np.flatnonzero(flow_field(self.grid, goal).distance != UNREACHABLE)
+            starts += [self.grid.point(int(index)) for index in self.rng.choice(cells, count)]
+            goals += [goal] * count
+        self.field_time = time.perf_counter() - started
+        self.field_version = self.grid.version
+        self.crowd = Crowd(self.grid, starts, goals)
+        self.heat_layer = self.build_heat_layer(self.crowd.fields())
+        self.panel_astar = PanelCache(self.grid.size)
+        self.panel_dijkstra = PanelCache(self.grid.size)
+        self.full_redraw = True
+
+    def refresh_fields(self) -> None:
+        """Recompute the flow fields if the grid changed, and rebuild the distance shading."""
+        if self.field_version == self.grid.version:
+            return
+        started = time.perf_counter()
+        fields = self.crowd.fields()
+        self.field_time = time.perf_counter() - started
+        self.field_version = self.grid.version
+        self.heat_layer = self.build_heat_layer(fields)
+
+    def build_heat_layer(self, fields: List[FlowField]) -> pygame.Surface:
+        """Blue tint that fades with each cell's distance to the nearest goal."""
+        distance = np.minimum.reduce([field.distance for field in fields])
+        interior = distance.reshape(self.grid.rows + 2, self.grid.stride)[1:-1, 1:-1]
+        reachable = interior != UNREACHABLE
+        far = max(1, int(interior[reachable].max())) if reachable.any() else 1
+        closeness = np.where(reachable, 1 - interior / far, 0.0)
+        layer = pygame.Surface((self.grid.cols, self.grid.rows), pygame.SRCALPHA)
+        layer.fill((40, 90, 255))
+        alpha = pygame.surfarray.pixels_alpha(layer)
+        alpha[:] = (170 * closeness.T).astype(np.uint8)
+        del alpha  # unlock the surface
+        return layer  # one pixel per cell; render_full scales the part in view
+
+    def heat_view(self) -> pygame.Surface:
+        """The distance shading of the cells in view, at the camera's zoom."""
+        first_row, end_row, first_col, end_col = self.camera.window()
+        rows, cols = end_row - first_row, end_col - first_col
+        view = self.heat_layer.subsurface((first_col, first_row, cols, rows))
+        block = self.camera.block
+        return pygame.transform.scale(view, (-(-cols // block) * self.cell_size,
+                                             -(-rows // block) * self.cell_size))
+
+    def edit_cells(self, cells: List[Point], terrain: int) -> List[Point]:
+        """Change cells to a terrain class; goals cannot be edited."""
+        changed = self.grid.set_terrain([pos for pos in cells if pos not in self.goals],
+                                        terrain)
+        if changed:
+            self.redraw_terrain(changed)
+            self.full_redraw = True
+        return changed
+
+    def update(self) -> None:
+        if not self.is_running:
+            return
+        current_time = self.now()
+        if current_time - self.last_movement > self.movement_delay:
+            self.last_movement = current_time
+            self.refresh_fields()
+            self.crowd.step()
+            self.full_redraw = True
+
+    def render(self) -> None:
+        hovered = next((name for name, rect in self.ui_buttons.items()
+                        if rect.collidepoint(self.mouse_pos())), None)
+        if hovered != self.hovered_button or self.full_redraw:
+            self.hovered_button = hovered
+            self.render_full()
+            self.full_redraw = False
+            self.present()
+
+    def render_full(self) -> None:
+        self.refresh_fields()
+        if self.terrain_layer is None:
+            self.build_terrain_layers()
+        self.screen.fill((255, 255, 255))
+        x = self.astar_x
+        self.screen.set_clip(self.panel_rect(x))
+        self.screen.blit(self.terrain_layer, (x, 0))
+        if self.heat_layer is not None:
+            self.screen.blit(self.heat_view(), (x, 0))
+        shows = self.camera.shows
+        for i, goal in enumerate(self.crowd.goals):
+            if shows(goal):
+                pygame.draw.rect(self.screen, self.goal_colors[i % len(self.goal_colors)],
+                                 self.marker_rect(goal, x))
+        radius = max(2, self.cell_size // 3) if self.detail else 2
+        point = self.grid.point
+        for index, goal_id in zip(self.crowd.positions.tolist(), self.crowd.goal_of.tolist()):
+            pos = point(index)
+            if shows(pos):
+                pygame.draw.circle(self.screen, self.goal_colors[goal_id % len(self.goal_colors)],
+                                   self.cell_rect(pos, x).center, radius)
+        self.screen.set_clip(None)
+
+        arrived = int(self.crowd.arrived().sum())
+        stats = [
+            f"Agents: {len(self.crowd)}  Arrived: {arrived}  Steps: {self.crowd.steps}",
+            f"Flow fields: {len(self.crowd.goals)} (one per goal, not one search per agent)",
+            f"Field update: {self.field_time * 1000:.2f}ms",
+        ]
+        y = self.height - 170
+        for stat in stats:
+            text = self.render_text(stat)
+            self.screen.blit(text, (self.width // 2 - text.get_width() // 2, y))
+            y += 25
+        self.draw_instructions(20, self.height - 170)
+        self.draw_ui()
+
+    def draw_instructions(self, x: int, y: int) -> None:
+        instructions = [
+            "Controls:",
+            "SPACE - Start/Pause",
+            "R - New agents",
+            "Click - Wall, Right-click - Slow",
+            "Wheel/+/- - Zoom, WASD - Pan",
+        ]
+        for instruction in instructions:
+            text = self.render_text(instruction)
+            self.screen.blit(text, (x, y))
+            y += 25
@@ -0,0 +1,161 @@
+"""
+Background solver threads for the visualizer.
+Each SolverWorker owns one search and advances it on its own thread, one frame budget at
+a time, while the render loop only samples the latest snapshot.
+"""
+import threading
+import time
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from .algorithms import PathView
+from .grid import Grid
+from .instrumentation import SearchStats
+from .searchstate import SearchState
+from .trace import TraceWriter
+
+StepFunction = Callable[..., Any]
+
+class SolverSnapshot(NamedTuple):
+    """What a worker has done since the previous snapshot."""
+    expanded: List[int]        # cells closed since the previous snapshot, in order
+    path: Optional[PathView]   # current best path, or the final path once done
+    done: bool
+    elapsed: float             # CPU seconds spent inside the search so far
+    steps: int                 # total expansions so far
+
+class SolverWorker:
+    """
+    Runs step(grid, start, goal, open_set, closed_set, came_from, g_score) on a daemon thread,
+    passing stats= as well when a SearchStats is given. With a search_state, closed_set,
+    came_from and g_score are its array views, reset for this search instead of allocated.
+    With a trace, every expansion and its parent are recorded to it, and the final path and
+    counters close it when the search finishes.
+    Every grant() lets the worker run for one frame budget: steps_per_frame expansions, or
+    as many as fit in ms_per_frame milliseconds when that is set. Elapsed time is the
+    worker thread's CPU time inside those budgets, so it leaves out rendering, frame pacing,
+    time spent waiting for the GIL, and pauses (no budget is granted while paused).
+    wait() blocks until the granted budgets have run, for callers that need every frame to
+    show the same progress from run to run (offscreen export).
+    """
+    def __init__(self, step: StepFunction, grid: Grid, start: int, goal: int,
+                 open_set: Any, steps_per_frame: int = 1,
+                 ms_per_frame: Optional[float] = None,
+                 stats: Optional[SearchStats] = None,
+                 search_state: Optional[SearchState] = None,
+                 trace: Optional[TraceWriter] = None) -> None:
+        self.step = step
+        self.grid = grid
+        self.start = start
+        self.goal = goal
+        self.open_set = open_set
+        if search_state is None:
+            self.closed_set: Any = set()
+            self.came_from: Any = {}
+            self.g_score: Any = {start: 0}
+        else:
+            search_state.reset(start)
+            self.closed_set, self.came_from, self.g_score = search_state.views()
+        self.steps_per_frame = max(1, steps_per_frame)
+        self.ms_per_frame = ms_per_frame
+        self.stats = stats
+        self.trace = trace
+
+        self._lock = threading.Lock()
+        self._go = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._granted = 0  # budgets granted so far
+        self._served = 0   # budgets granted before the last one the thread finished
+        self._exited = False
+        self._stopped = False
+        self._expanded: List[int] = []
+        self._path: Optional[PathView] = None
+        self._done = False
+        self._elapsed = 0.0
+        self._steps = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def grant(self) -> None:
+        """Allow the worker to run one more frame budget."""
+        with self._lock:
+            self._granted += 1
+        self._go.set()
+
+    def wait(self) -> None:
+        """Block until the budgets granted so far have run, or the search has ended."""
+        with self._idle:
+            self._idle.wait_for(lambda: self._exited or self._served >= self._granted)
+
+    def stop(self, wait: bool = False) -> None:
+        """Stop the thread; with wait, return only once it no longer touches its state."""
+        self._stopped = True
+        self._go.set()
+        if wait:
+            self.thread.join()
+
+    def snapshot(self) -> SolverSnapshot:
+        """Return the latest state and hand over the cells expanded since the last call."""
+        with self._lock:
+            expanded, self._expanded = self._expanded, []
+            return SolverSnapshot(expanded, self._path, self._done, self._elapsed, self._steps)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                self._go.wait()
+                self._go.clear()
+                with self._lock:
+                    granted = self._granted
+                if self._stopped or self._run_budget():
+                    return
+                with self._idle:
+                    self._served = granted
+                    self._idle.notify_all()
+        finally:
+            if self.trace is not None:
+                self.trace.close()  # drops an unfinished recording; no-op after finish()
+            with self._idle:
+                self._exited = True
+                self._idle.notify_all()
+
+    def _run_budget(self) -> bool:
+        step, grid, start, goal = self.step, self.grid, self.start, self.goal
+        state = (self.open_set, self.closed_set, self.came_from, self.g_score)
+        extra = {} if self.stats is None else {'stats': self.stats}
+        expanded = []
+        path = None
+        done = False
+        deadline = None
+        if self.ms_per_frame is not None:
+            deadline = time.perf_counter() + self.ms_per_frame / 1000.0
+        trace, came_from = self.trace, self.came_from
+        cpu_start = time.thread_time()
+        while not done:
+            current, done, step_path, _ = step(grid, start, goal, *state, **extra)
+            if step_path is not None:
+                path = step_path
+            if not done:
+                expanded.append(current)
+                if trace is not None:
+                    trace.record(current, came_from.get(current))
+            if deadline is None:
+                if len(expanded) >= self.steps_per_frame:
+                    break
+            elif time.perf_counter() >= deadline:
+                break
+        cpu_time = time.thread_time() - cpu_start
+        with self._lock:
+            self._expanded.extend(expanded)
+            if path is not None or done:
+                self._path = path
+            self._done = done
+            self._elapsed += cpu_time
+            self._steps += len(expanded)
+        if done and trace is not None:
+            meta = {}
+            if self.stats is not None:
+                meta.update((key, value) for key, value in self.stats.as_dict().items()
+                            if key != 'samples')
+            meta['elapsed'] = self._elapsed
+            trace.finish(path.indices() if path is not None else None, meta)
+        return done